@@ -3,11 +3,17 @@
 # Python Imports
 from __future__ import print_function
 import argparse
+import hashlib
 import os
+import sys
 from PyVersion import PyCheckLenient
 from ElapseTime import ElapseTime
 from StrUtils import FormatASCII
 from SpringSupport import SpringSupport
+from TSVUtils import TSVReader, TSVWriter
+from ParallelExport import ParallelExport, SerialExport
+from GemmaPrefetch import ChangedIDs, LinkedIDs, PLATFORM_OF_EE
+from ExportState import ExportState
 
 # Java Imports
 from gemma.gsec.util import SecurityUtil
@@ -21,13 +27,16 @@ assert PyCheckLenient('Jython', '2', '7') or PyCheckLenient('CPython', '2', '7')
 cliParser = argparse.ArgumentParser()
 cliParser.add_argument('-u', required = False, default = None, help = 'Gemma username')
 cliParser.add_argument('-p', required = False, default = None, help = 'Gemma password')
+cliParser.add_argument('--workers', type = int, required = False, default = 1, help = 'Worker threads (1 = sequential)')
+cliParser.add_argument('--incremental', action = 'store_true', help = 'Recompute changed platforms only (previous TSV and state)')
+cliParser.add_argument('--allow-failures', action = 'store_true', help = 'Exit with status 0 even if platforms failed (failed IDs are skipped either way)')
 cliOpts = cliParser.parse_args()
 
 # Declaring Global Variables
 os.chdir(os.getenv('OUT_DIR'))
 
 # Logging Processing Time
-globalTimer = ElapseTime()
+globalTimer = ElapseTime(name = 'AD_Export')
 print(globalTimer.getBeginStamp())
 
 # Start Spring Session and Service Declarations
@@ -46,30 +55,42 @@ if not SecurityUtil.isUserAdmin():
 centralGeneTypeDict = dict()
 for taxon in ['human', 'mouse', 'rat', 'zebrafish', 'fly', 'worm', 'yeast']:
 	centralGeneTypeDict[taxon] = set()
-with open('Gene_Export.TSV', mode = 'rt') as geneFile:
-	for lineIndex, everyLine in enumerate(geneFile):
-		# Skip Header
-		if lineIndex == 0:
-			continue
-		tempArray = everyLine.strip('\n').split('\t')
-
-		# Populate Gene Set
-		if tempArray[3] == 'protein-coding' and int(tempArray[4]) > 0:
-			centralGeneTypeDict[tempArray[0]].add(int(tempArray[2]))
-
-# Creating Metadata File Handle
-metadataFileHandle = open(name = 'AD_Export.TSV', mode = 'wt')
+geneColumns = ['gene.Taxon', 'gene.EntrezID', 'gene.Type', 'gene.NumCS']
+with TSVReader('Gene_Export.TSV', columns = geneColumns) as geneReader:
+	for taxon, entrezID, geneType, numCS in geneReader:
+		# Populate Gene Set (Integers Converted on Hits Only)
+		if geneType == 'protein-coding' and int(numCS) > 0:
+			centralGeneTypeDict[taxon].add(int(entrezID))
 
 # Prepare Metadata Header
 metaHeader = ['ad.ID', 'ad.Name', 'ad.Title', 'ad.IsTroubled', 'ad.IsBlacklisted']
 metaHeader.extend(['ad.Taxon', 'ad.TechType', 'ad.IsAltAffy', 'ad.IsMerged'])
 metaHeader.extend(['ad.NumEE', 'ad.NumProbe', 'ad.NumGene', 'ad.NumProtGene', 'ad.RatioProtGene'])
-metadataFileHandle.write('\t'.join(metaHeader) + '\n')
+
+# Export State (Begin Time Recorded Before Loading; Gene Sets Digested as Input)
+geneDigest = hashlib.md5(repr(sorted(map(lambda x: (x[0], sorted(x[1])), centralGeneTypeDict.items())))).hexdigest()
+exportState = ExportState('AD_Export.TSV', metaHeader, formatFunc = FormatASCII, inputDigest = geneDigest)
 
 print('Generating Platform Metadata.')
 adList = platformService.loadAllValueObjects()
-
-for advo in adList:
+adIDList = list(map(lambda x: x.id, adList))
+
+# Incremental Mode (Platforms Changed Since the Previous Run, or Used by a Changed Experiment; Merged on Finish)
+if cliOpts.incremental and exportState.load():
+	changedSet = ChangedIDs(sx, 'ArrayDesign', exportState.lastUpdate)
+	changedSet.update(LinkedIDs(sx, PLATFORM_OF_EE, ChangedIDs(sx, 'ExpressionExperiment', exportState.lastUpdate)))
+	adList = exportState.select(adList, changedSet)
+	metadataFileHandle = None
+	writeFunc = exportState.collect
+else:
+	# Creating Metadata File Handle (Batched Writes)
+	metadataFileHandle = TSVWriter('AD_Export.TSV', header = metaHeader, formatFunc = FormatASCII)
+	writeFunc = exportState.track(metadataFileHandle.write)
+
+
+def ExportRow(advo):
+	# Metadata row of one platform
+	# NOTE: Runs in worker threads in parallel mode (shared gene sets are read-only)
 	ad = platformService.load(advo.id)
 
 	# Load Gene Type Dictionary
@@ -119,15 +140,31 @@ for advo in adList:
 	tempList = [advo.id, advo.shortName, advo.name, adTroubled, adBlacklisted]
 	tempList.extend([ad.primaryTaxon.commonName, ad.technologyType.value, advo.isAffymetrixAltCdf, adMerged])
 	tempList.extend([adNumEE, adNumProbe, adNumGene, adNumPCGene, adRatioPCGene])
+	return tempList
 
-	tempList = map(FormatASCII, tempList)
-	metadataFileHandle.write('\t'.join(tempList) + '\n')
+
+# Rows Written in ID Order; Failed Platforms Reported and Skipped (Both Modes; Non-Zero Exit Below)
+if cliOpts.workers > 1:
+	# Parallel Mode (ID-Partitioned Workers)
+	failList = ParallelExport(sx, cliOpts.workers).run(adList, ExportRow, writeFunc)
+else:
+	failList = SerialExport(adList, ExportRow, writeFunc)
 
 # Time Reporter
 print(globalTimer.getEndStamp())
 
 # Close File Handles
-metadataFileHandle.close()
+if metadataFileHandle is not None:
+	metadataFileHandle.close()
+
+# Incremental State (Merged TSV in Incremental Mode)
+exportState.finish(adIDList, failList)
 
 # End Spring Session
 sx.shutDown()
+
+# Failed Platforms (Reported After Checkpoint and State; Exit Status 1 Unless --allow-failures)
+if len(failList) > 0:
+	print('ERROR: {0} platforms failed; their rows are missing from the TSV'.format(len(failList)))
+	if not cliOpts.allow_failures:
+		sys.exit(1)
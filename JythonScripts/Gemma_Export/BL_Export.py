@@ -26,7 +26,7 @@ cliOpts = cliParser.parse_args()
 os.chdir(os.getenv('OUT_DIR'))
 
 # Logging Processing Time
-globalTimer = ElapseTime()
+globalTimer = ElapseTime(name = 'BL_Export')
 print(globalTimer.getBeginStamp())
 
 # Start Spring Session and Service Declarations
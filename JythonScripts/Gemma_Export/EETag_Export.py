@@ -9,6 +9,9 @@ from ElapseTime import ElapseTime
 from StrUtils import FormatASCII
 from SpringSupport import SpringSupport
 from OntologyUtils import ExperimentTagList
+from TSVUtils import TSVWriter
+from GemmaPrefetch import ChangedIDs
+from ExportState import ExportState
 
 # Java Imports
 from gemma.gsec.util import SecurityUtil
@@ -22,13 +25,14 @@ assert PyCheckLenient('Jython', '2', '7') or PyCheckLenient('CPython', '2', '7')
 cliParser = argparse.ArgumentParser()
 cliParser.add_argument('-u', required = False, default = None, help = 'Gemma username')
 cliParser.add_argument('-p', required = False, default = None, help = 'Gemma password')
+cliParser.add_argument('--incremental', action = 'store_true', help = 'Recompute tags of changed experiments only (previous TSV and state)')
 cliOpts = cliParser.parse_args()
 
 # Declaring Global Variables
 os.chdir(os.getenv('OUT_DIR'))
 
 # Logging Processing Time
-globalTimer = ElapseTime()
+globalTimer = ElapseTime(name = 'EETag_Export')
 print(globalTimer.getBeginStamp())
 
 # Start Spring Session and Service Declarations
@@ -41,15 +45,25 @@ if not SecurityUtil.isUserAdmin():
 	print('ERROR: Administrative privileges required.')
 	raise RuntimeError('Administrative privileges required.')
 
-# Creating Metadata File Handle
-metadataFileHandle = open(name = 'EETag_Export.TSV', mode = 'wt')
-
 # Prepare Metadata Header
 metaHeader = ['ee.ID', 'et.Val', 'et.ValUri', 'et.ValShortURI', 'et.Type', 'et.Evidence']
-metadataFileHandle.write('\t'.join(metaHeader) + '\n')
+
+# Export State (Begin Time Recorded Before Loading)
+exportState = ExportState('EETag_Export.TSV', metaHeader, formatFunc = FormatASCII)
 
 print('Generating Experiment Metadata')
 eeList = experimentService.loadAllValueObjects()
+eeIDList = list(map(lambda x: x.id, eeList))
+
+# Incremental Mode (Experiments Changed Since the Previous Run; Merged on Finish)
+if cliOpts.incremental and exportState.load():
+	eeList = exportState.select(eeList, ChangedIDs(sx, 'ExpressionExperiment', exportState.lastUpdate))
+	metadataFileHandle = None
+	writeFunc = exportState.collect
+else:
+	# Creating Metadata File Handle (Batched Writes)
+	metadataFileHandle = TSVWriter('EETag_Export.TSV', header = metaHeader, formatFunc = FormatASCII)
+	writeFunc = exportState.track(metadataFileHandle.write)
 
 for eevo in eeList:
 	eeAnnotList = ExperimentTagList(experimentService.getAnnotations(Long(eevo.id)))
@@ -58,14 +72,17 @@ for eevo in eeList:
 		tempList = [eevo.id, eeAnnot.termValue.termValue, eeAnnot.termValue.termURI, eeAnnot.termValue.shortURI]
 		tempList.extend([eeAnnot.termType, eeAnnot.evidence])
 
-		tempList = map(FormatASCII, tempList)
-		metadataFileHandle.write('\t'.join(tempList) + '\n')
+		writeFunc(tempList)
 
 # Time Reporter
 print(globalTimer.getEndStamp())
 
 # Close File Handles
-metadataFileHandle.close()
+if metadataFileHandle is not None:
+	metadataFileHandle.close()
+
+# Incremental State (Merged TSV in Incremental Mode)
+exportState.finish(eeIDList)
 
 # End Spring Session
 sx.shutDown()
@@ -4,13 +4,18 @@
 from __future__ import print_function
 import argparse
 import os
+import sys
 from array import array
 from math import isnan, isinf
 from PyVersion import PyCheckLenient
-from ElapseTime import ElapseTime
+from ElapseTime import ElapseTime, ElapseProgress
 from StrUtils import FormatASCII
 from MathUtils import Median
 from SpringSupport import SpringSupport
+from GemmaPrefetch import EEPrefetch, ChangedIDs, LinkedIDs, EE_OF_PLATFORM
+from ExportState import ExportState, ExportCheckpoint
+from ParallelExport import ParallelExport, SerialExport, ShardName, ShardSelect, PartPath
+from TSVUtils import TSVWriter
 
 # Java Imports
 from gemma.gsec.util import SecurityUtil
@@ -24,19 +29,33 @@ assert PyCheckLenient('Jython', '2', '7') or PyCheckLenient('CPython', '2', '7')
 cliParser = argparse.ArgumentParser()
 cliParser.add_argument('-u', required = False, default = None, help = 'Gemma username')
 cliParser.add_argument('-p', required = False, default = None, help = 'Gemma password')
+cliParser.add_argument('--batch', type = int, required = False, default = 500, help = 'Experiments per prefetch chunk')
+cliParser.add_argument('--workers', type = int, required = False, default = 1, help = 'Worker threads (1 = sequential)')
+cliParser.add_argument('--shard', required = False, default = None, help = 'Shard i/N (IDs modulo N; writes part-i)')
+cliParser.add_argument('--range', required = False, default = None, help = 'ID range LO:HI (writes part-LO-HI)')
+cliParser.add_argument('--incremental', action = 'store_true', help = 'Recompute changed experiments only (previous TSV and state)')
+cliParser.add_argument('--resume', action = 'store_true', help = 'Resume from the last checkpoint (appends to the TSV)')
+cliParser.add_argument('--checkpoint', type = float, required = False, default = 300.0, help = 'Checkpoint interval (seconds)')
+cliParser.add_argument('--allow-failures', action = 'store_true', help = 'Exit with status 0 even if experiments failed (failed IDs are skipped either way)')
 cliOpts = cliParser.parse_args()
+if cliOpts.incremental and (cliOpts.shard is not None or cliOpts.range is not None):
+	cliParser.error('--incremental applies to the full export only')
+if cliOpts.incremental and cliOpts.resume:
+	cliParser.error('--incremental and --resume are exclusive')
 
 # Declaring Global Variables
 os.chdir(os.getenv('OUT_DIR'))
+partName = ShardName(cliOpts.shard, cliOpts.range)
 
-# Logging Processing Time
-globalTimer = ElapseTime()
+# Logging Processing Time (Span Profile Written to PROFILE_DIR)
+globalTimer = ElapseTime(name = 'EE_Export' if partName is None else 'EE_Export.{0}'.format(partName))
 print(globalTimer.getBeginStamp())
 
 # Start Spring Session and Service Declarations
 sx = SpringSupport(cliOpts.u, cliOpts.p)
 experimentService = sx.getBean('expressionExperimentService')
 correlationService = sx.getBean('sampleCoexpressionAnalysisService')
+batchConfound = sx.profile(BatchConfound, 'BatchConfound')
 
 # ------------------------------ MAIN ------------------------------
 # Credentials Check
@@ -44,136 +63,183 @@ if not SecurityUtil.isUserAdmin():
 	print('ERROR: Administrative privileges required.')
 	raise RuntimeError('Administrative privileges required.')
 
-# Creating Metadata File Handle
-metadataFileHandle = open(name = 'EE_Export.TSV', mode = 'wt')
-
 # Prepare Metadata Header
 metaHeader = ['ee.ID', 'ee.Name', 'ee.OriginalID', 'ee.Source', 'ee.IsPublic', 'ee.IsTroubled', 'ee.IsBlacklisted']
 metaHeader.extend(['ee.Taxon', 'ee.NumSample', 'ee.NumOutlier', 'ee.PMID'])
 metaHeader.extend(['ee.QualityScore', 'ee.MedianCor', 'ee.IsReprocessed'])
 metaHeader.extend(['ee.HasBatch', 'ee.BatchEffected', 'ee.IsCorrected', 'ee.IsConfounded'])
 metaHeader.extend(['ad.ID', 'ad.Name', 'ad.Num', 'ad.Type', 'ad.Company'])
-metadataFileHandle.write('\t'.join(metaHeader) + '\n')
+
+# Export State (Begin Time Recorded Before Loading)
+exportState = ExportState('EE_Export.TSV', metaHeader, formatFunc = FormatASCII)
 
 print('Generating Experiment Metadata')
-eeList = experimentService.loadAllValueObjects()
-
-for eevo in eeList:
-	ee = experimentService.thawLite(experimentService.load(eevo.id))
-	qtList = experimentService.getQuantitationTypes(ee)
-
-	# Original IDs
-	eeAccession = 'NA'
-	if ee.accession is not None:
-		eeAccession = ee.accession.accession
-
-	# Source Details
-	eeSource = 'Manual'
-	if eevo.externalDatabase in ['GEO', 'ArrayExpress']:
-		eeSource = eevo.externalDatabase
-
-	# Troubled State (Incl. Platform Check)
-	eeTroubled = experimentService.isTroubled(ee)
-
-	# Blacklisted State
-	eeBlacklisted = experimentService.isBlackListed(eeAccession)
-
-	# Taxon Details
-	eeTaxon = experimentService.getTaxon(ee).commonName
-
-	# Sample Details
-	nSample = experimentService.getBioMaterialCount(ee)
-
-	# Outlier Details
-	nOutlier = set()
-	for ba in ee.bioAssays:
-		if ba.isOutlier:
-			nOutlier.add(ba.sampleUsed.id)
-	nOutlier = len(nOutlier)
-
-	# PMID Details
-	eePMID = 'NA'
-	if ee.primaryPublication is not None:
-		eePMID = ee.primaryPublication.pubAccession.accession
-
-	# GEEQ Scores
-	eeGeeq = 'NA'
-	if eevo.geeq is not None:
-		eeGeeq = eevo.geeq.publicQualityScore
-
-	# Sample Correlation (Regressed) Details
-	eeCor = 'NA'
-	try:
-		corMatrix = correlationService.loadTryRegressedThenFull(ee).asArray()
-		corVector = array('d')
-
-		for matIndex, matSlice in enumerate(corMatrix, start = 1):
-			corVector.extend(matSlice[matIndex:])
-		corVector = filter(lambda x: not (isnan(x) or isinf(x)), corVector)
-	except:
-		corVector = []
-	if len(corVector) > 0:
-		eeCor = Median(corVector)
-
-	# Reprocessed State
-	eeReprocess = any(map(lambda x: x.isRecomputedFromRawData, qtList))
-
-	# Batch Details
-	batchList = [False] * 4
-	if experimentService.checkHasBatchInfo(ee):
-		beDetails = experimentService.getBatchEffect(ee)
-		eeConfounded = False
-
-		if beDetails.pvalue < 0.01:
-			try:
-				bcDetails = BatchConfound.test(ee)
-			except:
-				bcDetails = []
-			if len(bcDetails) > 0:
-				eeConfounded = min(map(lambda x: x.p, bcDetails)) < 0.01
-
-		batchList = [
-			True,
-			beDetails.pvalue < 0.01,
-			beDetails.dataWasBatchCorrected,
-			eeConfounded
+with globalTimer.span('loadAll'):
+	eeList = experimentService.loadAllValueObjects()
+
+# Shard Slice (Sorted by ID; Full List Without --shard/--range)
+eeList = ShardSelect(eeList, cliOpts.shard, cliOpts.range)
+eeIDList = list(map(lambda x: x.id, eeList))
+
+# Incremental Mode (Experiments Changed Since the Previous Run, or Using a Changed Platform; Merged on Finish)
+if cliOpts.incremental and exportState.load():
+	changedSet = ChangedIDs(sx, 'ExpressionExperiment', exportState.lastUpdate)
+	changedSet.update(LinkedIDs(sx, EE_OF_PLATFORM, ChangedIDs(sx, 'ArrayDesign', exportState.lastUpdate)))
+	eeList = exportState.select(eeList, changedSet)
+	metadataFileHandle = None
+	exportCheckpoint = None
+	writeFunc = exportState.collect
+else:
+	# Checkpoints (Flush and Last Written ID Every --checkpoint Seconds; --resume Skips Completed IDs)
+	exportCheckpoint = ExportCheckpoint(PartPath('EE_Export.TSV', partName), metaHeader, interval = cliOpts.checkpoint)
+	resumeID = exportCheckpoint.start(cliOpts.resume)
+	if resumeID is not None:
+		eeList = list(filter(lambda x: x.id > resumeID, eeList))
+		if partName is None:
+			exportState.trackFile('EE_Export.TSV')
+
+	# Creating Metadata File Handle (Batched Writes; Appending When Resumed)
+	metadataFileHandle = TSVWriter(PartPath('EE_Export.TSV', partName), header = metaHeader, formatFunc = FormatASCII, appendFlag = resumeID is not None)
+	exportCheckpoint.attach(metadataFileHandle)
+	writeFunc = exportState.track(exportCheckpoint.write)
+
+# Chunked Prefetch (Accession, Taxon, Sample/Outlier Counts, PMID, Flags and Platforms per ID Chunk)
+# NOTE: Only thawLite, sample correlation and batch checks remain per-experiment service calls
+eePrefetch = EEPrefetch(sx, batchSize = cliOpts.batch, timer = globalTimer)
+
+
+def ExportRow(eeItem):
+	# Metadata row of one (value object, prefetch record) pair
+	# NOTE: Runs in worker threads in parallel mode (services, timer and profiler are thread-safe)
+	eevo, eeRecord = eeItem
+	with globalTimer.span('load'):
+		ee = experimentService.thawLite(eeRecord['entity'])
+
+	with globalTimer.span('details'):
+		# Original IDs
+		eeAccession = eeRecord['accession']
+
+		# Source Details
+		eeSource = 'Manual'
+		if eevo.externalDatabase in ['GEO', 'ArrayExpress']:
+			eeSource = eevo.externalDatabase
+
+		# Troubled (Incl. Platform Check) and Blacklisted States
+		eeTroubled = eeRecord['troubled']
+		eeBlacklisted = eeRecord['blacklisted']
+
+		# Taxon, Sample, Outlier and PMID Details
+		eeTaxon = eeRecord['taxon']
+		nSample = eeRecord['sampleCount']
+		nOutlier = eeRecord['outlierCount']
+		eePMID = eeRecord['pmid']
+
+		# GEEQ Scores
+		eeGeeq = 'NA'
+		if eevo.geeq is not None:
+			eeGeeq = eevo.geeq.publicQualityScore
+
+	with globalTimer.span('correlation'):
+		# Sample Correlation (Regressed) Details
+		eeCor = 'NA'
+		try:
+			corMatrix = correlationService.loadTryRegressedThenFull(ee).asArray()
+			corVector = array('d')
+
+			for matIndex, matSlice in enumerate(corMatrix, start = 1):
+				corVector.extend(matSlice[matIndex:])
+			corVector = filter(lambda x: not (isnan(x) or isinf(x)), corVector)
+		except:
+			corVector = []
+		if len(corVector) > 0:
+			eeCor = Median(corVector)
+
+	with globalTimer.span('batch'):
+		# Reprocessed State
+		eeReprocess = eeRecord['reprocessed']
+
+		# Batch Details
+		batchList = [False] * 4
+		if experimentService.checkHasBatchInfo(ee):
+			beDetails = experimentService.getBatchEffect(ee)
+			eeConfounded = False
+
+			if beDetails.pvalue < 0.01:
+				try:
+					bcDetails = batchConfound.test(ee)
+				except:
+					bcDetails = []
+				if len(bcDetails) > 0:
+					eeConfounded = min(map(lambda x: x.p, bcDetails)) < 0.01
+
+			batchList = [
+				True,
+				beDetails.pvalue < 0.01,
+				beDetails.dataWasBatchCorrected,
+				eeConfounded
+			]
+
+	with globalTimer.span('platform'):
+		# Platform Details (ID, Short Name, Name, Technology Type; Sorted by ID)
+		adList = eeRecord['platformList']
+		adIDVector = map(lambda x: FormatASCII(x[0]), adList)
+		adNameVector = map(lambda x: FormatASCII(x[1]), adList)
+		adTechVector = set(map(lambda x: FormatASCII(x[3].value), adList))
+		adTitle = ';'.join(map(lambda x: FormatASCII(x[2]), adList)).lower()
+		adCompany = 'NA'
+		if 'affymetrix' in adTitle:
+			adCompany = 'Affymetrix'
+		elif 'illumina' in adTitle:
+			adCompany = 'Illumina'
+		elif 'agilent' in adTitle:
+			adCompany = 'Agilent'
+		finalADList = [
+			'; '.join(adIDVector),
+			'; '.join(adNameVector),
+			len(adList),
+			'; '.join(adTechVector),
+			adCompany
 		]
 
-	# Platform Details
-	adList = sorted(experimentService.getArrayDesignsUsed(ee))
-	adIDVector = map(lambda x: FormatASCII(x.id), adList)
-	adNameVector = map(lambda x: FormatASCII(x.shortName), adList)
-	adTechVector = set(map(lambda x: FormatASCII(x.technologyType.value), adList))
-	adTitle = ';'.join(map(lambda x: FormatASCII(x.name), adList)).lower()
-	adCompany = 'NA'
-	if 'affymetrix' in adTitle:
-		adCompany = 'Affymetrix'
-	elif 'illumina' in adTitle:
-		adCompany = 'Illumina'
-	elif 'agilent' in adTitle:
-		adCompany = 'Agilent'
-	finalADList = [
-		'; '.join(adIDVector),
-		'; '.join(adNameVector),
-		len(adList),
-		'; '.join(adTechVector),
-		adCompany
-	]
-
 	tempList = [eevo.id, eevo.shortName, eeAccession, eeSource, eevo.isPublic, eeTroubled, eeBlacklisted]
 	tempList.extend([eeTaxon, nSample, nOutlier, eePMID])
 	tempList.extend([eeGeeq, eeCor, eeReprocess])
 	tempList.extend(batchList)
 	tempList.extend(finalADList)
+	return tempList
+
 
-	tempList = map(FormatASCII, tempList)
-	metadataFileHandle.write('\t'.join(tempList) + '\n')
+# Progress Reporting (Time-Based Cadence); Failed Experiments Reported and Skipped (Both Modes; Non-Zero Exit Below)
+eeProgress = ElapseProgress('Experiments', total = len(eeList), timer = globalTimer)
+failFunc = None if exportCheckpoint is None else exportCheckpoint.fail
+if cliOpts.workers > 1:
+	# Parallel Mode (ID-Partitioned Workers; Rows Written in ID Order)
+	eeParallel = ParallelExport(sx, cliOpts.workers, clearSize = cliOpts.batch)
+	failList = eeParallel.run(eeList, ExportRow, writeFunc, iterFunc = eePrefetch.iterate, progress = eeProgress, failFunc = failFunc)
+else:
+	failList = SerialExport(eeList, ExportRow, writeFunc, iterFunc = eePrefetch.iterate, progress = eeProgress, failFunc = failFunc)
+
+# Failed IDs (Incl. Failures Before the Checkpoint When Resumed)
+if exportCheckpoint is not None:
+	failList = list(exportCheckpoint.failList)
 
 # Time Reporter
 print(globalTimer.getEndStamp())
 
 # Close File Handles
-metadataFileHandle.close()
+if metadataFileHandle is not None:
+	metadataFileHandle.close()
+	exportCheckpoint.finish()
+
+# Incremental State (Merged TSV in Incremental Mode; Full Exports Only)
+if partName is None:
+	exportState.finish(eeIDList, failList)
 
 # End Spring Session
 sx.shutDown()
+
+# Failed Experiments (Reported After Checkpoint and State; Exit Status 1 Unless --allow-failures)
+if len(failList) > 0:
+	print('ERROR: {0} experiments failed; their rows are missing from the TSV'.format(len(failList)))
+	if not cliOpts.allow_failures:
+		sys.exit(1)
@@ -0,0 +1,105 @@
+# Gemma Export Script: Merge Shard Parts (k-way merge by ID into the canonical TSV)
+
+# Python Imports
+from __future__ import print_function
+import argparse
+import heapq
+import os
+from PyVersion import PyCheckLenient
+from TSVUtils import TSVReader, TSVWriter
+
+# Python Version Check
+# Requirement: Jython 2.7.X or CPython 3.7.X (CPython 2.7.X Bypass added for PyCharm Debugging)
+assert PyCheckLenient('Jython', '2', '7') or PyCheckLenient('CPython', '3', '7') or PyCheckLenient('CPython', '2', '7')
+
+# CLI Generation and Parsing
+# NOTE: Parts must be sorted by --key (within each --group block); the exporters write them that way in shard mode
+cliParser = argparse.ArgumentParser()
+cliParser.add_argument('-o', required = True, help = 'Merged TSV path')
+cliParser.add_argument('--key', required = True, help = 'Integer ID column (e.g. ee.ID)')
+cliParser.add_argument('--group', required = False, default = None, help = 'Block column ordered before the key (e.g. gene.Taxon)')
+cliParser.add_argument('partList', nargs = '+', help = 'Part TSV paths')
+cliOpts = cliParser.parse_args()
+
+
+def GroupSequence(path, groupIndex):
+	# Distinct group values of a part in block order (each block must be contiguous)
+	sequenceList = []
+	with TSVReader(path, columns = [groupIndex]) as tempReader:
+		for (groupValue,) in tempReader:
+			if len(sequenceList) > 0 and sequenceList[-1] == groupValue:
+				continue
+			if groupValue in sequenceList:
+				raise ValueError('Group {0} is not contiguous ({1})'.format(groupValue, path))
+			sequenceList.append(groupValue)
+	return sequenceList
+
+
+def GroupRank(sequenceList):
+	# Group -> rank consistent with every part's block order (topological; ties by first appearance)
+	firstList = []
+	edgeDict = dict()
+	inDict = dict()
+	for everySequence in sequenceList:
+		for groupIndex, groupValue in enumerate(everySequence):
+			if groupValue not in inDict:
+				firstList.append(groupValue)
+				inDict[groupValue] = 0
+				edgeDict[groupValue] = set()
+			if groupIndex > 0 and groupValue not in edgeDict[everySequence[groupIndex - 1]]:
+				edgeDict[everySequence[groupIndex - 1]].add(groupValue)
+				inDict[groupValue] += 1
+
+	rankDict = dict()
+	while len(rankDict) < len(firstList):
+		readyList = list(filter(lambda x: x not in rankDict and inDict[x] == 0, firstList))
+		if len(readyList) == 0:
+			raise ValueError('Group order differs between parts')
+		rankDict[readyList[0]] = len(rankDict)
+		for nextValue in edgeDict[readyList[0]]:
+			inDict[nextValue] -= 1
+	return rankDict
+
+
+def PartRows(partIndex, tempReader, keyIndex, groupIndex, rankDict):
+	# Decorated rows of one part: (group rank, ID, part index, row)
+	for everyRow in tempReader:
+		groupRank = 0 if groupIndex is None else rankDict[everyRow[groupIndex]]
+		yield groupRank, int(everyRow[keyIndex]), partIndex, everyRow
+
+
+# ------------------------------ MAIN ------------------------------
+# Header Check (Identical Across Parts)
+readerList = list(map(TSVReader, cliOpts.partList))
+finalHeader = readerList[0].header
+for partPath, tempReader in zip(cliOpts.partList, readerList):
+	if tempReader.header != finalHeader:
+		raise ValueError('Header mismatch: {0} vs {1}'.format(partPath, cliOpts.partList[0]))
+keyIndex = finalHeader.index(cliOpts.key)
+groupIndex = None if cliOpts.group is None else finalHeader.index(cliOpts.group)
+
+# Group Order (Pre-Pass Over the Group Column)
+rankDict = dict()
+if groupIndex is not None:
+	rankDict = GroupRank(list(map(lambda x: GroupSequence(x, groupIndex), cliOpts.partList)))
+
+# K-Way Merge (Written Beside the Target, Then Renamed; Duplicate or Unsorted IDs Rejected)
+tempPath = '{0}.tmp'.format(cliOpts.o)
+rowCount = 0
+previousKey = None
+try:
+	with TSVWriter(tempPath, header = finalHeader) as mergeWriter:
+		partIterList = list(map(lambda x: PartRows(x[0], x[1], keyIndex, groupIndex, rankDict), enumerate(readerList)))
+		for groupRank, keyValue, partIndex, everyRow in heapq.merge(*partIterList):
+			if previousKey is not None and (groupRank, keyValue) <= previousKey:
+				raise ValueError('Duplicate or unsorted ID {0} ({1})'.format(keyValue, cliOpts.partList[partIndex]))
+			previousKey = (groupRank, keyValue)
+			mergeWriter.write(everyRow)
+			rowCount += 1
+except:
+	os.remove(tempPath)
+	raise
+list(map(lambda x: x.close(), readerList))
+os.rename(tempPath, cliOpts.o)
+
+print('Merged {0} rows from {1} parts into {2}'.format(rowCount, len(readerList), cliOpts.o))
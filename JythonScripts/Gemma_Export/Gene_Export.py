@@ -4,11 +4,16 @@
 from __future__ import print_function
 import argparse
 import os
+import sys
 from PyVersion import PyCheckLenient
-from ElapseTime import ElapseTime
+from ElapseTime import ElapseTime, ElapseProgress
 from StrUtils import FormatASCII
 from SpringSupport import SpringSupport
 from XZPickle import XZRead
+from GeneTable import GeneTable
+from TSVUtils import TSVWriter
+from ParallelExport import ParallelExport, SerialExport, ShardName, ShardSelect, PartPath
+from ExportState import ExportCheckpoint
 
 # Java Imports
 from gemma.gsec.util import SecurityUtil
@@ -22,15 +27,22 @@ assert PyCheckLenient('Jython', '2', '7') or PyCheckLenient('CPython', '2', '7')
 cliParser = argparse.ArgumentParser()
 cliParser.add_argument('-u', required = False, default = None, help = 'Gemma username')
 cliParser.add_argument('-p', required = False, default = None, help = 'Gemma password')
+cliParser.add_argument('--workers', type = int, required = False, default = 1, help = 'Worker threads (1 = sequential)')
+cliParser.add_argument('--shard', required = False, default = None, help = 'Shard i/N (IDs modulo N; writes part-i)')
+cliParser.add_argument('--range', required = False, default = None, help = 'ID range LO:HI (writes part-LO-HI)')
+cliParser.add_argument('--resume', action = 'store_true', help = 'Resume from the last checkpoint (appends to the TSV)')
+cliParser.add_argument('--checkpoint', type = float, required = False, default = 300.0, help = 'Checkpoint interval (seconds)')
+cliParser.add_argument('--allow-failures', action = 'store_true', help = 'Exit with status 0 even if genes failed (failed IDs are skipped either way)')
 cliOpts = cliParser.parse_args()
 
 # Declaring Global Variables
 os.chdir(os.getenv('OUT_DIR'))
 geneDetailsPath = os.getenv('GENE_DIR')
 taxonTuple = ('human', 'mouse', 'rat', 'zebrafish', 'fly', 'worm', 'yeast')
+partName = ShardName(cliOpts.shard, cliOpts.range)
 
 # Logging Processing Time
-globalTimer = ElapseTime()
+globalTimer = ElapseTime(name = 'Gene_Export' if partName is None else 'Gene_Export.{0}'.format(partName))
 print(globalTimer.getBeginStamp())
 
 # Start Spring Session and Service Declarations
@@ -44,42 +56,79 @@ if not SecurityUtil.isUserAdmin():
 	print('ERROR: Administrative privileges required.')
 	raise RuntimeError('Administrative privileges required.')
 
-# Creating Metadata File Handle
-metadataFileHandle = open(name = 'Gene_Export.TSV', mode = 'wt')
-
 # Prepare Metadata Header
 metaHeader = ['gene.Taxon', 'gene.ID', 'gene.EntrezID', 'gene.Type']
 metaHeader.extend(['gene.NumCS', 'gene.NumAD'])
-metadataFileHandle.write('\t'.join(metaHeader) + '\n')
 
-print('Generating Gene Metadata')
-for taxon in taxonTuple:
-	geneList = geneService.loadAll(taxonService.findByCommonName(taxon))
+# Checkpoints (Flush and Last Written Taxon/ID Every --checkpoint Seconds; --resume Skips Completed Genes)
+exportCheckpoint = ExportCheckpoint(PartPath('Gene_Export.TSV', partName), metaHeader, keyFunc = lambda x: [x[0], x[1]], interval = cliOpts.checkpoint)
+resumeKey = exportCheckpoint.start(cliOpts.resume)
+
+# Creating Metadata File Handle (Batched Writes; Appending When Resumed)
+metadataFileHandle = TSVWriter(PartPath('Gene_Export.TSV', partName), header = metaHeader, formatFunc = FormatASCII, appendFlag = resumeKey is not None)
+exportCheckpoint.attach(metadataFileHandle)
 
-	# Load Gene Info Dictionary
-	tempPath = '{0}/GeneType/geneType.{1}.DICT.XZ'.format(geneDetailsPath, taxon)
-	geneInfoDict = XZRead(tempPath)
 
-	for gene in geneList:
-		gene = geneService.thawLite(gene)
-		gvo = geneService.loadFullyPopulatedValueObject(Long(gene.id))
+def ExportRow(gene):
+	# Metadata row of one gene (taxon and geneInfoDict: current taxon of the main loop)
+	# NOTE: Runs in worker threads in parallel mode (gene tables are read-only)
+	gene = geneService.thawLite(gene)
+	gvo = geneService.loadFullyPopulatedValueObject(Long(gene.id))
 
-		# Gene Type Details
-		geneType = 'NA'
-		if gene.ncbiGeneId in geneInfoDict:
-			geneType = geneInfoDict[gene.ncbiGeneId]
+	# Gene Type Details
+	geneType = 'NA'
+	if gene.ncbiGeneId in geneInfoDict:
+		geneType = geneInfoDict[gene.ncbiGeneId]
 
-		tempList = [taxon, gene.id, gene.ncbiGeneId, geneType]
-		tempList.extend([gvo.compositeSequenceCount, gvo.platformCount])
+	tempList = [taxon, gene.id, gene.ncbiGeneId, geneType]
+	tempList.extend([gvo.compositeSequenceCount, gvo.platformCount])
+	return tempList
 
-		tempList = map(FormatASCII, tempList)
-		metadataFileHandle.write('\t'.join(tempList) + '\n')
+
+print('Generating Gene Metadata')
+for taxon in taxonTuple:
+	# Taxa Completed Before the Checkpoint
+	if resumeKey is not None and taxonTuple.index(taxon) < taxonTuple.index(resumeKey[0]):
+		continue
+
+	# Shard Slice (Sorted by ID; Full List Without --shard/--range; Genes After the Checkpoint When Resumed)
+	geneList = ShardSelect(geneService.loadAll(taxonService.findByCommonName(taxon)), cliOpts.shard, cliOpts.range)
+	if resumeKey is not None and taxon == resumeKey[0]:
+		geneList = list(filter(lambda x: x.id > resumeKey[1], geneList))
+
+	# Load Gene Info Table (Memory-Mapped; Falls Back to Dictionary)
+	tempPath = '{0}/GeneType/geneType.{1}.GTAB'.format(geneDetailsPath, taxon)
+	if os.path.exists(tempPath):
+		geneInfoDict = GeneTable(tempPath)
+	else:
+		geneInfoDict = XZRead('{0}/GeneType/geneType.{1}.DICT.XZ'.format(geneDetailsPath, taxon))
+
+	# Progress Reporting (Time-Based Cadence); Failed Genes Checkpointed as [taxon, ID] (Non-Zero Exit Below)
+	geneProgress = ElapseProgress('Genes ({0})'.format(taxon), total = len(geneList), timer = globalTimer)
+	failFunc = lambda x: exportCheckpoint.fail([taxon, x])
+	if cliOpts.workers > 1:
+		# Parallel Mode (ID-Partitioned Workers; Rows Written in ID Order)
+		ParallelExport(sx, cliOpts.workers).run(geneList, ExportRow, exportCheckpoint.write, progress = geneProgress, failFunc = failFunc)
+	else:
+		SerialExport(geneList, ExportRow, exportCheckpoint.write, progress = geneProgress, failFunc = failFunc)
+
+	# Release Gene Info Table
+	if isinstance(geneInfoDict, GeneTable):
+		geneInfoDict.close()
 
 # Time Reporter
 print(globalTimer.getEndStamp())
 
-# Close File Handles
+# Close File Handles (Failed Genes Incl. Failures Before the Checkpoint When Resumed)
 metadataFileHandle.close()
+exportCheckpoint.finish()
+failList = list(exportCheckpoint.failList)
 
 # End Spring Session
 sx.shutDown()
+
+# Failed Genes (Reported After the Checkpoint; Exit Status 1 Unless --allow-failures)
+if len(failList) > 0:
+	print('ERROR: {0} genes failed; their rows are missing from the TSV'.format(len(failList)))
+	if not cliOpts.allow_failures:
+		sys.exit(1)
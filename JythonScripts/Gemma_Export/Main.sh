@@ -8,43 +8,89 @@ export SCRIPT_DIR=$HOME/
 export OUT_DIR=$HOME/Output/
 export GENE_DIR=$OUT_DIR/Dependencies/
 export LOG_DIR=$HOME/Logs/
+export PROFILE_DIR=$LOG_DIR
+export GEMMA_PROFILE=''
 export AUTO_JYTHON=''
+export EXPORT_WORKERS=1
+export SHARD_COUNT=4
+export SHARD_HOSTS=''
+# NOTE: EXPORT_INCREMENTAL='--incremental' recomputes changed entities only (options 1, 2 and 4)
+export EXPORT_INCREMENTAL=''
+# NOTE: EXPORT_RESUME='--resume' continues interrupted runs from their last checkpoint (options 1, 3, 6 and 7)
+export EXPORT_RESUME=''
+
+# 2. Shard Launcher (Options 6-7)
+# NOTE: Shards run as local processes, or round-robin over SHARD_HOSTS (space-separated; ssh; shared SCRIPT_DIR/OUT_DIR)
+# NOTE: Parts are merged (k-way by ID, header-checked) only when every shard succeeded (exit status 0; a shard with failed IDs exits 1); parts are kept otherwise
+RunShards() {
+  SHARD_SCRIPT=$1
+  SHARD_NAME=$2
+  shift 2
+  HOST_LIST=($SHARD_HOSTS)
+  PID_LIST=()
+
+  for SHARD_INDEX in $(seq 1 $SHARD_COUNT); do
+    SHARD_LOG=$LOG_DIR/$SHARD_NAME.part-$SHARD_INDEX.LOG
+    SHARD_CMD="$AUTO_JYTHON $SCRIPT_DIR/$SHARD_SCRIPT -u $GEMMA_USER -p $GEMMA_PASS --workers $EXPORT_WORKERS --shard $SHARD_INDEX/$SHARD_COUNT $EXPORT_RESUME"
+    if [ "${#HOST_LIST[@]}" == "0" ]; then
+      $SHARD_CMD 1> $SHARD_LOG &
+    else
+      SHARD_HOST=${HOST_LIST[$(( (SHARD_INDEX - 1) % ${#HOST_LIST[@]} ))]}
+      ssh $SHARD_HOST "OUT_DIR=$OUT_DIR GENE_DIR=$GENE_DIR PROFILE_DIR=$PROFILE_DIR GEMMA_PROFILE=$GEMMA_PROFILE $SHARD_CMD" 1> $SHARD_LOG &
+    fi
+    PID_LIST+=($!)
+  done
+
+  SHARD_FAIL=0
+  for SHARD_PID in "${PID_LIST[@]}"; do
+    wait $SHARD_PID || SHARD_FAIL=1
+  done
+  if [ "$SHARD_FAIL" != "0" ]; then
+    echo "ERROR: $SHARD_NAME shard failed; see $LOG_DIR/$SHARD_NAME.part-*.LOG"
+    return 1
+  fi
+
+  PART_LIST=$(seq -f "$OUT_DIR/$SHARD_NAME.part-%g.TSV" 1 $SHARD_COUNT)
+  $AUTO_JYTHON $SCRIPT_DIR/Export_Merge.py -o $OUT_DIR/$SHARD_NAME.TSV "$@" $PART_LIST 1>> $LOG_DIR/$SHARD_NAME.LOG && rm -f $PART_LIST
+}
 
 # ----- Run Jython Scripts -----
 
 if [ "$#" == "0" ]; then
-  echo "USAGE: Main.sh -[1-5]; Option List:"
+  echo "USAGE: Main.sh -[1-7]; Option List:"
   echo "1 = Experiments"
   echo "2 = Platforms"
   echo "3 = Genes"
   echo "4 = Experiment Tags"
   echo "5 = Blacklists"
+  echo "6 = Experiments (Sharded; SHARD_COUNT/SHARD_HOSTS)"
+  echo "7 = Genes (Sharded; SHARD_COUNT/SHARD_HOSTS)"
 fi
 
-while getopts "12345" OPT_STRING; do
+while getopts "1234567" OPT_STRING; do
   case "${OPT_STRING}" in
     1)
       echo "Case 1: Experiments"
       OUT_LOG=$LOG_DIR/EE_Export.LOG
-      $AUTO_JYTHON $SCRIPT_DIR/EE_Export.py -u $GEMMA_USER -p $GEMMA_PASS 1> $OUT_LOG
+      $AUTO_JYTHON $SCRIPT_DIR/EE_Export.py -u $GEMMA_USER -p $GEMMA_PASS --workers $EXPORT_WORKERS $EXPORT_INCREMENTAL $EXPORT_RESUME 1> $OUT_LOG
     ;;
 
     2)
       echo "Case 2: Platforms"
       OUT_LOG=$LOG_DIR/AD_Export.LOG
-      $AUTO_JYTHON $SCRIPT_DIR/AD_Export.py -u $GEMMA_USER -p $GEMMA_PASS 1> $OUT_LOG
+      $AUTO_JYTHON $SCRIPT_DIR/AD_Export.py -u $GEMMA_USER -p $GEMMA_PASS --workers $EXPORT_WORKERS $EXPORT_INCREMENTAL 1> $OUT_LOG
     ;;
 
     3)
       echo "Case 3: Genes"
       OUT_LOG=$LOG_DIR/Gene_Export.LOG
-      $AUTO_JYTHON $SCRIPT_DIR/Gene_Export.py -u $GEMMA_USER -p $GEMMA_PASS 1> $OUT_LOG
+      $AUTO_JYTHON $SCRIPT_DIR/Gene_Export.py -u $GEMMA_USER -p $GEMMA_PASS --workers $EXPORT_WORKERS $EXPORT_RESUME 1> $OUT_LOG
     ;;
 
     4)
       echo "Case 4: Experimental Tags"
       OUT_LOG=$LOG_DIR/EETag_Export.LOG
-      $AUTO_JYTHON $SCRIPT_DIR/EETag_Export.py -u $GEMMA_USER -p $GEMMA_PASS 1> $OUT_LOG
+      $AUTO_JYTHON $SCRIPT_DIR/EETag_Export.py -u $GEMMA_USER -p $GEMMA_PASS $EXPORT_INCREMENTAL 1> $OUT_LOG
     ;;
 
     5)
@@ -53,6 +99,16 @@ while getopts "12345" OPT_STRING; do
       $AUTO_JYTHON $SCRIPT_DIR/BL_Export.py -u $GEMMA_USER -p $GEMMA_PASS 1> $OUT_LOG
     ;;
 
+    6)
+      echo "Case 6: Experiments (Sharded)"
+      RunShards EE_Export.py EE_Export --key ee.ID
+    ;;
+
+    7)
+      echo "Case 7: Genes (Sharded)"
+      RunShards Gene_Export.py Gene_Export --key gene.ID --group gene.Taxon
+    ;;
+
     *)
     ;;
 
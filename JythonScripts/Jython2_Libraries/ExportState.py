@@ -0,0 +1,258 @@
+# Module for Incremental and Resumable Exports (sidecar state: last update time, input digest and row hashes; checkpoints)
+
+# Python Imports
+from __future__ import print_function
+import datetime
+import hashlib
+import json
+import os
+import time
+from PyVersion import PyCheckLenient
+from TSVUtils import TSVReader
+
+# Python Version Check
+# Requirement: Jython 2.7.X (CPython 2.7.X Bypass added for PyCharm Debugging)
+assert PyCheckLenient('Jython', '2', '7') or PyCheckLenient('CPython', '2', '7')
+
+
+def RowHash(lineList):
+	# Hash of the TSV lines of one entity (empty list for entities without rows)
+	return hashlib.md5('\n'.join(lineList).encode('utf-8')).hexdigest()[:16]
+
+
+def ReadGrouped(path, keyIndex = 0):
+	# Header and entity ID -> TSV lines of an export
+	lineDict = dict()
+	with TSVReader(path) as tempReader:
+		for everyRow in tempReader:
+			lineDict.setdefault(int(everyRow[keyIndex]), []).append('\t'.join(everyRow))
+		return tempReader.header, lineDict
+
+
+class ExportState:
+	# ExportState tracks an export TSV (EE_Export.TSV -> EE_Export.STATE.JSON) for incremental runs
+	# NOTE: lastUpdate is the begin time of the run that wrote the TSV (changes made during a run are picked up next time)
+	# NOTE: Previous rows are reused only when their hash matches the state; anything else is recomputed
+	# NOTE: Incremental output is ordered by ID; rows of recomputed entities come from collect, the rest from the previous TSV
+	# NOTE: Full runs hash rows as they are written (track); the TSV is not read back
+
+	def __init__(self, path, header, formatFunc = str, keyIndex = 0, inputDigest = None):
+		# Initialize (begin time recorded before any query)
+		self.path = path
+		self.statePath = '{0}.STATE.JSON'.format(path.rsplit('.', 1)[0])
+		self.header = list(header)
+		self.formatFunc = formatFunc
+		self.keyIndex = keyIndex
+		self.inputDigest = inputDigest
+		self.beginTime = time.time()
+		self.lastUpdate = None
+		self.previousDict = None
+		self.hashDict = None
+		self.currentSet = None
+		self.recomputeSet = None
+		self.computeDict = dict()
+		self.trackDict = dict()
+		self.trackKey = None
+		self.trackHash = None
+
+	def load(self):
+		# Read the previous TSV and state; False (full run) when either is missing, or header/input changed
+		if not (os.path.exists(self.path) and os.path.exists(self.statePath)):
+			print('Incremental: no previous export/state; full run')
+			return False
+		with open(self.statePath, 'r') as stateFile:
+			stateDict = json.load(stateFile)
+		if stateDict.get('inputDigest') != self.inputDigest:
+			print('Incremental: input changed; full run')
+			return False
+		previousHeader, previousDict = ReadGrouped(self.path, self.keyIndex)
+		if previousHeader != self.header:
+			print('Incremental: header changed; full run')
+			return False
+
+		self.lastUpdate = stateDict['lastUpdate']
+		self.previousDict = previousDict
+		self.hashDict = dict(map(lambda x: (int(x[0]), x[1]), stateDict['rows'].items()))
+		return True
+
+	def select(self, itemList, changedSet, keyFunc = lambda x: x.id):
+		# Items to recompute: changed since lastUpdate, new, or with rows not matching their hash; deletions are dropped
+		currentSet = set(map(keyFunc, itemList))
+		newSet = currentSet - set(self.hashDict)
+		badSet = set(filter(lambda x: RowHash(self.previousDict.get(x, [])) != self.hashDict[x], set(self.hashDict) & currentSet))
+		self.recomputeSet = (set(changedSet) & currentSet) | newSet | badSet
+		self.currentSet = currentSet
+		print('Incremental since {0}: {1} changed, {2} new, {3} unverified, {4} deleted, {5} reused'.format(
+			datetime.datetime.fromtimestamp(self.lastUpdate).strftime('%Y-%m-%d %H:%M:%S'),
+			len(set(changedSet) & currentSet - newSet), len(newSet), len(badSet - set(changedSet)),
+			len(set(self.hashDict) - currentSet), len(currentSet - self.recomputeSet)))
+		return list(filter(lambda x: keyFunc(x) in self.recomputeSet, itemList))
+
+	def collect(self, row):
+		# Keep a recomputed row (writeFunc of the export loop in incremental mode)
+		self.computeDict.setdefault(int(row[self.keyIndex]), []).append('\t'.join(map(self.formatFunc, row)))
+
+	def track(self, writeFunc):
+		# writeFunc that also hashes every written row (full runs; rows of an entity must be contiguous)
+		def trackedWrite(row):
+			self.record(row)
+			writeFunc(row)
+		return trackedWrite
+
+	def record(self, row):
+		# Hash one written row into its entity's RowHash (lines joined by newlines)
+		tempKey = int(row[self.keyIndex])
+		tempLine = '\t'.join(map(self.formatFunc, row))
+		if tempKey != self.trackKey:
+			self.closeTrack()
+			self.trackKey = tempKey
+			self.trackHash = hashlib.md5()
+		else:
+			self.trackHash.update(b'\n')
+		self.trackHash.update(tempLine.encode('utf-8'))
+
+	def trackFile(self, path):
+		# Hash the rows already in a TSV (resumed runs: rows written before the checkpoint)
+		for everyID, lineList in ReadGrouped(path, self.keyIndex)[1].items():
+			self.trackDict[everyID] = RowHash(lineList)
+
+	def closeTrack(self):
+		# Store the hash of the entity being tracked
+		if self.trackKey is not None:
+			self.trackDict[self.trackKey] = self.trackHash.hexdigest()[:16]
+			self.trackKey = None
+
+	def finish(self, idList, failList = ()):
+		# Write the merged TSV (incremental; temp file, then renamed) and save the state of the final TSV
+		# NOTE: Failed entities keep their previous rows and are left out of the state (recomputed next run)
+		failSet = set(failList)
+		emptyHash = RowHash([])
+		if self.recomputeSet is not None:
+			tempPath = '{0}.tmp'.format(self.path)
+			with open(tempPath, 'w') as outFile:
+				outFile.write('\t'.join(self.header) + '\n')
+				for everyID in sorted(self.currentSet):
+					if everyID in self.recomputeSet and everyID not in failSet:
+						lineList = self.computeDict.get(everyID, [])
+					else:
+						lineList = self.previousDict.get(everyID, [])
+					if len(lineList) > 0:
+						outFile.write('\n'.join(lineList) + '\n')
+			os.rename(tempPath, self.path)
+
+			# Row Hashes (Recomputed Entities From Their New Rows; Reused Entities Keep Their Verified Hash)
+			hashDict = dict()
+			for everyID in self.currentSet:
+				if everyID in self.recomputeSet:
+					hashDict[everyID] = RowHash(self.computeDict.get(everyID, []))
+				else:
+					hashDict[everyID] = self.hashDict[everyID]
+		else:
+			self.closeTrack()
+			hashDict = self.trackDict
+
+		stateDict = {
+			'lastUpdate': self.beginTime,
+			'lastUpdateStamp': datetime.datetime.fromtimestamp(self.beginTime).strftime('%Y-%m-%dT%H:%M:%S'),
+			'inputDigest': self.inputDigest,
+			'rows': dict(map(lambda x: (str(x), hashDict.get(x, emptyHash)), set(idList) - failSet))
+		}
+		tempPath = '{0}.tmp'.format(self.statePath)
+		with open(tempPath, 'w') as stateFile:
+			json.dump(stateDict, stateFile, sort_keys = True)
+		os.rename(tempPath, self.statePath)
+
+
+class ExportCheckpoint:
+	# ExportCheckpoint flushes an export TSV every `interval` seconds and records the key of the last fully written entity
+	# NOTE: State goes to EE_Export.TSV -> EE_Export.CHECKPOINT.JSON (with the TSV size at the checkpoint); finish removes it
+	# NOTE: Entities must be written in ascending key order; resume truncates the TSV to the checkpoint and returns the key
+	# NOTE: Failed keys (fail) are checkpointed too, so a resumed run reports failures from before the checkpoint
+
+	def __init__(self, path, header, keyFunc = lambda x: x[0], interval = 300.0):
+		# Initialize
+		self.path = path
+		self.checkPath = '{0}.CHECKPOINT.JSON'.format(path.rsplit('.', 1)[0])
+		self.header = list(header)
+		self.keyFunc = keyFunc
+		self.interval = interval
+		self.writer = None
+		self.lastKey = None
+		self.entityCount = 0
+		self.failList = []
+		self.checkTime = time.time()
+
+	def start(self, resumeFlag = False):
+		# Key to resume after (resumeFlag; see resume); a fresh run removes any previous checkpoint and returns None
+		if resumeFlag:
+			return self.resume()
+		if os.path.exists(self.checkPath):
+			os.remove(self.checkPath)
+		return None
+
+	def resume(self):
+		# Key of the last checkpointed entity (TSV truncated to its checkpoint size); None when there is nothing to resume
+		if not (os.path.exists(self.path) and os.path.exists(self.checkPath)):
+			print('Resume: no checkpoint; full run')
+			return None
+		with open(self.checkPath, 'r') as checkFile:
+			checkDict = json.load(checkFile)
+		if checkDict['header'] != self.header:
+			raise ValueError('Checkpoint header differs ({0})'.format(self.checkPath))
+
+		# TSV Must Hold the Checkpointed Rows (Size Within the File, Ending on a Complete Line)
+		with open(self.path, 'r+b') as tsvFile:
+			tsvFile.seek(0, os.SEEK_END)
+			if checkDict['size'] > tsvFile.tell():
+				raise ValueError('Checkpoint size exceeds the TSV ({0})'.format(self.path))
+			tsvFile.seek(checkDict['size'] - 1)
+			if tsvFile.read(1) != b'\n':
+				raise ValueError('Checkpoint size is not at a line end ({0})'.format(self.path))
+			tsvFile.truncate(checkDict['size'])
+		self.lastKey = checkDict['lastKey']
+		self.entityCount = checkDict['count']
+		self.failList = checkDict.get('failList', [])
+		print('Resume: after {0} ({1} entities written at {2})'.format(self.lastKey, checkDict['count'], checkDict['stamp']))
+		return self.lastKey
+
+	def attach(self, writer):
+		# TSVWriter of the export (opened in append mode when resuming)
+		self.writer = writer
+
+	def write(self, row):
+		# Write one row; checkpoint when due
+		# NOTE: The due check runs before the row is written, so every checkpointed entity is complete
+		tempKey = self.keyFunc(row)
+		if tempKey != self.lastKey:
+			if self.lastKey is not None and time.time() - self.checkTime >= self.interval:
+				self.save()
+			self.lastKey = tempKey
+			self.entityCount += 1
+		self.writer.write(row)
+
+	def fail(self, key):
+		# Record a failed entity (key as returned by keyFunc); it counts as written, so every checkpointed failure is at or before lastKey
+		self.failList.append(key)
+		self.lastKey = key
+
+	def save(self):
+		# Flush the TSV to disk and record the last written key and the TSV size
+		self.writer.flush(syncFlag = True)
+		checkDict = {
+			'lastKey': self.lastKey,
+			'count': self.entityCount,
+			'failList': self.failList,
+			'size': os.path.getsize(self.path),
+			'stamp': datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%S'),
+			'header': self.header
+		}
+		tempPath = '{0}.tmp'.format(self.checkPath)
+		with open(tempPath, 'w') as checkFile:
+			json.dump(checkDict, checkFile, sort_keys = True)
+		os.rename(tempPath, self.checkPath)
+		self.checkTime = time.time()
+
+	def finish(self):
+		# Completed export: the checkpoint is no longer needed
+		if os.path.exists(self.checkPath):
+			os.remove(self.checkPath)
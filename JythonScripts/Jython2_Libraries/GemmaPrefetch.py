@@ -0,0 +1,143 @@
+# Module for Bulk Prefetching of Gemma Experiments (ID-chunked HQL on a dedicated read-only Hibernate session; change queries)
+
+# Python Imports
+from __future__ import print_function
+from PyVersion import PyCheckLenient
+
+# Java Imports
+from java.lang import Long
+from java.util import ArrayList, Date
+
+# Python Version Check
+# Requirement: Jython 2.7.X (CPython 2.7.X Bypass added for PyCharm Debugging)
+assert PyCheckLenient('Jython', '2', '7') or PyCheckLenient('CPython', '2', '7')
+
+# Experiment Queries (Scalar Projections; Experiment ID First)
+# NOTE: Each query replaces one per-experiment service call (or lazy traversal) of EE_Export.py
+EE_QUERIES = {
+	'accession': 'select ee.id, acc.accession from ExpressionExperiment ee join ee.accession acc where ee.id in (:ids)',
+	'taxon': 'select ee.id, taxon.commonName from ExpressionExperiment ee join ee.bioAssays ba join ba.sampleUsed bm join bm.sourceTaxon taxon where ee.id in (:ids) and ba.id = (select min(fba.id) from ExpressionExperiment fee join fee.bioAssays fba where fee.id = ee.id)',
+	'sampleCount': 'select ee.id, count(distinct bm.id) from ExpressionExperiment ee join ee.bioAssays ba join ba.sampleUsed bm where ee.id in (:ids) group by ee.id',
+	'outlierCount': 'select ee.id, count(distinct bm.id) from ExpressionExperiment ee join ee.bioAssays ba join ba.sampleUsed bm where ba.isOutlier = true and ee.id in (:ids) group by ee.id',
+	'pmid': 'select ee.id, pa.accession from ExpressionExperiment ee join ee.primaryPublication pub join pub.pubAccession pa where ee.id in (:ids)',
+	'troubled': 'select ee.id, cd.troubled from ExpressionExperiment ee join ee.curationDetails cd where ee.id in (:ids)',
+	'platformTroubled': 'select distinct ee.id, ad.id from ExpressionExperiment ee join ee.bioAssays ba join ba.arrayDesignUsed ad join ad.curationDetails cd where cd.troubled = true and ee.id in (:ids)',
+	'platform': 'select distinct ee.id, ad.id, ad.shortName, ad.name, ad.technologyType from ExpressionExperiment ee join ee.bioAssays ba join ba.arrayDesignUsed ad where ee.id in (:ids)',
+	'reprocessed': 'select distinct ee.id, qt.isRecomputedFromRawData from ExpressionExperiment ee join ee.quantitationTypes qt where ee.id in (:ids)'
+}
+
+# Change Queries (Entity IDs With Curation Details or Audit Events Newer Than :since)
+CHANGE_QUERIES = [
+	'select e.id from {0} e join e.curationDetails cd where cd.lastUpdated > :since',
+	'select distinct e.id from {0} e join e.auditTrail tr join tr.events ev where ev.date > :since'
+]
+
+# Link Queries (Experiments <-> Platforms, Through Bioassays)
+PLATFORM_OF_EE = 'select distinct ad.id from ExpressionExperiment ee join ee.bioAssays ba join ba.arrayDesignUsed ad where ee.id in (:ids)'
+EE_OF_PLATFORM = 'select distinct ee.id from ExpressionExperiment ee join ee.bioAssays ba join ba.arrayDesignUsed ad where ad.id in (:ids)'
+
+
+def HQLRows(session, hql, idList):
+	# Rows (tuples) of an HQL query with the ID list bound to :ids
+	tempQuery = session.createQuery(hql)
+	tempQuery.setParameterList('ids', ArrayList(map(Long, idList)))
+	return list(map(tuple, tempQuery.list()))
+
+
+class EEPrefetch:
+	# EEPrefetch loads experiments and their export attributes in ID chunks (a fixed number of queries per chunk)
+	# NOTE: Records are dictionaries: entity, accession, taxon, sampleCount, outlierCount, pmid, troubled,
+	#       blacklisted, reprocessed and platformList ((id, shortName, name, technologyType), sorted by ID)
+	# NOTE: Entities are loaded in bulk but not thawed; callers thaw only where a service needs it
+
+	def __init__(self, sx, batchSize = 500, timer = None):
+		# Initialize (blacklisted accessions are loaded once)
+		assert batchSize > 0
+		self.experimentService = sx.getBean('expressionExperimentService')
+		self.sessionFactory = sx.getBean('sessionFactory')
+		self.batchSize = batchSize
+		self.timer = timer
+		self.blacklistSet = set(map(lambda x: x.accession, sx.getBean('blacklistedEntityDao').loadAllValueObjects()))
+
+	def fetch(self, idList):
+		# Experiment ID -> record for one chunk
+		idList = list(idList)
+		session = self.sessionFactory.openSession()
+		try:
+			session.setDefaultReadOnly(True)
+			rowDict = dict(map(lambda x: (x[0], HQLRows(session, x[1], idList)), EE_QUERIES.items()))
+		finally:
+			session.close()
+
+		recordDict = dict()
+		for everyID in idList:
+			recordDict[everyID] = {
+				'entity': None, 'accession': 'NA', 'taxon': 'NA', 'sampleCount': 0, 'outlierCount': 0, 'pmid': 'NA',
+				'troubled': False, 'blacklisted': False, 'reprocessed': False, 'platformList': []
+			}
+		for everyEntity in self.experimentService.load(ArrayList(map(Long, idList))):
+			recordDict[everyEntity.id]['entity'] = everyEntity
+
+		# Single-Valued Attributes (Taxon: Sample Taxon of the First Bioassay by ID, One Taxon Like getTaxon)
+		for fieldName in ['accession', 'taxon', 'sampleCount', 'outlierCount', 'pmid']:
+			for eeID, tempValue in rowDict[fieldName]:
+				recordDict[eeID][fieldName] = tempValue
+
+		# Flags (Troubled Incl. Platform Check; Blacklisted by Accession; Reprocessed if Any Quantitation Type)
+		for eeID, tempValue in rowDict['troubled']:
+			recordDict[eeID]['troubled'] = bool(tempValue)
+		for eeID, _ in rowDict['platformTroubled']:
+			recordDict[eeID]['troubled'] = True
+		for eeID, tempValue in rowDict['reprocessed']:
+			recordDict[eeID]['reprocessed'] = recordDict[eeID]['reprocessed'] or bool(tempValue)
+		for everyRecord in recordDict.values():
+			everyRecord['blacklisted'] = everyRecord['accession'] in self.blacklistSet
+
+		# Platforms
+		for everyRow in sorted(rowDict['platform'], key = lambda x: (x[0], x[1])):
+			recordDict[everyRow[0]]['platformList'].append(everyRow[1:])
+		return recordDict
+
+	def iterate(self, voList):
+		# Yield (value object, record) pairs; each chunk is fetched when the consumer reaches its first item
+		voList = list(voList)
+		for startIndex in range(0, len(voList), self.batchSize):
+			chunkList = voList[startIndex:startIndex + self.batchSize]
+			if self.timer is not None:
+				with self.timer.span('prefetch'):
+					recordDict = self.fetch(map(lambda x: x.id, chunkList))
+			else:
+				recordDict = self.fetch(map(lambda x: x.id, chunkList))
+			for everyVO in chunkList:
+				yield everyVO, recordDict[everyVO.id]
+
+
+def ChangedIDs(sx, entityName, since):
+	# IDs of entities (e.g. ExpressionExperiment, ArrayDesign) changed after since (epoch seconds)
+	session = sx.getBean('sessionFactory').openSession()
+	try:
+		session.setDefaultReadOnly(True)
+		changedSet = set()
+		for everyQuery in CHANGE_QUERIES:
+			tempQuery = session.createQuery(everyQuery.format(entityName))
+			tempQuery.setParameter('since', Date(Long(int(since * 1000))))
+			changedSet.update(map(int, tempQuery.list()))
+	finally:
+		session.close()
+	return changedSet
+
+
+def LinkedIDs(sx, hql, idList, batchSize = 500):
+	# IDs linked to idList through a single-column link query (PLATFORM_OF_EE, EE_OF_PLATFORM), in ID chunks
+	idList = sorted(idList)
+	session = sx.getBean('sessionFactory').openSession()
+	try:
+		session.setDefaultReadOnly(True)
+		linkedSet = set()
+		for startIndex in range(0, len(idList), batchSize):
+			tempQuery = session.createQuery(hql)
+			tempQuery.setParameterList('ids', ArrayList(map(Long, idList[startIndex:startIndex + batchSize])))
+			linkedSet.update(map(int, tempQuery.list()))
+	finally:
+		session.close()
+	return linkedSet
@@ -0,0 +1,111 @@
+# Module for Compact Gene Lookup Tables (sorted EntrezIDs + type codes; memory-mapped, binary search)
+
+# Python Imports
+import struct
+from PyVersion import PyCheckLenient
+
+# Java Imports (Memory-Mapped Reads; CPython 2.7 Bypass Reads the Table Into Memory)
+try:
+	from java.io import RandomAccessFile
+	from java.nio import ByteOrder
+	from java.nio.channels import FileChannel
+	javaFlag = True
+except ImportError:
+	javaFlag = False
+
+# Python Version Check
+# Requirement: Jython 2.7.X (CPython 2.7.X Bypass added for PyCharm Debugging)
+assert PyCheckLenient('Jython', '2', '7') or PyCheckLenient('CPython', '2', '7')
+
+# Layout (Little-Endian; Written by Python3_Libraries/GeneTable.py):
+#   Header:  magic 'GTAB', version (uint16), type count (uint16), gene count (uint64), name table bytes (uint64), 8 pad bytes
+#   Names:   type names, UTF-8, newline-separated (padded to 8 bytes)
+#   IDs:     gene count x int64 (ascending EntrezIDs)
+#   Codes:   gene count x uint8 (index into type names)
+GTAB_HEADER = struct.Struct('<4sHHQQ8x')
+GTAB_MAGIC = 'GTAB'
+GTAB_VERSION = 1
+
+
+def PadLength(length):
+	# Length rounded up to a multiple of 8 (keeps the ID block aligned)
+	return (length + 7) // 8 * 8
+
+
+class GeneTable:
+	# GeneTable maps a compact table read-only; lookups binary-search the ID block in place
+	# NOTE: Supports `in`, [], get and len; close releases the file
+
+	def __init__(self, path):
+		# Initialize (header and type names are read; IDs and codes stay in the mapping)
+		assert isinstance(path, str)
+		with open(path, mode = 'rb') as tableFile:
+			tempHeader = tableFile.read(GTAB_HEADER.size)
+			tempMagic, tempVersion, typeCount, geneCount, nameLength = GTAB_HEADER.unpack(tempHeader)
+			if tempMagic != GTAB_MAGIC or tempVersion != GTAB_VERSION:
+				raise IOError('Not a gene table ({0})'.format(path))
+			tempNames = tableFile.read(nameLength).decode('utf-8')
+
+		self.nameList = tempNames.split('\n') if typeCount > 0 else []
+		self.geneCount = int(geneCount)
+		self.idOffset = GTAB_HEADER.size + PadLength(nameLength)
+		self.codeOffset = self.idOffset + 8 * self.geneCount
+
+		if javaFlag:
+			self.tableFile = RandomAccessFile(path, 'r')
+			tableChannel = self.tableFile.getChannel()
+			self.tableBuffer = tableChannel.map(FileChannel.MapMode.READ_ONLY, 0, tableChannel.size())
+			self.tableBuffer.order(ByteOrder.LITTLE_ENDIAN)
+		else:
+			self.tableFile = None
+			with open(path, mode = 'rb') as tableFile:
+				self.tableBuffer = tableFile.read()
+
+	def __len__(self):
+		return self.geneCount
+
+	def geneAt(self, tempIndex):
+		# EntrezID at a position of the ID block
+		if javaFlag:
+			return self.tableBuffer.getLong(self.idOffset + 8 * tempIndex)
+		return struct.unpack_from('<q', self.tableBuffer, self.idOffset + 8 * tempIndex)[0]
+
+	def codeAt(self, tempIndex):
+		# Type code at a position of the code block
+		if javaFlag:
+			return self.tableBuffer.get(self.codeOffset + tempIndex) & 0xFF
+		return ord(self.tableBuffer[self.codeOffset + tempIndex])
+
+	def find(self, geneID):
+		# Position of geneID in the ID block (-1 if absent)
+		lowIndex = 0
+		highIndex = self.geneCount
+		while lowIndex < highIndex:
+			midIndex = (lowIndex + highIndex) // 2
+			if self.geneAt(midIndex) < geneID:
+				lowIndex = midIndex + 1
+			else:
+				highIndex = midIndex
+		if lowIndex < self.geneCount and self.geneAt(lowIndex) == geneID:
+			return lowIndex
+		return -1
+
+	def __contains__(self, geneID):
+		return self.find(geneID) >= 0
+
+	def __getitem__(self, geneID):
+		tempIndex = self.find(geneID)
+		if tempIndex < 0:
+			raise KeyError(geneID)
+		return self.nameList[self.codeAt(tempIndex)]
+
+	def get(self, geneID, default = None):
+		tempIndex = self.find(geneID)
+		return default if tempIndex < 0 else self.nameList[self.codeAt(tempIndex)]
+
+	def close(self):
+		# Release the file (the mapping itself is released by the JVM)
+		if self.tableFile is not None:
+			self.tableFile.close()
+			self.tableFile = None
+		self.tableBuffer = None
@@ -0,0 +1,196 @@
+# Module for Parallel Entity Exports (java.util.concurrent workers; single ordered writer; ID shards)
+
+# Python Imports
+from __future__ import print_function
+import sys
+from PyVersion import PyCheckLenient
+
+# Java Imports
+from java.lang import Thread
+from java.util.concurrent import ArrayBlockingQueue, Callable, Executors, ThreadFactory
+
+# Python Version Check
+# Requirement: Jython 2.7.X (CPython 2.7.X Bypass added for PyCharm Debugging)
+assert PyCheckLenient('Jython', '2', '7') or PyCheckLenient('CPython', '2', '7')
+
+# Declaring Global Variables
+# NOTE: Worker end marker on the result queue (index None)
+TASK_DONE = (None, None, None)
+
+
+def ShardName(shardText = None, rangeText = None):
+	# Part name of a shard ('part-i') or ID range ('part-LO-HI'); None without either
+	if shardText is not None and rangeText is not None:
+		raise ValueError('Shard and range are exclusive')
+	if shardText is not None:
+		return 'part-{0}'.format(shardText.split('/')[0])
+	if rangeText is not None:
+		lowText, highText = rangeText.split(':')
+		return 'part-{0}-{1}'.format(lowText or 'min', highText or 'max')
+	return None
+
+
+def ShardSelect(itemList, shardText = None, rangeText = None, keyFunc = lambda x: x.id):
+	# Slice of itemList for one shard or ID range, sorted by key; every item (sorted) without either
+	# NOTE: shardText 'i/N' keeps keys with key % N == i - 1 (i in 1..N); rangeText 'LO:HI' keeps LO <= key < HI (either end optional)
+	ShardName(shardText, rangeText)
+	if shardText is not None:
+		shardIndex, shardCount = map(int, shardText.split('/'))
+		if not 1 <= shardIndex <= shardCount:
+			raise ValueError('Invalid shard ({0})'.format(shardText))
+		keepFunc = lambda x: keyFunc(x) % shardCount == shardIndex - 1
+	elif rangeText is not None:
+		lowText, highText = rangeText.split(':')
+		lowKey = int(lowText) if len(lowText) > 0 else None
+		highKey = int(highText) if len(highText) > 0 else None
+		keepFunc = lambda x: (lowKey is None or keyFunc(x) >= lowKey) and (highKey is None or keyFunc(x) < highKey)
+	else:
+		keepFunc = lambda x: True
+	return sorted(filter(keepFunc, itemList), key = keyFunc)
+
+
+def PartPath(path, partName):
+	# Output path of a part ('EE_Export.TSV' -> 'EE_Export.part-1.TSV'); path itself without a part
+	if partName is None:
+		return path
+	tempRoot, tempExt = path.rsplit('.', 1)
+	return '{0}.{1}.{2}'.format(tempRoot, partName, tempExt)
+
+
+def EmitResult(itemKey, tempResult, writeFunc, failList, progress = None, failFunc = None):
+	# Write one (row, error text) result, or report its error (ERROR line, failList, progress error, failFunc)
+	tempRow, tempError = tempResult
+	if tempError is not None:
+		print('ERROR: {0}: {1}'.format(itemKey, tempError))
+		failList.append(itemKey)
+		if progress is not None:
+			progress.error()
+		if failFunc is not None:
+			failFunc(itemKey)
+		return
+	if tempRow is not None:
+		writeFunc(tempRow)
+	if progress is not None:
+		progress.update()
+
+
+def SerialExport(itemList, rowFunc, writeFunc, keyFunc = lambda x: x.id, iterFunc = list, progress = None, failFunc = None):
+	# Single-thread counterpart of ParallelExport.run (same key order and error handling); returns the keys of failed items
+	itemList = sorted(itemList, key = keyFunc)
+	failList = []
+	for itemIndex, tempItem in enumerate(iterFunc(itemList)):
+		try:
+			tempResult = (rowFunc(tempItem), None)
+		except:
+			errorType, errorValue = sys.exc_info()[:2]
+			tempResult = (None, '{0}: {1}'.format(errorType.__name__, errorValue))
+		EmitResult(keyFunc(itemList[itemIndex]), tempResult, writeFunc, failList, progress, failFunc)
+	if progress is not None:
+		progress.finish()
+	return failList
+
+
+class DaemonFactory(ThreadFactory):
+	# Daemon worker threads (a failed writer must not keep the JVM alive)
+
+	def newThread(self, runnable):
+		tempThread = Thread(runnable)
+		tempThread.setDaemon(True)
+		return tempThread
+
+
+class ExportTask(Callable):
+	# ExportTask computes the rows of one partition in a worker thread (own security context and Hibernate session)
+	# NOTE: Results are (global index, row, error text) tuples; TASK_DONE is always queued last
+
+	def __init__(self, runner, indexList, itemList):
+		# Initialize
+		self.runner = runner
+		self.indexList = indexList
+		self.itemList = itemList
+
+	def call(self):
+		runner = self.runner
+		resultQueue = runner.resultQueue
+		session = None
+		try:
+			session = runner.sx.attachThread()
+			for itemCount, tempItem in enumerate(runner.iterFunc(self.itemList), start = 1):
+				tempIndex = self.indexList[itemCount - 1]
+				try:
+					resultQueue.put((tempIndex, runner.rowFunc(tempItem), None))
+				except:
+					errorType, errorValue = sys.exc_info()[:2]
+					resultQueue.put((tempIndex, None, '{0}: {1}'.format(errorType.__name__, errorValue)))
+
+				# Release Loaded Entities (First-Level Cache) Every clearSize Items
+				if itemCount % runner.clearSize == 0:
+					session.clear()
+		finally:
+			resultQueue.put(TASK_DONE)
+			if session is not None:
+				runner.sx.detachThread(session)
+		return len(self.itemList)
+
+
+class ParallelExport:
+	# ParallelExport runs rowFunc over entities on `workers` threads and writes rows in key (ID) order from the caller thread
+	# NOTE: Items are sorted by keyFunc and dealt round-robin, so every worker walks its partition in ascending ID order
+	#       and the reorder buffer of the writer stays small
+	# NOTE: iterFunc maps a partition (list) to the items passed to rowFunc, one per entry and in order (e.g. EEPrefetch.iterate)
+	# NOTE: Failed items are reported (ERROR line, progress error, failFunc) and skipped; rowFunc returning None skips a row silently
+
+	def __init__(self, sx, workers, queueSize = 1024, clearSize = 500):
+		# Initialize
+		assert workers > 0 and queueSize > 0 and clearSize > 0
+		self.sx = sx
+		self.workers = workers
+		self.queueSize = queueSize
+		self.clearSize = clearSize
+		self.resultQueue = None
+		self.rowFunc = None
+		self.iterFunc = None
+
+	def run(self, itemList, rowFunc, writeFunc, keyFunc = lambda x: x.id, iterFunc = list, progress = None, failFunc = None):
+		# Export every item; returns the keys of failed items
+		itemList = sorted(itemList, key = keyFunc)
+		self.rowFunc = rowFunc
+		self.iterFunc = iterFunc
+		self.resultQueue = ArrayBlockingQueue(self.queueSize)
+
+		taskList = []
+		for workerIndex in range(min(self.workers, len(itemList))):
+			indexList = list(range(workerIndex, len(itemList), self.workers))
+			taskList.append(ExportTask(self, indexList, list(map(lambda x: itemList[x], indexList))))
+
+		taskPool = Executors.newFixedThreadPool(max(len(taskList), 1), DaemonFactory())
+		try:
+			futureList = list(map(taskPool.submit, taskList))
+
+			# Single Writer: Drain the Queue, Emit Rows in Index Order
+			failList = []
+			pendingDict = dict()
+			nextIndex = 0
+			doneCount = 0
+			while doneCount < len(taskList):
+				tempIndex, tempRow, tempError = self.resultQueue.take()
+				if tempIndex is None:
+					doneCount += 1
+					continue
+				pendingDict[tempIndex] = (tempRow, tempError)
+				while nextIndex in pendingDict:
+					EmitResult(keyFunc(itemList[nextIndex]), pendingDict.pop(nextIndex), writeFunc, failList, progress, failFunc)
+					nextIndex += 1
+
+			# Rows After a Gap (Worker Ended Early; Its Error Is Raised Below)
+			for tempIndex in sorted(pendingDict):
+				EmitResult(keyFunc(itemList[tempIndex]), pendingDict[tempIndex], writeFunc, failList, progress, failFunc)
+
+			for tempFuture in futureList:
+				tempFuture.get()
+		finally:
+			taskPool.shutdownNow()
+
+		if progress is not None:
+			progress.finish()
+		return failList
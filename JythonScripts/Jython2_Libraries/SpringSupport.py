@@ -2,20 +2,127 @@
 
 # Python Imports
 from __future__ import print_function
+import datetime
+import json
+import math
+import os
+import threading
+import time
+from array import array
 from PyVersion import PyCheckLenient
 
 # Java Imports
 from ubic.gemma.persistence.util import SpringContextUtil
+from org.springframework.security.core.context import SecurityContextHolder
+from org.springframework.transaction.support import TransactionSynchronizationManager
+try:
+	from org.springframework.orm.hibernate4 import SessionHolder
+except ImportError:
+	from org.springframework.orm.hibernate5 import SessionHolder
+try:
+	from java.lang import System
+	ClockFunc = lambda: System.nanoTime() / 1e9
+except ImportError:
+	ClockFunc = time.time
 
 # Python Version Check
 # Requirement: Jython 2.7.X (CPython 2.7.X Bypass added for PyCharm Debugging)
 assert PyCheckLenient('Jython', '2', '7') or PyCheckLenient('CPython', '2', '7')
 
+# Declaring Global Variables
+# NOTE: GEMMA_PROFILE (non-empty) turns on bean profiling; the JSON report goes to PROFILE_DIR when set
+HIBERNATE_STATS = [
+	'QueryExecutionCount', 'QueryExecutionMaxTime', 'PrepareStatementCount', 'TransactionCount', 'SessionOpenCount',
+	'EntityLoadCount', 'EntityFetchCount', 'CollectionLoadCount', 'CollectionFetchCount',
+	'SecondLevelCacheHitCount', 'SecondLevelCacheMissCount', 'QueryCacheHitCount', 'QueryCacheMissCount'
+]
+
+
+def Percentile(valueList, fraction):
+	# Nearest-rank percentile of a non-empty sequence
+	sortedList = sorted(valueList)
+	return sortedList[max(0, int(math.ceil(fraction * len(sortedList))) - 1)]
+
+
+class BeanProfiler:
+	# BeanProfiler accumulates per-method call latencies (seconds) of profiled beans
+	# NOTE: Latencies are kept (array of doubles) for exact p95; appends are lock-protected for worker threads
+
+	def __init__(self):
+		# Initialize
+		self.latencyDict = dict()
+		self.errorDict = dict()
+		self.statLock = threading.Lock()
+
+	def record(self, methodName, elapsed, errorFlag = False):
+		# Record a single call
+		with self.statLock:
+			latencyArray = self.latencyDict.get(methodName)
+			if latencyArray is None:
+				latencyArray = array('d')
+				self.latencyDict[methodName] = latencyArray
+			latencyArray.append(elapsed)
+			if errorFlag:
+				self.errorDict[methodName] = self.errorDict.get(methodName, 0) + 1
+
+	def getSummary(self):
+		# Method -> count, total, mean, p95, max (seconds) and errors
+		with self.statLock:
+			itemList = list(map(lambda x: (x[0], list(x[1])), self.latencyDict.items()))
+		return dict(map(lambda x: (x[0], {
+			'count': len(x[1]),
+			'total': round(sum(x[1]), 6),
+			'mean': round(sum(x[1]) / len(x[1]), 6),
+			'p95': round(Percentile(x[1], 0.95), 6),
+			'max': round(max(x[1]), 6),
+			'errors': self.errorDict.get(x[0], 0)
+		}), itemList))
+
+
+class ProfiledBean:
+	# ProfiledBean forwards attribute access to a bean (or Java class) and times every method call
+	# NOTE: Only Python-side calls are timed; the proxy must not be handed to Java code expecting the bean type
+
+	def __init__(self, bean, beanName, profiler):
+		# Initialize
+		self.__dict__['bean'] = bean
+		self.__dict__['beanName'] = beanName
+		self.__dict__['profiler'] = profiler
+		self.__dict__['methodDict'] = dict()
+
+	def __getattr__(self, attrName):
+		# Timed wrapper per method (cached); other attributes are returned as-is
+		tempMethod = self.methodDict.get(attrName)
+		if tempMethod is not None:
+			return tempMethod
+		tempAttr = getattr(self.bean, attrName)
+		if not callable(tempAttr):
+			return tempAttr
+
+		methodName = '{0}.{1}'.format(self.beanName, attrName)
+		profiler = self.profiler
+
+		def timedMethod(*args, **kwargs):
+			startTime = ClockFunc()
+			errorFlag = True
+			try:
+				tempResult = tempAttr(*args, **kwargs)
+				errorFlag = False
+				return tempResult
+			finally:
+				profiler.record(methodName, ClockFunc() - startTime, errorFlag)
+		self.methodDict[attrName] = timedMethod
+		return timedMethod
+
+	def __setattr__(self, attrName, value):
+		setattr(self.bean, attrName, value)
+
 
 class SpringSupport:
 	# Spring session object storing Gemma authentication tokens
+	# NOTE: With profiling on (GEMMA_PROFILE), getBean returns ProfiledBean proxies and shutDown prints a call report
 	
-	def __init__(self, username = None, password = None):
+	def __init__(self, username = None, password = None, profileFlag = None):
 		# Initialize Spring session and acquire authentication tokens
 		self.appCtx = SpringContextUtil.getApplicationContext(False, False, ["classpath*:ubic/gemma/cliContext-component-scan.xml"])
 		manAuthServ = self.appCtx.getBean('manualAuthenticationService')
@@ -32,11 +139,90 @@ class SpringSupport:
 				raise ValueError('Invalid Username/Password')
 			else:
 				print('Logged in as {0}'.format(username))
+
+		# Session Authentication (Copied Into Worker Thread Contexts)
+		self.authentication = SecurityContextHolder.getContext().getAuthentication()
+
+		# Bean Profiling (Optional; Hibernate Statistics Enabled Where Available)
+		self.profiler = None
+		self.hibernateStats = None
+		self.profileBegin = datetime.datetime.now()
+		if profileFlag is None:
+			profileFlag = len(os.getenv('GEMMA_PROFILE', '')) > 0
+		if profileFlag:
+			self.profiler = BeanProfiler()
+			try:
+				self.hibernateStats = self.appCtx.getBean('sessionFactory').getStatistics()
+				self.hibernateStats.setStatisticsEnabled(True)
+				self.hibernateStats.clear()
+			except:
+				self.hibernateStats = None
+			print('Bean Profiling: On [GEMMA_PROFILE]')
 	
 	def getBean(self, beanName):
-		# Accessing exposed objects
-		return self.appCtx.getBean(beanName)
+		# Accessing exposed objects (profiled proxy when profiling is on)
+		return self.profile(self.appCtx.getBean(beanName), beanName)
+	
+	def profile(self, obj, objName):
+		# Profiled proxy of any object with methods (e.g. static Java utility classes); obj itself when profiling is off
+		if self.profiler is None:
+			return obj
+		return ProfiledBean(obj, objName, self.profiler)
+
+	def getProfile(self):
+		# Machine-readable profile: per-method latencies and Hibernate statistics
+		hibernateDict = dict()
+		if self.hibernateStats is not None:
+			for statName in HIBERNATE_STATS:
+				try:
+					hibernateDict[statName] = int(getattr(self.hibernateStats, 'get{0}'.format(statName))())
+				except:
+					continue
+		return {
+			'begin': self.profileBegin.strftime('%Y-%m-%dT%H:%M:%S'),
+			'end': datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%S'),
+			'methods': self.profiler.getSummary(),
+			'hibernate': hibernateDict
+		}
+
+	def reportProfile(self):
+		# Print the call report (sorted by total time) and write JSON to PROFILE_DIR when set
+		tempProfile = self.getProfile()
+		print('-' * 20)
+		print('Bean Profile (Method: Calls; Total; Mean; p95; Max; Errors)')
+		for methodName, methodStat in sorted(tempProfile['methods'].items(), key = lambda x: -x[1]['total']):
+			print('{0}: {1}; {2:.2f}s; {3:.2f}ms; {4:.2f}ms; {5:.2f}ms; {6}'.format(methodName, methodStat['count'], methodStat['total'],
+				methodStat['mean'] * 1e3, methodStat['p95'] * 1e3, methodStat['max'] * 1e3, methodStat['errors']))
+		for statName in HIBERNATE_STATS:
+			if statName in tempProfile['hibernate']:
+				print('Hibernate {0}: {1}'.format(statName, tempProfile['hibernate'][statName]))
+
+		profileDir = os.getenv('PROFILE_DIR')
+		if profileDir:
+			tempPath = '{0}/SpringProfile.{1}.JSON'.format(profileDir.rstrip('/'), self.profileBegin.strftime('%Y%m%d-%H%M%S'))
+			with open(tempPath, 'w') as outFile:
+				json.dump(tempProfile, outFile, indent = 1, sort_keys = True)
+	
+	def attachThread(self):
+		# Worker thread setup: own security context (session authentication) and own Hibernate session bound to the thread
+		# NOTE: Transactional services called from the thread join the bound session; returns the session for detachThread
+		securityContext = SecurityContextHolder.createEmptyContext()
+		securityContext.setAuthentication(self.authentication)
+		SecurityContextHolder.setContext(securityContext)
+
+		sessionFactory = self.appCtx.getBean('sessionFactory')
+		session = sessionFactory.openSession()
+		TransactionSynchronizationManager.bindResource(sessionFactory, SessionHolder(session))
+		return session
+
+	def detachThread(self, session):
+		# Worker thread teardown: unbind and close the Hibernate session; clear the security context
+		TransactionSynchronizationManager.unbindResource(self.appCtx.getBean('sessionFactory'))
+		session.close()
+		SecurityContextHolder.clearContext()
 	
 	def shutDown(self):
-		# End Spring session
+		# End Spring session (profile report first, while Hibernate statistics are still reachable)
+		if self.profiler is not None:
+			self.reportProfile()
 		self.appCtx.close()
@@ -0,0 +1,155 @@
+# Module for TSV Reading and Writing (compiled column projections; block-buffered reads; batched writes)
+# NOTE: Shared by CPython 3.7 and Jython 2.7; Python3_Libraries/TSVUtils.py and Jython2_Libraries/TSVUtils.py are kept identical
+
+# Python Imports
+import os
+import sys
+from operator import itemgetter
+from PyVersion import PyCheckLenient
+
+# Python Version Check
+# Requirement: CPython 3.7.X or Jython 2.7.X (CPython 2.7.X Bypass added for PyCharm Debugging)
+assert PyCheckLenient('CPython', '3', '7') or PyCheckLenient('Jython', '2', '7') or PyCheckLenient('CPython', '2', '7')
+
+# Declaring Global Variables
+TSV_BUFFER = 1024 * 1024
+TSV_BATCH = 4096
+TSV_OPEN = {'encoding': 'utf-8'} if sys.version_info[0] >= 3 else dict()
+
+
+def TSVProjection(indexList, typeList = None):
+	# Compiled column projection: split line (list) -> tuple of values (typed where typeList has a callable)
+	# NOTE: Replaces RSlice on hot paths; built once, no per-call checks
+	# NOTE: Typed projections are compiled to a single lambda expression (one call per row, not per field)
+	assert isinstance(indexList, (list, tuple)) and len(indexList) > 0
+	assert all(map(lambda x: isinstance(x, int), indexList))
+	assert typeList is None or len(typeList) == len(indexList)
+
+	typeFlag = typeList is not None and any(map(lambda x: x is not None, typeList))
+	if len(indexList) == 1:
+		tempGetter = itemgetter(indexList[0])
+		if not typeFlag:
+			return lambda x: (tempGetter(x),)
+		tempType = typeList[0]
+		return lambda x: (tempType(tempGetter(x)),)
+
+	if not typeFlag:
+		return itemgetter(*indexList)
+	typeDict = dict(map(lambda x: ('t{0}'.format(x[0]), x[1]), filter(lambda x: x[1] is not None, enumerate(typeList))))
+	fieldList = list(map(lambda x: 'x[{0}]'.format(x[1]) if typeList[x[0]] is None else 't{0}(x[{1}])'.format(*x), enumerate(indexList)))
+	return eval('lambda x: ({0},)'.format(', '.join(fieldList)), typeDict)
+
+
+def MultiValue(value, separator = '|', empty = '-'):
+	# Multi-valued field ('|'-separated; '-' = none) as a tuple; usable as a TSVProjection type
+	return () if value == empty else tuple(value.split(separator))
+
+
+class TSVReader:
+	# TSVReader iterates (typed) rows of a TSV file, projected to the requested columns
+	# NOTE: Columns are header names or 0-based indices (None = all columns, untyped)
+	# NOTE: Text is read in blocks of ~bufferSize characters and split only up to the last needed column
+
+	def __init__(self, path, columns = None, types = None, header = True, bufferSize = TSV_BUFFER):
+		# Initialize (header is read immediately; columns resolved against it)
+		assert isinstance(path, str)
+		assert columns is None or isinstance(columns, (list, tuple))
+		self.path = path
+		self.bufferSize = bufferSize
+		self.inFile = open(path, 'rt', bufferSize, **TSV_OPEN)
+		self.header = None
+		if header:
+			self.header = self.inFile.readline().rstrip('\n').split('\t')
+
+		if columns is None:
+			assert types is None
+			self.columns = None
+			self.splitCount = -1
+			self.project = tuple
+		else:
+			self.columns = list(map(lambda x: self.header.index(x) if isinstance(x, str) else x, columns))
+			self.splitCount = max(self.columns) + 1
+			self.project = TSVProjection(self.columns, types)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def __iter__(self):
+		# Rows are produced lazily within each block (no per-block row lists)
+		# NOTE: Explicit loop, not map over repeat(): Python 2 map pads to the longest iterable instead of stopping
+		splitCount = self.splitCount
+		project = self.project
+		tailText = ''
+		while True:
+			tempBlock = self.inFile.read(self.bufferSize)
+			if len(tempBlock) == 0:
+				break
+			tempBlock = tailText + tempBlock
+			cutOffset = tempBlock.rfind('\n')
+			tailText = tempBlock[cutOffset + 1:]
+			if cutOffset < 0:
+				continue
+			lineList = tempBlock[:cutOffset].split('\n')
+			for everyLine in lineList:
+				yield project(everyLine.split('\t', splitCount))
+		if len(tailText) > 0:
+			yield project(tailText.split('\t', splitCount))
+
+	def close(self):
+		self.inFile.close()
+
+
+class TSVWriter:
+	# TSVWriter formats rows into TSV lines and writes them in batches of batchSize lines
+	# NOTE: formatFunc converts every field (str by default; Jython exports pass StrUtils.FormatASCII)
+	# NOTE: flush pushes the pending batch through to the OS (close flushes); syncFlag also forces it to disk
+
+	def __init__(self, path, header = None, formatFunc = str, batchSize = TSV_BATCH, appendFlag = False):
+		# Initialize (header is written unless appending)
+		assert isinstance(path, str)
+		self.path = path
+		self.formatFunc = formatFunc
+		self.batchSize = batchSize
+		self.batchList = []
+		self.outFile = open(path, 'at' if appendFlag else 'wt', TSV_BUFFER, **TSV_OPEN)
+		if header is not None and not appendFlag:
+			self.outFile.write('\t'.join(header) + '\n')
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def write(self, row):
+		# Queue a single row
+		self.batchList.append('\t'.join(map(self.formatFunc, row)))
+		if len(self.batchList) >= self.batchSize:
+			self.writeBatch()
+
+	def writeMany(self, rowIter):
+		# Queue every row of an iterable
+		for everyRow in rowIter:
+			self.write(everyRow)
+
+	def writeBatch(self):
+		# Hand the pending batch to the file buffer (single write call)
+		if len(self.batchList) > 0:
+			self.outFile.write('\n'.join(self.batchList) + '\n')
+			del self.batchList[:]
+
+	def flush(self, syncFlag = False):
+		# Pending batch and file buffer to the OS (and disk)
+		self.writeBatch()
+		self.outFile.flush()
+		if syncFlag:
+			os.fsync(self.outFile.fileno())
+
+	def close(self):
+		if self.outFile is not None:
+			self.writeBatch()
+			self.outFile.close()
+			self.outFile = None
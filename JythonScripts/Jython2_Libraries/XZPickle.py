@@ -1,6 +1,7 @@
 # Module for Lazy-Pickling with Compression (open + pickle + xz)
 
 # Python Imports
+import os
 import pickle
 import shlex
 import subprocess
@@ -10,29 +11,67 @@ from PyVersion import PyCheckLenient
 # Requirement: Jython 2.7.X (CPython 2.7.X Bypass added for PyCharm Debugging)
 assert PyCheckLenient('Jython', '2', '7') or PyCheckLenient('CPython', '2', '7')
 
+# Pickled Size (Caller Hint) From Which Multithreaded xz Is Used
+XZ_THREAD_THRESHOLD = 32 * 1024 * 1024
 
-def XZWrite(obj, path, thread = 16, compression = 6):
+
+class XZStreamWriter:
+	# XZStreamWriter is a write-only sink for pickle.dump, streamed through an xz -T {thread} subprocess
+	# NOTE: Jython has no lzma module; nothing is buffered beyond the pipe
+
+	def __init__(self, outFile, thread = 1, compression = 6):
+		# Initialize
+		tempCommand = shlex.split('xz -z -T {0} -{1} -c'.format(thread, compression))
+		self.xzPopen = subprocess.Popen(tempCommand, stdin = subprocess.PIPE, stdout = outFile)
+
+	def write(self, data):
+		self.xzPopen.stdin.write(data)
+
+	def close(self):
+		# Finish compression; returns True on success
+		self.xzPopen.stdin.close()
+		return self.xzPopen.wait() == 0
+
+
+def XZWrite(obj, path, thread = 16, compression = 6, sizeHint = None, threshold = XZ_THREAD_THRESHOLD):
 	# Convenience wrapper for writing pickled-compressed objects
+	# NOTE: Single-threaded xz by default; xz -T {thread} when sizeHint (expected pickled bytes) reaches threshold
+	# NOTE: threshold = None never uses threads; threshold = 0 always does
 	assert isinstance(path, str)
 	assert isinstance(thread, int)
 	assert isinstance(compression, int)
 	assert 0 <= compression <= 9
-	
-	tempFile = open(path, mode = 'wb')
-	tempPickle = pickle.dumps(obj = obj, protocol = 2)
-	tempCommand = shlex.split('xz -z -T {0} -{1} -c'.format(thread, compression))
-	tempPopen = subprocess.Popen(tempCommand, stdin = subprocess.PIPE, stdout = tempFile)
-	tempResponse = tempPopen.communicate(tempPickle)
-	tempFile.close()
+	assert sizeHint is None or (isinstance(sizeHint, int) and sizeHint >= 0)
+	assert threshold is None or (isinstance(threshold, int) and threshold >= 0)
+	threadFlag = threshold is not None and (threshold == 0 or (sizeHint is not None and sizeHint >= threshold))
+
+	# Atomic Write (Temp File + Rename; Destination Never Holds Partial Data)
+	tempPath = '{0}.tmp'.format(path)
+	with open(tempPath, mode = 'wb') as tempFile:
+		streamWriter = XZStreamWriter(tempFile, thread = thread if threadFlag else 1, compression = compression)
+		try:
+			pickle.dump(obj, streamWriter, 2)
+		except BaseException:
+			streamWriter.close()
+			tempFile.close()
+			os.remove(tempPath)
+			raise
+		successFlag = streamWriter.close()
+
+	if not successFlag:
+		os.remove(tempPath)
+		raise IOError('xz compression failed ({0})'.format(path))
+	os.rename(tempPath, path)
 
 
 def XZRead(path):
-	# Convenience wrapper for reading pickled-compressed objects
+	# Convenience wrapper for reading pickled-compressed objects (streamed from xz; no intermediate copy)
 	assert isinstance(path, str)
-	tempFile = open(path, mode = 'rb')
 	tempCommand = shlex.split('xz -d -c')
-	tempPopen = subprocess.Popen(tempCommand, stdin = tempFile, stdout = subprocess.PIPE)
-	tempPickle = tempPopen.communicate()[0]
-	tempFile.close()
-	tempObject = pickle.loads(tempPickle)
+	with open(path, mode = 'rb') as tempFile:
+		tempPopen = subprocess.Popen(tempCommand, stdin = tempFile, stdout = subprocess.PIPE)
+		tempObject = pickle.load(tempPopen.stdout)
+		tempPopen.stdout.close()
+		if tempPopen.wait() != 0:
+			raise IOError('xz decompression failed ({0})'.format(path))
 	return tempObject
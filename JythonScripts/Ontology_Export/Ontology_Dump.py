@@ -27,7 +27,7 @@ cliOpts = cliParser.parse_args()
 os.chdir('{0}/Ontology/'.format(os.getenv('DATA_CACHE_DIR')))
 
 # Logging Processing Time
-globalTimer = ElapseTime()
+globalTimer = ElapseTime(name = 'Ontology_Dump')
 print(globalTimer.getBeginStamp())
 
 # Start Spring Session and Service Declarations
@@ -0,0 +1,106 @@
+# Benchmark: gene_info Gene Type Parser
+# 1. Generates a Synthetic gene_info (Plain and gzip)
+# 2. Compares Legacy (full split + tupleSet + per-taxon passes) and Single-Pass Chunked Parsing: Time, Peak Memory
+
+# Python Imports
+import argparse
+import gzip
+import os
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from PyVersion import PyCheckLenient
+from IterUtils import RSlice
+from GeneInfo import GeneTypeParse
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# CLI Generation and Parsing
+cliParser = argparse.ArgumentParser()
+cliParser.add_argument('-n', required = False, default = 1000000, type = int, help = 'Number of gene_info rows; integer-type')
+cliParser.add_argument('-w', required = False, default = os.cpu_count(), type = int, help = 'Parser processes; integer-type')
+cliOpts = cliParser.parse_args()
+
+# Declaring Global Variables
+targetList = ['9606', '10090', '10116', '7955', '7227', '6239', '4932']
+otherList = list(map(str, range(100000, 100200)))
+typeList = ['protein-coding', 'ncRNA', 'pseudo', 'tRNA', 'rRNA', 'snoRNA', 'other', 'unknown']
+headerLine = '#tax_id\tGeneID\tSymbol\tLocusTag\tSynonyms\tdbXrefs\tchromosome\tmap_location\tdescription\ttype_of_gene\t' \
+	'Symbol_from_nomenclature_authority\tFull_name_from_nomenclature_authority\tNomenclature_status\tOther_designations\tModification_date\tFeature_type\n'
+
+
+def syntheticLine(geneID):
+	# Synthetic gene_info row (~10% target taxa, as in the full NCBI file)
+	taxonID = random.choice(targetList) if random.random() < 0.1 else random.choice(otherList)
+	tempList = [taxonID, str(geneID), 'SYM{0}'.format(geneID), '-', 'ALIAS1|ALIAS2', 'GeneID:{0}|Ensembl:ENSG{0:011d}'.format(geneID)]
+	tempList.extend([str(random.randint(1, 22)), '1p36.33', 'synthetic gene {0} description text'.format(geneID), random.choice(typeList)])
+	tempList.extend(['SYM{0}'.format(geneID), 'synthetic gene {0}'.format(geneID), 'O', 'other designations|more designations', '20240101', '-'])
+	return '\t'.join(tempList) + '\n'
+
+
+def legacyParse(inPath):
+	# Baseline (Gemma_GeneType_Parse.py prior to GeneInfo)
+	tupleSet = set()
+	with open(inPath, mode = 'rt', encoding = 'utf-8', newline = '\n') as inFile:
+		for everyLine in inFile:
+			if everyLine.startswith('#'):
+				continue
+			tempArray = everyLine.strip('\n').split('\t')
+			if tempArray[0] not in targetList:
+				continue
+			tupleSet.add(tuple(RSlice(tempArray, [0, 1, 9])))
+
+	taxonDict = dict()
+	for taxonID in targetList:
+		finalDict = dict()
+		for (currentTaxon, currentGene, currentType) in tupleSet:
+			if currentTaxon == taxonID:
+				finalDict[int(currentGene)] = currentType
+		taxonDict[taxonID] = finalDict
+	return taxonDict
+
+
+# ------------------------------ MAIN ------------------------------
+random.seed(0)
+tempDir = tempfile.mkdtemp()
+try:
+	plainPath = os.path.join(tempDir, 'gene_info')
+	with open(plainPath, mode = 'wt', encoding = 'utf-8', newline = '\n') as outFile:
+		outFile.write(headerLine)
+		for geneID in range(1, cliOpts.n + 1):
+			outFile.write(syntheticLine(geneID))
+	gzipPath = plainPath + '.gz'
+	with open(plainPath, mode = 'rb') as inFile, gzip.open(gzipPath, mode = 'wb', compresslevel = 6) as outFile:
+		shutil.copyfileobj(inFile, outFile)
+	print('gene_info: {0} rows; {1:.1f} MB ({2:.1f} MB gzip)'.format(cliOpts.n, os.path.getsize(plainPath) / 1e6, os.path.getsize(gzipPath) / 1e6))
+
+	benchList = [
+		('Legacy (plain)', lambda: legacyParse(plainPath)),
+		('Single-pass (plain, 1 proc)', lambda: GeneTypeParse(plainPath, targetList, workers = 1)),
+		('Single-pass (plain, {0} proc)'.format(cliOpts.w), lambda: GeneTypeParse(plainPath, targetList, workers = cliOpts.w)),
+		('Single-pass (gzip, 1 proc)', lambda: GeneTypeParse(gzipPath, targetList, workers = 1)),
+		('Single-pass (gzip, {0} proc)'.format(cliOpts.w), lambda: GeneTypeParse(gzipPath, targetList, workers = cliOpts.w))
+	]
+
+	referenceDict = None
+	for benchName, benchFunc in benchList:
+		# Peak Memory (Main Process) and Time
+		tracemalloc.start()
+		startTime = time.perf_counter()
+		taxonDict = benchFunc()
+		elapsedTime = time.perf_counter() - startTime
+		peakMemory = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+
+		# Identical Output
+		referenceDict = taxonDict if referenceDict is None else referenceDict
+		assert taxonDict == referenceDict
+
+		print('{0:<30} Time: {1:.2f}s; Rate: {2:.0f} rows/s; Peak (Main Process): {3:.1f} MB; Genes: {4}'.format(
+			benchName, elapsedTime, cliOpts.n / elapsedTime, peakMemory / 1e6, sum(map(len, taxonDict.values()))))
+finally:
+	shutil.rmtree(tempDir)
@@ -0,0 +1,62 @@
+# Benchmark: Gene Type Lookup Formats
+# 1. Generates a Synthetic Human-Sized EntrezID: (Gene Type) Dictionary
+# 2. Compares Pickled Dictionary (XZRead) and Compact Table (GeneTable): Load Time, Memory, Lookup Rate, File Size
+
+# Python Imports
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from PyVersion import PyCheckLenient
+from XZPickle import XZRead, XZWrite
+from GeneTable import GeneTable, GeneTableWrite
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# CLI Generation and Parsing
+cliParser = argparse.ArgumentParser()
+cliParser.add_argument('-n', required = False, default = 200000, type = int, help = 'Number of genes; integer-type')
+cliParser.add_argument('-l', required = False, default = 100000, type = int, help = 'Number of lookups; integer-type')
+cliOpts = cliParser.parse_args()
+
+# Declaring Global Variables
+typeList = ['protein-coding', 'ncRNA', 'pseudo', 'tRNA', 'rRNA', 'snoRNA', 'scRNA', 'snRNA', 'biological-region', 'other', 'unknown']
+
+# ------------------------------ MAIN ------------------------------
+random.seed(0)
+geneDict = dict(map(lambda x: (x, random.choice(typeList)), random.sample(range(1, 150000000), cliOpts.n)))
+lookupList = random.sample(list(geneDict), cliOpts.l // 2) + random.sample(range(1, 150000000), cliOpts.l // 2)
+
+with tempfile.TemporaryDirectory() as tempDir:
+	dictPath = os.path.join(tempDir, 'geneType.human.DICT.XZ')
+	tablePath = os.path.join(tempDir, 'geneType.human.GTAB')
+	XZWrite(obj = geneDict, path = dictPath, protocol = 2)
+	GeneTableWrite(geneDict = geneDict, path = tablePath)
+
+	benchList = [
+		('Dictionary (XZRead)', dictPath, XZRead),
+		('Compact table (mmap)', tablePath, GeneTable)
+	]
+	for benchName, benchPath, benchLoader in benchList:
+		# Load Time and Resident Python Objects
+		tracemalloc.start()
+		startTime = time.perf_counter()
+		geneLookup = benchLoader(benchPath)
+		loadTime = time.perf_counter() - startTime
+		loadMemory = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+
+		# Lookup Rate (Half Hits, Half Misses; Gene_Export.py Access Pattern)
+		startTime = time.perf_counter()
+		resultList = list(map(lambda x: geneLookup[x] if x in geneLookup else 'NA', lookupList))
+		lookupTime = time.perf_counter() - startTime
+		assert resultList == list(map(lambda x: geneDict.get(x, 'NA'), lookupList))
+
+		print('{0:<22} Load: {1:8.2f} ms; Python Heap: {2:7.2f} MB; Lookups: {3:.2f} M/s; File: {4:.2f} MB'.format(
+			benchName, loadTime * 1e3, loadMemory / 1e6, len(lookupList) / lookupTime / 1e6, os.path.getsize(benchPath) / 1e6))
+		if isinstance(geneLookup, GeneTable):
+			geneLookup.close()
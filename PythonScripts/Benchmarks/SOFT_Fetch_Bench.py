@@ -0,0 +1,72 @@
+# Benchmark: Concurrent SOFT Download Engine
+# 1. Serves Synthetic SOFT Records from a Local Stand-in HTTP Server
+# 2. Times the Download Engine (GSE_Dump.py) Across Worker Counts
+
+# Python Imports
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PyVersion import PyCheckLenient
+from IterUtils import BoundedMap
+from GEOFetch import SOFTFetcher
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# CLI Generation and Parsing
+cliParser = argparse.ArgumentParser()
+cliParser.add_argument('-n', required = False, default = 200, type = int, help = 'Number of requests; integer-type')
+cliParser.add_argument('-d', required = False, default = 0.05, type = float, help = 'Server latency (seconds); float-type')
+cliParser.add_argument('-w', required = False, default = [1, 4, 8, 16], type = int, nargs = '+', help = 'Worker counts; integer-type')
+cliOpts = cliParser.parse_args()
+
+# Synthetic SOFT Record
+softBody = '\n'.join([
+	'^SERIES = GSE0',
+	'!Series_title = Synthetic series',
+	'!Series_type = Expression profiling by array',
+	'!Series_sample_organism = Homo sapiens',
+	'!Series_platform_id = GPL570'
+] + ['!Series_sample_id = GSM{0}'.format(x) for x in range(50)]).encode('utf-8')
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+	# acc.cgi stand-in with fixed latency
+	protocol_version = 'HTTP/1.1'
+
+	def do_GET(self):
+		time.sleep(cliOpts.d)
+		self.send_response(200)
+		self.send_header('Content-Type', 'text/plain')
+		self.send_header('Content-Length', str(len(softBody)))
+		self.end_headers()
+		self.wfile.write(softBody)
+
+	def log_message(self, *args):
+		pass
+
+
+# ------------------------------ MAIN ------------------------------
+standInServer = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+threading.Thread(target = standInServer.serve_forever, daemon = True).start()
+standInLink = 'http://127.0.0.1:{0}/geo/query/acc.cgi'.format(standInServer.server_address[1])
+print('Stand-in Server: {0}'.format(standInLink))
+
+entryList = ['GSE{0}'.format(x) for x in range(cliOpts.n)]
+baseTime = None
+for workerCount in cliOpts.w:
+	softFetcher = SOFTFetcher(link = standInLink, workers = workerCount)
+	startTime = time.perf_counter()
+	resultList = list(BoundedMap(lambda x: softFetcher.fetch(x).text, entryList, workers = workerCount))
+	elapsedTime = time.perf_counter() - startTime
+	softFetcher.close()
+
+	if baseTime is None:
+		baseTime = elapsedTime
+	failCount = sum(map(lambda x: x[2] is not None, resultList))
+	print('Workers: {0:>3}; Time: {1:.2f}s; Rate: {2:.1f}/s; Speedup: {3:.1f}x; Failed: {4}'.format(
+		workerCount, elapsedTime, len(entryList)/elapsedTime, baseTime/elapsedTime, failCount))
+
+standInServer.shutdown()
@@ -0,0 +1,87 @@
+# Benchmark: Streaming SOFT Parser
+# 1. Generates a Synthetic SOFT Corpus
+# 2. Compares Legacy (text + splitlines) and Streaming Conversion: Time, Peak Memory, Cached Size
+
+# Python Imports
+import argparse
+import io
+import lzma
+import pickle
+import random
+import time
+import tracemalloc
+from PyVersion import PyCheckLenient
+from SOFTParse import SOFTParse
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# CLI Generation and Parsing
+cliParser = argparse.ArgumentParser()
+cliParser.add_argument('-n', required = False, default = 500, type = int, help = 'Number of records; integer-type')
+cliParser.add_argument('-s', required = False, default = 400, type = int, help = 'Samples per record; integer-type')
+cliOpts = cliParser.parse_args()
+
+# Declaring Global Variables
+projectionSet = frozenset(['Series_type', 'Series_sample_organism'])
+organismList = ['Homo sapiens', 'Mus musculus', 'Rattus norvegicus', 'Danio rerio']
+typeList = ['Expression profiling by array', 'Expression profiling by high throughput sequencing', 'Other']
+
+
+def syntheticRecord(recordIndex):
+	# Synthetic brief SOFT record (series header + sample/contributor lines)
+	tempList = ['^SERIES = GSE{0}'.format(recordIndex)]
+	tempList.append('!Series_title = Synthetic series {0}'.format(recordIndex))
+	tempList.append('!Series_summary = {0}'.format('lorem ipsum ' * 200))
+	tempList.append('!Series_type = {0}'.format(random.choice(typeList)))
+	tempList.append('!Series_sample_organism = {0}'.format(random.choice(organismList)))
+	tempList.append('!Series_platform_id = GPL{0}'.format(random.randint(1, 30000)))
+	tempList.extend('!Series_sample_id = GSM{0}'.format(recordIndex * cliOpts.s + x) for x in range(cliOpts.s))
+	tempList.extend('!Series_contributor = Author,{0}'.format(x) for x in range(20))
+	return '\n'.join(tempList) + '\n'
+
+
+def legacyParse(responseText):
+	# Baseline conversion (GSE_Dump.py prior to SOFTParse)
+	tempDict = dict()
+	responseList = responseText.splitlines()
+	for everyLine in responseList:
+		if not everyLine.startswith('!'):
+			continue
+		tempList = everyLine.lstrip('!').partition(' = ')
+		if tempList[2] != '':
+			if tempList[0] not in tempDict:
+				tempDict[tempList[0]] = set()
+			tempDict[tempList[0]].add(tempList[2])
+	return tempDict
+
+
+# ------------------------------ MAIN ------------------------------
+random.seed(0)
+corpusList = [syntheticRecord(x).encode('utf-8') for x in range(cliOpts.n)]
+print('Corpus: {0} records; {1:.1f} MB'.format(cliOpts.n, sum(map(len, corpusList)) / 1e6))
+
+benchList = [
+	('Legacy (text + splitlines)', lambda x: legacyParse(x.decode('utf-8'))),
+	('Streaming', lambda x: SOFTParse(io.BytesIO(x))),
+	('Streaming + Projection', lambda x: SOFTParse(io.BytesIO(x), keySet = projectionSet))
+]
+
+for benchName, benchFunc in benchList:
+	# Throughput
+	startTime = time.perf_counter()
+	resultList = [benchFunc(x) for x in corpusList]
+	elapsedTime = time.perf_counter() - startTime
+
+	# Peak Memory Per Record (Conversion Only; Response Bytes Excluded)
+	tracemalloc.start()
+	benchFunc(corpusList[0])
+	peakMemory = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+
+	# Cached Size (Protocol 2, XZ Preset 6)
+	cacheSize = sum(len(lzma.compress(pickle.dumps(x, protocol = 2), preset = 6)) for x in resultList[:100])
+
+	print('{0:<28} Time: {1:.3f}s; Rate: {2:.0f} rec/s; Peak/Record: {3:.1f} KB; Cached/Record: {4:.2f} KB'.format(
+		benchName, elapsedTime, cliOpts.n / elapsedTime, peakMemory / 1024, cacheSize / min(100, cliOpts.n) / 1024))
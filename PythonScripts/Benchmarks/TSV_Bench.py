@@ -0,0 +1,179 @@
+# Benchmark: TSV Parsing and Writing
+# 1. Generates Synthetic Gene_Export.TSV and gene_info Files
+# 2. Compares Hand-Rolled Parsing (strip + full split + index/RSlice) and TSVUtils (compiled projection, bounded split, block reads)
+# 3. Compares Per-Row Writes and Batched TSVWriter
+
+# Python Imports
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from PyVersion import PyCheckLenient
+from IterUtils import RSlice
+from TSVUtils import TSVProjection, TSVReader, TSVWriter
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# CLI Generation and Parsing
+cliParser = argparse.ArgumentParser()
+cliParser.add_argument('-n', required = False, default = 500000, type = int, help = 'Number of rows per file; integer-type')
+cliParser.add_argument('-r', required = False, default = 3, type = int, help = 'Repetitions (best time is reported); integer-type')
+cliOpts = cliParser.parse_args()
+
+# Declaring Global Variables
+taxonList = ['human', 'mouse', 'rat', 'zebrafish', 'fly', 'worm', 'yeast']
+typeList = ['protein-coding', 'ncRNA', 'pseudo', 'tRNA', 'rRNA', 'snoRNA', 'other', 'unknown']
+geneHeader = ['gene.Taxon', 'gene.ID', 'gene.EntrezID', 'gene.Type', 'gene.NumCS', 'gene.NumAD']
+infoHeader = ['#tax_id', 'GeneID', 'Symbol', 'LocusTag', 'Synonyms', 'dbXrefs', 'chromosome', 'map_location', 'description', 'type_of_gene']
+infoHeader.extend(['Symbol_from_nomenclature_authority', 'Full_name_from_nomenclature_authority', 'Nomenclature_status'])
+infoHeader.extend(['Other_designations', 'Modification_date', 'Feature_type'])
+
+
+def BestTime(benchFunc):
+	# Best wall time over the repetitions (and the last result)
+	bestTime = None
+	for _ in range(cliOpts.r):
+		startTime = time.perf_counter()
+		tempResult = benchFunc()
+		elapsedTime = time.perf_counter() - startTime
+		bestTime = elapsedTime if bestTime is None else min(bestTime, elapsedTime)
+	return bestTime, tempResult
+
+
+def GeneRow(geneIndex):
+	# Synthetic Gene_Export.TSV row
+	return [random.choice(taxonList), geneIndex, random.randint(1, 100000000), random.choice(typeList), random.randint(0, 20), random.randint(0, 5)]
+
+
+def InfoRow(geneIndex):
+	# Synthetic gene_info row
+	tempList = [str(random.choice([9606, 10090, 10116])), str(geneIndex), 'SYM{0}'.format(geneIndex), '-', 'ALIAS1|ALIAS2']
+	tempList.extend(['GeneID:{0}|Ensembl:ENSG{0:011d}'.format(geneIndex), str(random.randint(1, 22)), '1p36.33'])
+	tempList.extend(['synthetic gene {0} description text'.format(geneIndex), random.choice(typeList), 'SYM{0}'.format(geneIndex)])
+	tempList.extend(['synthetic gene {0}'.format(geneIndex), 'O', 'other designations|more designations', '20240101', '-'])
+	return tempList
+
+
+def LegacyGeneSet(path):
+	# Baseline (AD_Export.py protein-coding gene sets)
+	geneDict = dict(map(lambda x: (x, set()), taxonList))
+	with open(path, mode = 'rt') as geneFile:
+		for lineIndex, everyLine in enumerate(geneFile):
+			if lineIndex == 0:
+				continue
+			tempArray = everyLine.strip('\n').split('\t')
+			if tempArray[3] == 'protein-coding' and int(tempArray[4]) > 0:
+				geneDict[tempArray[0]].add(int(tempArray[2]))
+	return geneDict
+
+
+def TSVGeneSet(path):
+	# TSVReader (projected rows; integers converted on hits only, as in AD_Export.py)
+	geneDict = dict(map(lambda x: (x, set()), taxonList))
+	geneColumns = ['gene.Taxon', 'gene.EntrezID', 'gene.Type', 'gene.NumCS']
+	with TSVReader(path, columns = geneColumns) as geneReader:
+		for taxon, entrezID, geneType, numCS in geneReader:
+			if geneType == 'protein-coding' and int(numCS) > 0:
+				geneDict[taxon].add(int(entrezID))
+	return geneDict
+
+
+def TSVTypedGeneSet(path):
+	# TSVReader (typed, projected rows)
+	geneDict = dict(map(lambda x: (x, set()), taxonList))
+	geneColumns = ['gene.Taxon', 'gene.EntrezID', 'gene.Type', 'gene.NumCS']
+	with TSVReader(path, columns = geneColumns, types = [None, int, None, int]) as geneReader:
+		for taxon, entrezID, geneType, numCS in geneReader:
+			if geneType == 'protein-coding' and numCS > 0:
+				geneDict[taxon].add(entrezID)
+	return geneDict
+
+
+def LegacyGeneInfo(path):
+	# Baseline (Gemma_GeneType_Parse.py prior to GeneInfo: full split + RSlice)
+	resultList = []
+	with open(path, mode = 'rt') as inFile:
+		for everyLine in inFile:
+			if everyLine.startswith('#'):
+				continue
+			tempArray = everyLine.strip('\n').split('\t')
+			resultList.append(tuple(RSlice(tempArray, [0, 1, 9])))
+	return resultList
+
+
+def TSVGeneInfo(path):
+	# TSVReader (split bounded to the type column)
+	with TSVReader(path, columns = [0, 1, 9]) as infoReader:
+		return list(infoReader)
+
+
+def LegacyWrite(path, rowList):
+	# Baseline (per-row '\t'.join + write)
+	with open(path, mode = 'wt') as outFile:
+		outFile.write('\t'.join(geneHeader) + '\n')
+		for everyRow in rowList:
+			tempList = map(str, everyRow)
+			outFile.write('\t'.join(tempList) + '\n')
+
+
+def TSVWrite(path, rowList):
+	# TSVWriter (batched writelines)
+	with TSVWriter(path, header = geneHeader) as outWriter:
+		for everyRow in rowList:
+			outWriter.write(everyRow)
+
+
+# ------------------------------ MAIN ------------------------------
+random.seed(0)
+tempDir = tempfile.mkdtemp()
+try:
+	genePath = os.path.join(tempDir, 'Gene_Export.TSV')
+	geneRows = list(map(GeneRow, range(cliOpts.n)))
+	LegacyWrite(genePath, geneRows)
+	infoPath = os.path.join(tempDir, 'gene_info')
+	with open(infoPath, mode = 'wt') as outFile:
+		outFile.write('\t'.join(infoHeader) + '\n')
+		for geneIndex in range(cliOpts.n):
+			outFile.write('\t'.join(InfoRow(geneIndex)) + '\n')
+	print('Rows: {0}; Gene_Export.TSV: {1:.1f} MB; gene_info: {2:.1f} MB'.format(cliOpts.n, os.path.getsize(genePath) / 1e6, os.path.getsize(infoPath) / 1e6))
+
+	# 1. Projection Only (Pre-Split Rows)
+	splitRows = list(map(lambda x: '\t'.join(x).split('\t'), map(InfoRow, range(min(cliOpts.n, 200000)))))
+	tempProjection = TSVProjection([0, 1, 9])
+	benchList = [
+		('RSlice', lambda: list(map(lambda x: RSlice(x, [0, 1, 9]), splitRows))),
+		('TSVProjection', lambda: list(map(tempProjection, splitRows)))
+	]
+	for benchName, benchFunc in benchList:
+		elapsedTime, _ = BestTime(benchFunc)
+		print('[Projection] {0:<24} {1:.2f} M rows/s'.format(benchName, len(splitRows) / elapsedTime / 1e6))
+
+	# 2. Reading (Identical Results Required)
+	benchList = [
+		('Gene_Export.TSV', 'Legacy (AD_Export)', lambda: LegacyGeneSet(genePath)),
+		('Gene_Export.TSV', 'TSVReader', lambda: TSVGeneSet(genePath)),
+		('Gene_Export.TSV', 'TSVReader (typed)', lambda: TSVTypedGeneSet(genePath)),
+		('gene_info', 'Legacy (full split)', lambda: LegacyGeneInfo(infoPath)),
+		('gene_info', 'TSVReader', lambda: TSVGeneInfo(infoPath))
+	]
+	referenceDict = dict()
+	for fileName, benchName, benchFunc in benchList:
+		elapsedTime, tempResult = BestTime(benchFunc)
+		referenceDict.setdefault(fileName, tempResult)
+		assert tempResult == referenceDict[fileName]
+		print('[Read] {0:<16} {1:<24} {2:.2f}s; {3:.2f} M rows/s'.format(fileName, benchName, elapsedTime, cliOpts.n / elapsedTime / 1e6))
+
+	# 3. Writing (Identical Files Required)
+	legacyPath = os.path.join(tempDir, 'Legacy.TSV')
+	batchPath = os.path.join(tempDir, 'Batched.TSV')
+	for benchName, benchFunc in [('Per-row write', lambda: LegacyWrite(legacyPath, geneRows)), ('TSVWriter', lambda: TSVWrite(batchPath, geneRows))]:
+		elapsedTime, _ = BestTime(benchFunc)
+		print('[Write] {0:<24} {1:.2f}s; {2:.2f} M rows/s'.format(benchName, elapsedTime, cliOpts.n / elapsedTime / 1e6))
+	with open(legacyPath, mode = 'rb') as legacyFile, open(batchPath, mode = 'rb') as batchFile:
+		assert legacyFile.read() == batchFile.read()
+finally:
+	shutil.rmtree(tempDir)
@@ -0,0 +1,73 @@
+# Benchmark: XZPickle Backends
+# 1. Generates Synthetic GSE-like Dictionaries of Increasing Size
+# 2. Compares xz Subprocess and In-Process LZMA: Write/Read Time, Compressed Size, Cross-Readability
+
+# Python Imports
+import argparse
+import os
+import random
+import tempfile
+import time
+from PyVersion import PyCheckLenient
+from XZPickle import XZRead, XZWrite
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# CLI Generation and Parsing
+cliParser = argparse.ArgumentParser()
+cliParser.add_argument('-r', required = False, default = 20, type = int, help = 'Repetitions per size; integer-type')
+cliParser.add_argument('-t', required = False, default = 16, type = int, help = 'xz threads; integer-type')
+cliParser.add_argument('--sizes', required = False, default = '10,100,1000,10000,100000', type = str, help = 'Samples per object (comma-separated)')
+cliOpts = cliParser.parse_args()
+
+# Backends: (Name, Write Options, Read Options)
+backendList = [
+	('xz -T {0}'.format(cliOpts.t), {'threshold': 0, 'thread': cliOpts.t}, {'thread': cliOpts.t}),
+	('lzma (in-process)', {'threshold': None}, {}),
+	('auto (default)', {}, {})
+]
+
+
+def syntheticDict(sampleCount):
+	# Synthetic GSE dictionary (field -> set of values)
+	tempDict = dict()
+	tempDict['Series_title'] = {'Synthetic series {0}'.format(random.randint(1, 10 ** 6))}
+	tempDict['Series_summary'] = {' '.join(random.choice(['lorem', 'ipsum', 'dolor', 'sit', 'amet']) for _ in range(200))}
+	tempDict['Series_type'] = {'Expression profiling by array'}
+	tempDict['Series_sample_organism'] = {'Homo sapiens', 'Mus musculus'}
+	tempDict['Series_sample_id'] = set('GSM{0}'.format(random.randint(1, 10 ** 7)) for _ in range(sampleCount))
+	return tempDict
+
+
+# ------------------------------ MAIN ------------------------------
+random.seed(0)
+with tempfile.TemporaryDirectory() as tempDir:
+	for sampleCount in map(int, cliOpts.sizes.split(',')):
+		tempObject = syntheticDict(sampleCount)
+		repeatCount = max(1, cliOpts.r if sampleCount <= 10000 else cliOpts.r // 10)
+		print('Samples: {0}'.format(sampleCount))
+
+		pathList = []
+		for backendName, writeOpts, readOpts in backendList:
+			tempPath = os.path.join(tempDir, '{0}.{1}.DICT.XZ'.format(sampleCount, len(pathList)))
+			pathList.append(tempPath)
+
+			startTime = time.perf_counter()
+			for _ in range(repeatCount):
+				XZWrite(tempObject, tempPath, **writeOpts)
+			writeTime = (time.perf_counter() - startTime) / repeatCount
+
+			startTime = time.perf_counter()
+			for _ in range(repeatCount):
+				assert XZRead(tempPath, **readOpts) == tempObject
+			readTime = (time.perf_counter() - startTime) / repeatCount
+
+			print('  {0:<20} Write: {1:8.2f} ms; Read: {2:8.2f} ms; Size: {3:8.1f} KB'.format(
+				backendName, writeTime * 1e3, readTime * 1e3, os.path.getsize(tempPath) / 1024))
+
+		# Format Compatibility (Every File Readable By Every Backend)
+		for tempPath in pathList:
+			for _, _, readOpts in backendList:
+				assert XZRead(tempPath, **readOpts) == tempObject
@@ -4,13 +4,23 @@
 # Python imports
 import argparse
 import os
-import requests
 import re
-from ftplib import FTP
+import sys
+import time
 from datetime import datetime
 from PyVersion import PyCheckLenient
-from ElapseTime import ElapseTime
-from XZPickle import XZWrite
+from ElapseTime import ElapseTime, ElapseProgress
+from XZPickle import XZWrite, XZReadMany
+from IterUtils import BoundedMap
+from GEOFetch import SOFTFetcher, ESearchClient
+from NCBIScheduler import NCBIScheduler
+from SOFTParse import SOFTParse
+from GEOStore import GEOStore
+from GEOManifest import GEOManifest, Reconcile, DictDigest
+from FTPList import FTPLister
+from RunJournal import RunJournal
+from GEOIndex import GEOIndex, IndexTerms, INDEX_FIELDS
+from GEORefresh import GEODateStamp, MLSDStamp, AgePolicy, MTimePolicy, LastUpdatePolicy, ChangedSetPolicy, policyList
 
 # Python Version Check
 # Requirement: CPython 3.7.X
@@ -20,142 +30,341 @@ assert PyCheckLenient('CPython', '3', '7')
 cliParser = argparse.ArgumentParser()
 cliParser.add_argument('-c', required = False, default = False, action = 'store_true', help = 'Clear data cache')
 cliParser.add_argument('-n', required = False, default = None, type = int, help = 'Download N entries; integer-type')
+cliParser.add_argument('-w', '--workers', required = False, default = 1, type = int, help = 'Concurrent downloads; integer-type')
+cliParser.add_argument('--url', required = False, default = 'https://www.ncbi.nlm.nih.gov/geo/query/acc.cgi', help = 'SOFT endpoint (e.g. local stand-in server)')
+cliParser.add_argument('--rate', required = False, default = None, type = float, help = 'Request ceiling per second (Default: 3, or 10 with NCBI_API_KEY); float-type')
+cliParser.add_argument('-k', '--keys', required = False, default = None, nargs = '+', help = 'Retain only listed SOFT keys (e.g. Series_title); refresh dates and indexed fields are always kept')
+cliParser.add_argument('-s', '--store', required = False, default = False, action = 'store_true', help = 'Write to packed store (GeoData/GSE_Store) instead of per-entry files')
+cliParser.add_argument('--ftp', required = False, default = 'ftp.ncbi.nlm.nih.gov', help = 'FTP host[:port] (e.g. local stand-in server)')
+cliParser.add_argument('--ftp-workers', required = False, default = 4, type = int, help = 'Pooled FTP connections; integer-type')
+cliParser.add_argument('--policy', required = False, default = 'age', choices = policyList, help = 'Refresh policy for cached entries (Default: age; 180 days)')
+cliParser.add_argument('--dry-run', required = False, default = False, action = 'store_true', help = 'Report reconciliation plan from the manifest (no network access)')
+cliParser.add_argument('--resume', required = False, default = False, action = 'store_true', help = 'Resume an interrupted run from its journal (no FTP listing)')
+cliParser.add_argument('--rebuild', required = False, default = False, action = 'store_true', help = 'Rebuild cache manifest from cache contents')
 cliOpts = cliParser.parse_args()
 
 # Declaring Global Variables
 os.chdir('{0}/GeoData/GSE/'.format(os.getenv('DL_CACHE_DIR')))
 ftpPath = '/geo/series/'
-globalTimer = ElapseTime()
+expiryAge = 180 * 24 * 60 * 60
+ftpCachePath = '{0}/GeoData/GSE_FTP_CACHE.PKL'.format(os.getenv('DL_CACHE_DIR'))
+ncbiScheduler = NCBIScheduler(rate = cliOpts.rate)
+# NOTE: --keys never drops the fields the manifest (last update date; lastupdate policy) and inverted index (submission date) rely on
+requiredKeySet = frozenset(('Series_last_update_date', 'Series_submission_date') + INDEX_FIELDS)
+keySet = None if cliOpts.keys is None else frozenset(cliOpts.keys) | requiredKeySet
+geoStore = None
+geoManifest = GEOManifest('{0}/GeoData/GSE_MANIFEST.PKL'.format(os.getenv('DL_CACHE_DIR')))
+runJournal = RunJournal('{0}/GeoData/GSE_JOURNAL.TSV'.format(os.getenv('DL_CACHE_DIR')))
+geoIndex = GEOIndex('{0}/GeoData/GSE_POSTINGS.PKL'.format(os.getenv('DL_CACHE_DIR')))
+if cliOpts.store:
+	geoStore = GEOStore('{0}/GeoData/GSE_Store/'.format(os.getenv('DL_CACHE_DIR')))
+	geoManifest = GEOManifest('{0}/GeoData/GSE_Store/MANIFEST.PKL'.format(os.getenv('DL_CACHE_DIR')))
+	runJournal = RunJournal('{0}/GeoData/GSE_Store/JOURNAL.TSV'.format(os.getenv('DL_CACHE_DIR')))
+	geoIndex = GEOIndex('{0}/GeoData/GSE_Store/POSTINGS.PKL'.format(os.getenv('DL_CACHE_DIR')))
+globalTimer = ElapseTime(name = 'GSE_Dump')
 print(globalTimer.getBeginStamp())
 
 # ------------------------------ MAIN ------------------------------
 # Clear Cache
 if cliOpts.c:
 	print('Emptying Cache [-c flag]')
-	cacheFiles = os.listdir()
-	for everyFile in cacheFiles:
-		os.remove(everyFile)
+	if geoStore is not None:
+		geoStore.clear()
+	else:
+		cacheFiles = os.listdir()
+		for everyFile in cacheFiles:
+			os.remove(everyFile)
+	geoManifest.clear()
+	geoIndex.clear()
+
+# Load Cache Manifest (Rebuilt From Cache Contents If Missing)
+if cliOpts.rebuild or not geoManifest.loaded:
+	print('Rebuilding Cache Manifest', flush = True)
+	if geoStore is not None:
+		geoManifest.rebuildFromStore(geoStore)
+	else:
+		geoManifest.rebuildFromDir('.')
+	geoManifest.save()
+
+# Recover Interrupted Run (Replay Journaled Completions Into Manifest, Drop Partial Temp Files)
+# NOTE: Completions whose record is missing (or differs in size) in the store/cache are dropped and fetched again
+journalState = runJournal.load()
+reindexSet = set()
+if journalState is not None and not journalState[3] and not cliOpts.c:
+	if geoStore is not None:
+		storedDict = dict(map(lambda x: (x[0], x[2]), geoStore.records()))
+	else:
+		storedDict = dict(map(lambda x: (x[:-len('.DICT.XZ')], os.path.getsize(x)), filter(lambda x: x.endswith('.DICT.XZ'), os.listdir())))
+	for everyEntry in list(journalState[1]):
+		if storedDict.get(everyEntry) != int(journalState[1][everyEntry][2]):
+			del journalState[1][everyEntry]
+	print('Recovering Interrupted Run: {0} / {1} entries completed'.format(len(journalState[1]), len(journalState[0])), flush = True)
+	for everyEntry, fieldList in journalState[1].items():
+		lastUpdate = float(fieldList[3]) if fieldList[3] != '' else None
+		geoManifest.update(everyEntry, float(fieldList[0]), fieldList[1], int(fieldList[2]), lastUpdate)
+	geoManifest.save()
+	reindexSet.update(journalState[1])
+
+	if geoStore is None:
+		for everyFile in os.listdir():
+			if everyFile.endswith('.tmp'):
+				os.remove(everyFile)
+
+# Synchronize Inverted Index With Manifest (Full Rebuild If Missing; Otherwise Only Differences)
+if cliOpts.rebuild or not geoIndex.loaded:
+	geoIndex.clear()
+indexedSet = geoIndex.keys()
+for everyEntry in indexedSet - set(geoManifest.records()):
+	geoIndex.remove(everyEntry)
+reindexSet = (reindexSet | (set(geoManifest.records()) - indexedSet)) & set(geoManifest.records())
+if len(reindexSet) > 0:
+	print('Indexing Cached Entries: {0}'.format(len(reindexSet)), flush = True)
+	with globalTimer.span('reindex'):
+		if geoStore is not None:
+			for everyEntry, tempDict in geoStore.iterItems(accessionSet = reindexSet):
+				geoIndex.update(everyEntry, tempDict)
+		else:
+			indexReader = XZReadMany(map(lambda x: '{0}.DICT.XZ'.format(x), sorted(reindexSet)), func = IndexTerms)
+			for tempPath, termTuple in indexReader:
+				geoIndex.update(tempPath[:-len('.DICT.XZ')], termTuple = termTuple)
+		geoIndex.save()
+del indexedSet, reindexSet
+
+print('Cached Entries: {0}'.format(len(geoManifest)))
+previousRunTime = geoManifest.remoteTime
 
 # Print Limit
 if cliOpts.n is not None:
 	print('Entry Limit: {0} [-n flag]'.format(cliOpts.n))
 
-# Parse FTP Directory (Multi-Step to Avoid Timeout)
-safeDeleteFlag = True
-entryList = []
-
-# 1. Obtain Directories
-print('Loading Parent Directory', flush = True)
-with FTP('ftp.ncbi.nlm.nih.gov', timeout = 300) as ftp:
-	ftp.login()
-	ftp.cwd(dirname = ftpPath)
-	dirList = list(filter(lambda x: re.match(pattern = '^GSE[0-9]*nnn$', string = x), ftp.nlst()))
-	ftp.quit()
-
-# 2. Obtain Entries
-print('Obtaining Individual Entries', flush = True)
-dirList.sort()
-for dirIndex, dirName in enumerate(dirList, start = 1):
-	if dirIndex % 20 == 0:
-		print('Parsed: {0} / {1}'.format(dirIndex, len(dirList)), flush = True)
-
-	retryCount = 0
-	loopFlag = True
-	while loopFlag:
-		if retryCount == 3:
-			loopFlag = False
-			safeDeleteFlag = False
-			print('ERROR: Directory {0} could not be processed'.format(dirName), flush = True)
-			continue
-
-		elif retryCount > 0:
-			print('WARN: Retrieval repeat for directory {0}'.format(dirName))
+# Print Concurrency
+if cliOpts.workers > 1:
+	print('Concurrent Downloads: {0} [--workers flag]'.format(cliOpts.workers))
+
+# Print Key Projection
+if keySet is not None:
+	print('Retained Keys: {0} [--keys flag]'.format(', '.join(sorted(keySet))))
+
+# Print Rate Ceiling
+print('Request Ceiling: {0:.1f}/s (API Key: {1})'.format(ncbiScheduler.bucket.ceiling, ncbiScheduler.apiKey is not None))
+
+# Print Refresh Policy
+print('Refresh Policy: {0} [--policy flag]'.format(cliOpts.policy))
+
 
+def listingModify(dirDict):
+	# Accession -> FTP modification time (epoch seconds) from GSEnnn directory listings
+	modifyDict = dict()
+	for entryList in dirDict.values():
+		for tempName, tempType, tempModify in entryList:
+			if tempType == 'dir':
+				modifyDict[tempName] = MLSDStamp(tempModify)
+	return modifyDict
+
+
+def buildPolicy(modifyDict):
+	# Refresh policy selected by --policy (age fallback when change information is unavailable)
+	if cliOpts.policy == 'mtime':
+		return MTimePolicy(expiryAge, modifyDict)
+	elif cliOpts.policy == 'lastupdate':
+		return LastUpdatePolicy(expiryAge, geoManifest.updateDict)
+	elif cliOpts.policy == 'esearch' and previousRunTime is not None:
 		try:
-			with FTP('ftp.ncbi.nlm.nih.gov', timeout = 420) as ftp:
-				ftp.login()
-				ftp.cwd(dirname = '{0}{1}'.format(ftpPath, dirName))
-				subdirList = filter(lambda x: re.match(pattern = '^GSE[0-9]+$', string = x), ftp.nlst())
-				entryList.extend(subdirList)
-				ftp.quit()
-			loopFlag = False
-
-		except:
-			retryCount += 1
-
-del dirList
-print('Total Entries: {0}'.format(len(entryList)))
-
-# Delete Non-existent Files (If Safe)
-if safeDeleteFlag:
-	print('Trimming Cache')
-	cacheFiles = os.listdir()
-	for everyFile in cacheFiles:
-		if everyFile.rstrip('.DICT.XZ') not in entryList:
-			os.remove(everyFile)
+			esearchClient = ESearchClient(apiKey = ncbiScheduler.apiKey, scheduler = ncbiScheduler)
+			changedSet = esearchClient.modifiedSeries(previousRunTime)
+			esearchClient.close()
+			print('Modified Since Last Run: {0} [esearch]'.format(len(changedSet)))
+			return ChangedSetPolicy(changedSet)
+		except Exception as tempError:
+			print('WARNING: esearch failed ({0}); using age policy'.format(tempError), flush = True)
+	elif cliOpts.policy == 'esearch':
+		print('WARNING: No previous run recorded; using age policy')
+	return AgePolicy(expiryAge)
+
+
+# Dry Run: Reconcile Against Last Recorded Listing
+if cliOpts.dry_run:
+	if geoManifest.remoteSet is None:
+		print('ERROR: No recorded FTP listing; run without --dry-run first')
+		sys.exit(1)
+	if cliOpts.policy == 'esearch':
+		print('ERROR: esearch policy requires network access')
+		sys.exit(1)
+
+	# FTP Modification Times From Listing Cache
+	ftpLister = FTPLister(cliOpts.ftp, cachePath = ftpCachePath)
+	refreshPolicy = buildPolicy(listingModify(ftpLister.cachedTree(ftpPath)))
+	toDelete, toFetch, toRefresh = Reconcile(geoManifest.remoteSet, geoManifest.records(), refreshPolicy)
+	print('Listing Recorded: {0:%d %b %Y %I:%M:%S %p}'.format(datetime.fromtimestamp(geoManifest.remoteTime)))
+	print('Remote Entries: {0}'.format(len(geoManifest.remoteSet)))
+	print('Plan: Delete {0}; Fetch {1}; Refresh {2}'.format(len(toDelete), len(toFetch), len(toRefresh)))
+	if cliOpts.n is not None:
+		print('Plan (N-limited): Download {0}'.format(min(cliOpts.n, len(toFetch) + len(toRefresh))))
+	print(globalTimer.getEndStamp())
+	sys.exit(0)
+
+# Resume: Remaining Plan From Journal (FTP Listing and Trimming Skipped)
+if cliOpts.resume:
+	if journalState is None or journalState[3]:
+		print('No interrupted run to resume [--resume flag]')
+		print(globalTimer.getEndStamp())
+		sys.exit(0)
+
+	pendingList = list(filter(lambda x: x not in journalState[1], journalState[0]))
+	print('Resuming: {0} pending ({1} previously failed) [--resume flag]'.format(len(pendingList), len(journalState[2])))
+	runJournal.resume()
+
 else:
-	print('WARNING: Cache trimming skipped due to failed FTP processing')
+	# Parse FTP Directory (Pooled Connections; Unchanged Directories Served From Listing Cache)
+	print('Loading FTP Directories', flush = True)
+	entryList = []
+	ftpHost, _, ftpPort = cliOpts.ftp.partition(':')
+	with globalTimer.span('ftpList'), FTPLister(ftpHost, port = int(ftpPort or 21), poolSize = cliOpts.ftp_workers, cachePath = ftpCachePath, scheduler = ncbiScheduler) as ftpLister:
+		# NOTE: Entry modification times (mtime policy) require re-listing every directory
+		forceFlag = cliOpts.policy == 'mtime'
+		dirDict, failedSet, listCount = ftpLister.listTree(ftpPath, childPattern = '^GSE[0-9]*nnn$', forceFlag = forceFlag)
+
+	for dirName in sorted(failedSet):
+		print('ERROR: Directory {0} could not be processed'.format(dirName), flush = True)
+	safeDeleteFlag = len(failedSet) == 0
+
+	for dirName in sorted(dirDict):
+		subdirList = filter(lambda x: x[1] == 'dir' and re.match(pattern = '^GSE[0-9]+$', string = x[0]), dirDict[dirName])
+		entryList.extend(map(lambda x: x[0], subdirList))
+
+	print('Listed Directories: {0} (Cached: {1})'.format(len(dirDict) + len(failedSet), len(dirDict) + len(failedSet) - listCount))
+	modifyDict = listingModify(dirDict)
+	del dirDict
+	print('Total Entries: {0}'.format(len(entryList)))
+
+	# Reconcile Cache Manifest Against FTP Listing (Set Differences)
+	refreshPolicy = buildPolicy(modifyDict)
+	toDelete, toFetch, toRefresh = Reconcile(set(entryList), geoManifest.records(), refreshPolicy)
+	print('Plan: Delete {0}; Fetch {1}; Refresh {2}'.format(len(toDelete), len(toFetch), len(toRefresh)))
+
+	# Delete Non-existent Files (If Safe)
+	if safeDeleteFlag:
+		print('Trimming Cache')
+		geoManifest.setRemote(entryList)
+		for everyEntry in toDelete:
+			if geoStore is not None:
+				geoStore.delete(everyEntry)
+			elif os.path.lexists('{0}.DICT.XZ'.format(everyEntry)):
+				os.remove('{0}.DICT.XZ'.format(everyEntry))
+			geoManifest.remove(everyEntry)
+			geoIndex.remove(everyEntry)
+		if geoStore is not None:
+			geoStore.flush()
+		geoManifest.save()
+		geoIndex.save()
+	else:
+		print('WARNING: Cache trimming skipped due to failed FTP processing')
+
+	# Download Order Follows FTP Listing
+	pendingSet = toFetch | toRefresh
+	pendingList = list(filter(lambda x: x in pendingSet, entryList))
+	del pendingSet, toDelete, toFetch, toRefresh
+
+	# Journal Plan Before Any Download
+	runJournal.begin(pendingList)
 
 # Download and Parse SOFT Files
 print('Downloading SOFT Files', flush = True)
 requestCounter = 0
 failCounter = 0
-for entryIndex, everyEntry in enumerate(entryList, start = 1):
-	tempPath = '{0}.DICT.XZ'.format(everyEntry)
-
-	if cliOpts.n is not None and requestCounter == cliOpts.n:
-		print('N-limit reached. Download halted.')
-		break
-
-	if entryIndex % 2500 == 0:
-		print('Downloaded: {0}; Processed: {1:.1%}'.format(requestCounter, entryIndex/len(entryList)), flush = True)
-
-	# Skip If Exist AND Within Expiry (< 6 Months/180 Days)
-	if os.path.lexists(tempPath):
-		timeDiff = datetime.now() - datetime.fromtimestamp(os.path.getmtime(tempPath))
-		if timeDiff.days < 180:
-			continue
-
-	tempLink = 'https://www.ncbi.nlm.nih.gov/geo/query/acc.cgi'
-	linkOptions = {
-		'acc': everyEntry,
-		'targ': 'self',
-		'form': 'text',
-		'view': 'brief'
-	}
-
-	# Obtain SOFT File, Skips on Exception
-	try:
-		tempRequest = requests.get(tempLink, params = linkOptions, timeout = 60)
-		requestCounter += 1
-
-	except:
-		failCounter += 1
-		print('FAIL: {0}'.format(everyEntry), flush = True)
-		continue
-
-	# SOFT -> DICT Conversion
-	tempDict = dict()
-	responseList = tempRequest.text.splitlines()
-	for everyLine in responseList:
-		# Skip if NO '!' Prefix
-		if not everyLine.startswith('!'):
-			continue
-
-		tempList = everyLine.lstrip('!').partition(' = ')
-
-		if tempList[2] != '':
-			if tempList[0] not in tempDict:
-				tempDict[tempList[0]] = set()
-			tempDict[tempList[0]].add(tempList[2])
-
-	# Write To File (Protocol = 2 for Jython-compatibility)
-	tempPath = '{0}.DICT.XZ'.format(everyEntry)
-	XZWrite(obj = tempDict, path = tempPath, protocol = 2)
+unchangedCounter = 0
+softFetcher = SOFTFetcher(link = cliOpts.url, workers = cliOpts.workers, apiKey = ncbiScheduler.apiKey)
+entryProgress = ElapseProgress('Entries', total = len(pendingList) if cliOpts.n is None else min(cliOpts.n, len(pendingList)), timer = globalTimer)
+
+
+def pendingEntries():
+	# Yield new/expired entries (lazily consumed by the download pool; progress is reported by entryProgress)
+	for entryIndex, everyEntry in enumerate(pendingList, start = 1):
+		if entryIndex % 2500 == 0:
+			with globalTimer.span('checkpoint'):
+				geoManifest.save()
+				geoIndex.save()
+
+		yield everyEntry
+
+
+def processEntry(everyEntry):
+	# Download, convert and write a single entry (executed on worker threads); False if content unchanged
+	# NOTE: Spans opened on worker threads are top-level ('fetch', 'write'), not nested under the main thread's spans
+	# SOFT -> DICT Conversion (Streamed, Optional Key Projection)
+	with globalTimer.span('fetch'), ncbiScheduler.call(softFetcher.fetch, everyEntry, stream = True) as tempRequest:
+		tempDict = SOFTParse(tempRequest.iter_lines(decode_unicode = True), keySet = keySet)
+
+	# Skip Rewrite If Content Unchanged (Fetch Time Still Recorded)
+	fetchTime = time.time()
+	entryDigest = DictDigest(tempDict)
+	lastUpdate = GEODateStamp(min(tempDict.get('Series_last_update_date', [''])))
+	entryRecord = geoManifest.get(everyEntry)
+	if entryRecord is not None and entryRecord[1] == entryDigest:
+		geoManifest.update(everyEntry, fetchTime, entryDigest, entryRecord[2], lastUpdate)
+		runJournal.complete(everyEntry, fetchTime, entryDigest, entryRecord[2], '' if lastUpdate is None else lastUpdate)
+		return False
+
+	# Write To Store/File (Protocol = 2 for Jython-compatibility)
+	with globalTimer.span('write'):
+		if geoStore is not None:
+			entrySize = geoStore.write(everyEntry, tempDict, timestamp = fetchTime, syncFlag = True)[3]
+		else:
+			tempPath = '{0}.DICT.XZ'.format(everyEntry)
+			XZWrite(obj = tempDict, path = tempPath, protocol = 2)
+			entrySize = os.path.getsize(tempPath)
+	geoManifest.update(everyEntry, fetchTime, entryDigest, entrySize, lastUpdate)
+	geoIndex.update(everyEntry, tempDict)
+	runJournal.complete(everyEntry, fetchTime, entryDigest, entrySize, '' if lastUpdate is None else lastUpdate)
+	return True
+
+
+# Obtain SOFT Files (Bounded Concurrency, Rate-Limited)
+# NOTE: Network/HTTP failures are deferred to later retry rounds; only entries exhausting their retries count as failed
+# NOTE: Other errors (e.g. parsing) fail the entry at once; local I/O errors (e.g. ENOSPC, EACCES) abort the run (journal kept for --resume)
+entryIter = pendingEntries()
+while entryIter is not None:
+	entryLimit = None if cliOpts.n is None else cliOpts.n - requestCounter
+	for everyEntry, writeFlag, tempError in BoundedMap(processEntry, entryIter, workers = cliOpts.workers, limit = entryLimit):
+		if tempError is None:
+			requestCounter += 1
+			unchangedCounter += int(not writeFlag)
+			entryProgress.update()
+		elif ncbiScheduler.localError(tempError):
+			print('ABORT: {0} ({1})'.format(everyEntry, tempError), flush = True)
+			raise tempError
+		elif ncbiScheduler.retryable(tempError) and ncbiScheduler.defer(everyEntry):
+			globalTimer.count('retried')
+			print('RETRY: {0} ({1})'.format(everyEntry, tempError), flush = True)
+		else:
+			failCounter += 1
+			entryProgress.error()
+			runJournal.fail(everyEntry)
+			print('FAIL: {0} ({1})'.format(everyEntry, tempError), flush = True)
+
+	entryIter = None
+	if ncbiScheduler.pending() > 0 and (cliOpts.n is None or requestCounter < cliOpts.n):
+		print('Retry Round: {0} entries'.format(ncbiScheduler.pending()), flush = True)
+		entryIter = ncbiScheduler.deferred()
+
+entryProgress.finish()
+softFetcher.close()
+if geoStore is not None:
+	geoStore.close()
+geoManifest.save()
+geoIndex.save()
+
+# Close Journal (Left Open For --resume When Halted By N-limit)
+if cliOpts.n is not None and requestCounter == cliOpts.n:
+	print('N-limit reached. Download halted.')
+	runJournal.close()
+else:
+	runJournal.finish()
 
 # Diagnostics
 print('-' * 20)
 print('Number of new entries processed: {0}'.format(requestCounter))
+print('Number of unchanged entries (rewrite skipped): {0}'.format(unchangedCounter))
 print('Number of failed downloads: {0}'.format(failCounter))
 
 # Time Reporter
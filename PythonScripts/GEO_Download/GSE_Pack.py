@@ -0,0 +1,84 @@
+# GEO Metadata Packer (GSE: Series)
+# 1. Migrates Per-Series Dictionary Files (GSEnnnn.DICT.XZ) into the Packed Store
+# 2. Optionally Compacts the Packed Store
+
+# Python imports
+import argparse
+import os
+from PyVersion import PyCheckLenient
+from ElapseTime import ElapseTime
+from XZPickle import XZRead
+from GEOStore import GEOStore
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# CLI Generation and Parsing
+cliParser = argparse.ArgumentParser()
+cliParser.add_argument('-c', required = False, default = False, action = 'store_true', help = 'Compact store after migration')
+cliParser.add_argument('-d', required = False, default = False, action = 'store_true', help = 'Drop stored entries without a dictionary file')
+cliOpts = cliParser.parse_args()
+
+# Declaring Global Variables
+inputDir = '{0}/GeoData/GSE/'.format(os.getenv('DL_CACHE_DIR'))
+storeDir = '{0}/GeoData/GSE_Store/'.format(os.getenv('DL_CACHE_DIR'))
+globalTimer = ElapseTime(name = 'GSE_Pack')
+print(globalTimer.getBeginStamp())
+
+# ------------------------------ MAIN ------------------------------
+geoStore = GEOStore(storeDir)
+print('Stored Entries: {0}'.format(len(geoStore)))
+
+# Migrate New/Updated Dictionary Files (File mtime -> Record Timestamp)
+print('Migrating Files', flush = True)
+fileSet = set()
+packCounter = 0
+failCounter = 0
+with os.scandir(inputDir) as dirIter:
+	for dirEntry in dirIter:
+		if not dirEntry.name.endswith('.DICT.XZ'):
+			continue
+
+		everyEntry = dirEntry.name[:-len('.DICT.XZ')]
+		fileSet.add(everyEntry)
+		fileStamp = dirEntry.stat().st_mtime
+		storeStamp = geoStore.timestamp(everyEntry)
+		if storeStamp is not None and storeStamp >= fileStamp:
+			continue
+
+		try:
+			geoStore.write(everyEntry, XZRead(dirEntry.path), timestamp = fileStamp)
+			packCounter += 1
+		except Exception:
+			failCounter += 1
+			print('FAIL: {0}'.format(everyEntry), flush = True)
+			continue
+
+		if packCounter % 10000 == 0:
+			geoStore.flush()
+			print('Packed: {0}'.format(packCounter), flush = True)
+
+# Drop Stale Entries
+dropCounter = 0
+if cliOpts.d:
+	for everyEntry in geoStore.keys() - fileSet:
+		geoStore.delete(everyEntry)
+		dropCounter += 1
+geoStore.flush()
+
+# Compaction
+if cliOpts.c:
+	print('Compacting Store', flush = True)
+	print('Reclaimed: {0:.1f} MB'.format(geoStore.compact() / 1e6))
+geoStore.close()
+
+# Diagnostics
+print('-' * 20)
+print('Number of entries packed: {0}'.format(packCounter))
+print('Number of entries dropped: {0}'.format(dropCounter))
+print('Number of failed entries: {0}'.format(failCounter))
+print('Total stored entries: {0}'.format(len(geoStore)))
+
+# Time Reporter
+print(globalTimer.getEndStamp())
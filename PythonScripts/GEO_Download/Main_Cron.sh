@@ -12,7 +12,10 @@ mkdir -p $DL_CACHE_DIR/GeoData/Logs
 # 2. Python Settings
 export PYTHONPATH=$HOME
 
-# 3. Pyenv Settings
+# 3. NCBI Settings (API key raises the request ceiling from 3/s to 10/s)
+export NCBI_API_KEY=''
+
+# 4. Pyenv Settings
 export PYENV_ROOT="$HOME/.pyenv"
 export PATH=$PYENV_ROOT/bin:$PATH
 eval "$(pyenv init -)"
@@ -21,4 +24,5 @@ pyenv shell 3.7.5
 # ----- Run Scripts -----
 # Experiment (GSE) Metadata Dump
 export PYTHON_LOG_FILE=$DL_CACHE_DIR/GeoData/Logs/GSE_Dump.LOG
+export PROFILE_DIR=$DL_CACHE_DIR/GeoData/Logs
 python $SCRIPT_DIR/GSE_Dump.py > $PYTHON_LOG_FILE 2>&1
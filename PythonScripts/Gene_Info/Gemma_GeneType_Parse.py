@@ -1,19 +1,28 @@
-# Gene Info Annotation Parser (Gene Type):
-# 1. Generation of EntrezID: (Gene Type) Dictionary for Python
+# Gene Info Annotation Parser (Gene Type, Symbol, Synonyms, Chromosome, dbXrefs):
+# 1. Generation of EntrezID: (Gene Type) Dictionary and Compact Table for Python/Jython
+# 2. Generation of Per-Taxon EntrezID: (Annotation) Dictionaries for Every Declared Table
+# 3. Single Pass over gene_info(.gz) For All Tables; Line-Aligned Chunks Parsed on a Process Pool
 
 # Python Imports
 from PyVersion import PyCheckLenient
+import argparse
 import os
-from IterUtils import RSlice
 from XZPickle import XZWrite
+from GeneTable import GeneTableWrite
+from GeneInfo import GeneInfoPath, GeneInfoTable, GeneInfoExtract, SYMBOL_COLUMN, SYNONYM_COLUMN, XREF_COLUMN, CHROMOSOME_COLUMN, TYPE_COLUMN
 
 # Python Version Check
 # Requirement: CPython 3.7.X
 assert PyCheckLenient('CPython', '3', '7')
 
+# CLI Generation and Parsing
+cliParser = argparse.ArgumentParser()
+cliParser.add_argument('-w', '--workers', required = False, default = os.cpu_count(), type = int, help = 'Parser processes; integer-type')
+cliOpts = cliParser.parse_args()
+
 # Declaring Global Variables
-inPath = '{0}/gene_info'.format(os.getenv('IN_DIR'))
-outDir = '{0}/GeneType/'.format(os.getenv('OUT_DIR'))
+inPath = GeneInfoPath(os.getenv('IN_DIR'))
+outDir = os.getenv('OUT_DIR').rstrip('/')
 taxonList = [
 	('human', '9606'),
 	('mouse', '10090'),
@@ -23,42 +32,30 @@ taxonList = [
 	('worm', '6239'),
 	('yeast', '4932')
 ]
-taxonTuple = tuple(map(lambda x: x[1], taxonList))
+# Output Tables (Name, Projected Columns; Keyed by EntrezID; Add Entries Here For New Annotations)
+# NOTE: Synonyms and dbXrefs are '|'-separated in gene_info and stored as tuples
+tableList = [
+	GeneInfoTable('geneType', [TYPE_COLUMN], subDir = 'GeneType'),
+	GeneInfoTable('geneSymbol', [SYMBOL_COLUMN]),
+	GeneInfoTable('geneSynonym', [SYNONYM_COLUMN], multiColumns = [SYNONYM_COLUMN]),
+	GeneInfoTable('geneChromosome', [CHROMOSOME_COLUMN]),
+	GeneInfoTable('geneXref', [XREF_COLUMN], multiColumns = [XREF_COLUMN])
+]
 
 # ------------------------------ MAIN ------------------------------
-tupleSet = set()
-print('Processing Annotation File.')
-with open(inPath, mode = 'rt', encoding = 'utf-8', newline = '\n') as inFile:
-	for everyLine in inFile:
-		# Skip Header
-		if everyLine.startswith('#'):
-			continue
-
-		everyLine = everyLine.strip('\n')
-		tempArray = everyLine.split('\t')
-
-		# Skip Irrelevant Taxon
-		if tempArray[0] not in taxonTuple:
-			continue
-		else:
-			tempTuple = tuple(RSlice(tempArray, [0, 1, 9]))
-			tupleSet.add(tempTuple)
-
-for taxon, taxonID in taxonList:
-	print('Sorting: {0}'.format(taxon))
-
-	# Filter Tuples By Taxon, Add To Dictionary
-	finalDict = dict()
-	for (currentTaxon, currentGene, currentType) in tupleSet:
-		if currentTaxon == taxonID:
-			finalDict[int(currentGene)] = currentType
-
-	# Sorted List of GeneID
-	finalList = sorted(finalDict.items(), key = lambda x: x[0])
-
-	# Write To File
-	print('Writing Files.')
-
-	# 1. Python Dictionary (XZ-Backed, Protocol 2 for Jython-compatibility)
-	tempPath = '{0}geneType.{1}.DICT.XZ'.format(outDir, taxon)
-	XZWrite(obj = finalDict, path = tempPath, protocol = 2)
+# Bucket Rows By Table and Taxon (Single Pass; Memory Bounded by Target Taxa)
+print('Processing Annotation File: {0}'.format(os.path.basename(inPath)))
+tableDict = GeneInfoExtract(inPath, list(map(lambda x: x[1], taxonList)), tableList, workers = cliOpts.workers)
+
+for everyTable in tableList:
+	print('Writing Table: {0}'.format(everyTable.name))
+	for taxon, taxonID in taxonList:
+		finalDict = tableDict[everyTable.name][taxonID]
+
+		# 1. Python Dictionary (XZ-Backed, Protocol 2 for Jython-compatibility)
+		XZWrite(obj = finalDict, path = everyTable.path(outDir, taxon), protocol = 2)
+
+		# 2. Compact Table (Gene Type Only; Sorted EntrezIDs + Type Codes; Memory-Mapped by Python 3 and Jython Readers)
+		if everyTable.name == 'geneType':
+			tempPath = '{0}/GeneType/geneType.{1}.GTAB'.format(outDir, taxon)
+			GeneTableWrite(geneDict = finalDict, path = tempPath)
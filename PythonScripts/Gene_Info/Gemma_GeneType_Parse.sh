@@ -5,17 +5,17 @@
 export IN_DIR=''
 export SCRIPT_DIR=$HOME/
 export OUT_DIR=$HOME/Output/Dependencies/
-mkdir -p $OUT_DIR/GeneType/
+mkdir -p $OUT_DIR/GeneType/ $OUT_DIR/GeneInfo/
 
 # ----- Run Scripts -----
 # 1. File Existence Check
 cd $IN_DIR
-if [ -f "gene_info" ]; then
+if [ -f "gene_info.gz" ] || [ -f "gene_info" ]; then
     :
 else
     exit 1
 fi
 
 # 2. Gene Information Parsing
-# [A] Gene Type Dictionary and Table
+# [A] Gene Type Dictionary and Table; Symbol, Synonym, Chromosome and dbXref Dictionaries
 python $SCRIPT_DIR/Gemma_GeneType_Parse.py
\ No newline at end of file
@@ -1,21 +1,92 @@
-# Module for Time-stamping
+# Module for Time-stamping and Run Instrumentation (nested spans, counters, peak memory, JSON summary, progress)
 
 # Python Imports
 from PyVersion import PyCheckLenient
+import atexit
 import datetime
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Memory Sampling (CPython: Peak RSS; Jython: JVM Heap)
+try:
+	import resource
+except ImportError:
+	resource = None
+try:
+	from java.lang.management import ManagementFactory
+except ImportError:
+	ManagementFactory = None
 
 # Python Version Check
 # Requirement: CPython 3.7.X
 assert PyCheckLenient('CPython', '3', '7')
 
+# Declaring Global Variables
+SAMPLE_INTERVAL = 1.0
+
+
+def MemorySample():
+	# Memory figure in bytes as (kind, value): used JVM heap (Jython) or peak RSS (CPython); (None, None) if unavailable
+	if ManagementFactory is not None:
+		return 'heapUsed', int(ManagementFactory.getMemoryMXBean().getHeapMemoryUsage().getUsed())
+	if resource is not None:
+		peakRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		return 'peakRSS', peakRSS if sys.platform == 'darwin' else peakRSS * 1024
+	return None, None
+
+
+class ElapseSpan:
+	# ElapseSpan times a named block (with-statement); spans opened inside it are recorded as 'outer/inner'
+
+	def __init__(self, timer, name):
+		# Initialize
+		self.timer = timer
+		self.name = name
+		self.path = None
+		self.start = None
+
+	def __enter__(self):
+		self.path = self.timer.pushSpan(self.name)
+		self.start = time.time()
+		return self
+
+	def __exit__(self, *args):
+		self.timer.popSpan(self.path, time.time() - self.start)
+		return False
+
 
 class ElapseTime:
 	# ElapseTime records the time of initialization and returns subsequent requests for time elapsed.
+	# NOTE: span (with-statement) and timed (decorator) accumulate count/total/max per span path
+	# NOTE: Span nesting is tracked per thread; counters and span totals are shared (lock-protected)
+	# NOTE: Span share is total span time over run time (exceeds 100% for spans run concurrently on worker threads)
+	# NOTE: With a summary path (or name + PROFILE_DIR), a JSON summary is written at exit
 
-	def __init__(self):
+	def __init__(self, name = None, summaryPath = None):
 		# Initialize
 		self.initial = datetime.datetime.now()
 		self.format = '%d %b %Y (%a) - %I:%M:%S %p'
+		self.name = name
+		self.startTime = time.time()
+		self.spanDict = dict()
+		self.counterDict = dict()
+		self.memoryKind = None
+		self.memoryPeak = 0
+		self.lastSample = 0.0
+		self.statLock = threading.Lock()
+		self.localState = threading.local()
+
+		# Summary Path (Timestamped Per Run Under PROFILE_DIR; Runs Can Then Be Diffed)
+		if summaryPath is None and name is not None and os.getenv('PROFILE_DIR'):
+			summaryPath = '{0}/{1}.{2}.JSON'.format(os.getenv('PROFILE_DIR').rstrip('/'), name, self.initial.strftime('%Y%m%d-%H%M%S'))
+		self.summaryPath = summaryPath
+		if summaryPath is not None:
+			atexit.register(self.writeSummary)
+		self.sampleMemory(forceFlag = True)
 
 	def getBeginStamp(self):
 		# Return initial timestamp
@@ -23,7 +94,7 @@ class ElapseTime:
 		return 'Script Begin: {0}'.format(currentStamp)
 
 	def getEndStamp(self):
-		# Return elapse timestamp and time difference
+		# Return elapse timestamp and time difference (followed by the span report, if any)
 		currentTime = datetime.datetime.now()
 		currentStamp = currentTime.strftime(self.format)
 
@@ -32,4 +103,214 @@ class ElapseTime:
 		dHour, dMinute = divmod(dMinute, 60)
 		dDay = timeDelta.days
 		timeStamp = 'Total Time: {0} day(s), {1} hour(s), {2} minute(s), {3} second(s)'.format(dDay, dHour, dMinute, dSecond)
+		reportList = self.getReport()
+		if len(reportList) > 0:
+			timeStamp = '{0}\n{1}'.format(timeStamp, '\n'.join(reportList))
 		return 'Script End: {0}\n{1}'.format(currentStamp, timeStamp)
+
+	def pushSpan(self, name):
+		# Open a span on this thread's stack; returns its path
+		spanStack = getattr(self.localState, 'stack', None)
+		if spanStack is None:
+			spanStack = []
+			self.localState.stack = spanStack
+		spanPath = name if len(spanStack) == 0 else '{0}/{1}'.format(spanStack[-1], name)
+		spanStack.append(spanPath)
+		return spanPath
+
+	def popSpan(self, path, elapsed):
+		# Close the innermost span and accumulate [count, total, max]
+		self.localState.stack.pop()
+		with self.statLock:
+			spanStat = self.spanDict.get(path)
+			if spanStat is None:
+				self.spanDict[path] = [1, elapsed, elapsed]
+			else:
+				spanStat[0] += 1
+				spanStat[1] += elapsed
+				spanStat[2] = max(spanStat[2], elapsed)
+		self.sampleMemory()
+
+	def span(self, name):
+		# Timed block: with timer.span('name'): ...
+		return ElapseSpan(self, name)
+
+	def timed(self, name = None):
+		# Timed function: @timer.timed() (span named after the function) or @timer.timed('name')
+		def decorator(func):
+			spanName = func.__name__ if name is None else name
+
+			@functools.wraps(func)
+			def wrapper(*args, **kwargs):
+				with ElapseSpan(self, spanName):
+					return func(*args, **kwargs)
+			return wrapper
+		return decorator
+
+	def count(self, name, value = 1):
+		# Increment a named counter (rates are reported against total run time)
+		with self.statLock:
+			self.counterDict[name] = self.counterDict.get(name, 0) + value
+
+	def sampleMemory(self, forceFlag = False):
+		# Track peak memory (at most once per SAMPLE_INTERVAL unless forced)
+		currentTime = time.time()
+		if not forceFlag and currentTime - self.lastSample < SAMPLE_INTERVAL:
+			return
+		self.lastSample = currentTime
+		memoryKind, memoryValue = MemorySample()
+		if memoryKind is not None:
+			self.memoryKind = memoryKind
+			self.memoryPeak = max(self.memoryPeak, memoryValue)
+
+	def getSummary(self):
+		# Machine-readable run profile
+		self.sampleMemory(forceFlag = True)
+		elapsedTime = time.time() - self.startTime
+		with self.statLock:
+			spanSummary = dict(map(lambda x: (x[0], {
+				'count': x[1][0],
+				'total': round(x[1][1], 6),
+				'mean': round(x[1][1] / x[1][0], 6),
+				'max': round(x[1][2], 6),
+				'share': round(x[1][1] / elapsedTime, 6) if elapsedTime > 0 else 0.0
+			}), self.spanDict.items()))
+			counterSummary = dict(map(lambda x: (x[0], {
+				'count': x[1],
+				'rate': round(x[1] / elapsedTime, 6) if elapsedTime > 0 else 0.0
+			}), self.counterDict.items()))
+		return {
+			'name': self.name,
+			'begin': self.initial.strftime('%Y-%m-%dT%H:%M:%S'),
+			'end': datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%S'),
+			'elapsed': round(elapsedTime, 6),
+			'spans': spanSummary,
+			'counters': counterSummary,
+			'memory': {} if self.memoryKind is None else {self.memoryKind: self.memoryPeak}
+		}
+
+	def getReport(self):
+		# Human-readable span and counter lines (sorted by path/name)
+		tempSummary = self.getSummary()
+		reportList = []
+		for spanPath in sorted(tempSummary['spans']):
+			spanStat = tempSummary['spans'][spanPath]
+			reportList.append('Span {0}: {1} call(s); total {2:.2f}s; mean {3:.4f}s; max {4:.2f}s; {5:.1%} of run'.format(
+				spanPath, spanStat['count'], spanStat['total'], spanStat['mean'], spanStat['max'], spanStat['share']))
+		for counterName in sorted(tempSummary['counters']):
+			counterStat = tempSummary['counters'][counterName]
+			reportList.append('Counter {0}: {1} ({2:.2f}/s)'.format(counterName, counterStat['count'], counterStat['rate']))
+		for memoryKind, memoryValue in tempSummary['memory'].items():
+			if len(reportList) > 0:
+				reportList.append('Memory {0}: {1:.1f} MB'.format(memoryKind, memoryValue / 1e6))
+		return reportList
+
+	def writeSummary(self, path = None):
+		# Write the JSON summary (sorted keys; temp file + rename)
+		path = self.summaryPath if path is None else path
+		if path is None:
+			return
+		tempPath = '{0}.tmp'.format(path)
+		with open(tempPath, 'w') as outFile:
+			json.dump(self.getSummary(), outFile, indent = 1, sort_keys = True)
+		os.rename(tempPath, path)
+
+
+def FormatDuration(seconds):
+	# Seconds as 'Nd HH:MM:SS'
+	dMinute, dSecond = divmod(int(seconds), 60)
+	dHour, dMinute = divmod(dMinute, 60)
+	dDay, dHour = divmod(dHour, 24)
+	return '{0}d {1:02d}:{2:02d}:{3:02d}'.format(dDay, dHour, dMinute, dSecond)
+
+
+def ProgressWrite(line):
+	# Default progress output (stdout, flushed; logs are usually redirected files)
+	sys.stdout.write(line + '\n')
+	sys.stdout.flush()
+
+
+class ElapseProgress:
+	# ElapseProgress reports items/s, moving-average ETA, errors and elapsed time every `interval` seconds
+	# NOTE: update is amortized O(1): the clock is read only every `step` items, with step re-estimated
+	#       from the recent rate so that the clock is read ~8 times per interval
+	# NOTE: A sudden slowdown can delay a report until the current step completes (steps are capped at maxStep)
+
+	def __init__(self, label, total = None, interval = 60.0, alpha = 0.3, maxStep = 1000, timer = None, writeFunc = ProgressWrite):
+		# Initialize
+		assert total is None or total >= 0
+		assert interval > 0 and 0 < alpha <= 1
+		self.label = label
+		self.total = total
+		self.interval = interval
+		self.alpha = alpha
+		self.maxStep = maxStep
+		self.timer = timer
+		self.writeFunc = writeFunc
+		self.itemCount = 0
+		self.errorCount = 0
+		self.startTime = time.time()
+		self.checkTime = self.startTime
+		self.checkCount = 0
+		self.reportTime = self.startTime
+		self.reportCount = 0
+		self.averageRate = None
+		self.nextCheck = 1
+		self.finished = False
+
+	def update(self, count = 1):
+		# Record completed item(s)
+		self.itemCount += count
+		if self.itemCount >= self.nextCheck:
+			self.check()
+
+	def error(self, count = 1):
+		# Record failed item(s) (not counted as completed)
+		self.errorCount += count
+
+	def check(self):
+		# Read the clock; report if due; schedule the next check
+		currentTime = time.time()
+		if currentTime - self.reportTime >= self.interval:
+			self.report(currentTime)
+		checkRate = (self.itemCount - self.checkCount) / max(currentTime - self.checkTime, 1e-6)
+		self.checkTime = currentTime
+		self.checkCount = self.itemCount
+		self.nextCheck = self.itemCount + max(1, min(self.maxStep, int(checkRate * self.interval / 8)))
+
+	def report(self, currentTime = None, finalFlag = False):
+		# Write a progress line (moving-average rate updated from the items since the last report)
+		currentTime = time.time() if currentTime is None else currentTime
+		recentTime = currentTime - self.reportTime
+		if recentTime > 0:
+			recentRate = (self.itemCount - self.reportCount) / recentTime
+			self.averageRate = recentRate if self.averageRate is None else self.alpha * recentRate + (1 - self.alpha) * self.averageRate
+		self.reportTime = currentTime
+		self.reportCount = self.itemCount
+
+		elapsedTime = currentTime - self.startTime
+		overallRate = self.itemCount / elapsedTime if elapsedTime > 0 else 0.0
+		countText = str(self.itemCount) if self.total is None else '{0}/{1} ({2:.1%})'.format(self.itemCount, self.total, self.itemCount / float(max(self.total, 1)))
+		etaText = ''
+		if not finalFlag and self.total is not None and self.averageRate:
+			etaText = '; ETA {0}'.format(FormatDuration(max(self.total - self.itemCount - self.errorCount, 0) / self.averageRate))
+		self.writeFunc('{0}: {1}; {2:.2f}/s (recent {3:.2f}/s){4}; Errors: {5}; Elapsed {6}{7}'.format(
+			self.label, countText, overallRate, self.averageRate or 0.0, etaText, self.errorCount, FormatDuration(elapsedTime), ' [Done]' if finalFlag else ''))
+
+	def wrap(self, iterable):
+		# Yield items, counting each as completed when the loop body returns for the next one
+		for everyItem in iterable:
+			yield everyItem
+			self.update()
+		self.finish()
+
+	def finish(self):
+		# Final report (once); item and error totals are added to the timer's counters
+		if self.finished:
+			return
+		self.finished = True
+		self.report(finalFlag = True)
+		if self.timer is not None:
+			self.timer.count(self.label, self.itemCount)
+			if self.errorCount > 0:
+				self.timer.count('{0} (errors)'.format(self.label), self.errorCount)
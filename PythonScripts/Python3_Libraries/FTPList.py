@@ -0,0 +1,223 @@
+# Module for FTP Directory Listings (pooled connections + MLSD + listing cache)
+
+# Python Imports
+import calendar
+import ftplib
+import os
+import pickle
+import queue
+import re
+import threading
+import time
+from IterUtils import BoundedMap
+from PyVersion import PyCheckLenient
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+
+def ListModify(monthText, dayText, yearText, nowTime = None):
+	# LIST date columns ('Jan 01 2020', or 'Jan 01 12:34' within the last year) -> MLSD-style modify ('20200101000000'); None if unparseable
+	# NOTE: LIST times are taken as UTC (like MLSD); year-less dates are placed in the year that is not in the future
+	nowStamp = time.time() if nowTime is None else nowTime
+	if ':' not in yearText:
+		yearList = [(yearText, '00:00')]
+	else:
+		nowYear = time.gmtime(nowStamp).tm_year
+		yearList = [(str(nowYear), yearText), (str(nowYear - 1), yearText)]
+
+	for tempYear, tempClock in yearList:
+		try:
+			tempTuple = time.strptime('{0} {1} {2} {3}'.format(monthText, dayText, tempYear, tempClock), '%b %d %Y %H:%M')
+		except ValueError:
+			continue
+		if len(yearList) == 1 or calendar.timegm(tempTuple) <= nowStamp + 86400:
+			return time.strftime('%Y%m%d%H%M%S', tempTuple)
+	return None
+
+
+class FTPLister:
+	# FTPLister lists directories over a small pool of logged-in connections (MLSD where supported)
+	# NOTE: Listings are cached with directory modification times; unchanged directories are not re-listed
+
+	def __init__(self, host, port = 21, poolSize = 4, timeout = 420, cachePath = None, scheduler = None):
+		# Initialize (connections are opened lazily)
+		assert isinstance(host, str)
+		assert isinstance(poolSize, int) and poolSize > 0
+		assert cachePath is None or isinstance(cachePath, str)
+
+		self.host = host
+		self.port = port
+		self.poolSize = poolSize
+		self.timeout = timeout
+		self.cachePath = cachePath
+		self.scheduler = scheduler
+		self.idleQueue = queue.LifoQueue()
+		self.openCount = 0
+		self.lock = threading.Lock()
+		self.mlsdFlag = None
+
+		# Listing Cache: Path -> (Modification Time, Entry List)
+		self.cacheDict = dict()
+		if cachePath is not None and os.path.lexists(cachePath):
+			with open(cachePath, mode = 'rb') as cacheFile:
+				self.cacheDict = pickle.load(cacheFile)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	# ------------------------------ Connections ------------------------------
+	def connect(self):
+		# Open and log in a new connection; probes MLSD support once
+		ftpConn = ftplib.FTP(timeout = self.timeout)
+		ftpConn.connect(host = self.host, port = self.port)
+		ftpConn.login()
+
+		if self.mlsdFlag is None:
+			try:
+				self.mlsdFlag = 'MLST' in ftpConn.sendcmd('FEAT').upper()
+			except ftplib.Error:
+				self.mlsdFlag = False
+		return ftpConn
+
+	def acquire(self):
+		# Idle pooled connection, or a new one while below the pool size
+		while True:
+			with self.lock:
+				try:
+					return self.idleQueue.get_nowait()
+				except queue.Empty:
+					pass
+				createFlag = self.openCount < self.poolSize
+				if createFlag:
+					self.openCount += 1
+
+			if createFlag:
+				try:
+					return self.connect()
+				except BaseException:
+					with self.lock:
+						self.openCount -= 1
+					raise
+
+			# Wait For Release (Re-Checked Periodically As Broken Connections Free Slots)
+			try:
+				return self.idleQueue.get(timeout = 1)
+			except queue.Empty:
+				continue
+
+	def release(self, ftpConn, brokenFlag = False):
+		# Return connection to the pool (broken connections are discarded)
+		if not brokenFlag:
+			self.idleQueue.put(ftpConn)
+			return
+
+		with self.lock:
+			self.openCount -= 1
+		try:
+			ftpConn.close()
+		except Exception:
+			pass
+
+	def close(self):
+		# Log out of every idle connection and persist the listing cache
+		while not self.idleQueue.empty():
+			ftpConn = self.idleQueue.get()
+			try:
+				ftpConn.quit()
+			except Exception:
+				ftpConn.close()
+			with self.lock:
+				self.openCount -= 1
+		self.save()
+
+	# ------------------------------ Listings ------------------------------
+	@staticmethod
+	def parseList(inputLine):
+		# Parse a Unix-style LIST line into (name, type, modify); type 'link' for symbolic links, modify as in MLSD (minute/day resolution)
+		tempList = inputLine.split(None, 8)
+		if len(tempList) < 9:
+			return None
+		tempType = {'d': 'dir', 'l': 'link'}.get(tempList[0][:1], 'file')
+		tempName = tempList[8].split(' -> ')[0] if tempType == 'link' else tempList[8]
+		return tempName, tempType, ListModify(*tempList[5:8])
+
+	def fetchDir(self, path):
+		# Single listing on a pooled connection: list of (name, type, modify)
+		ftpConn = self.acquire()
+		try:
+			entryList = []
+			if self.mlsdFlag:
+				for tempName, tempFacts in ftpConn.mlsd(path = path, facts = ['type', 'modify']):
+					tempType = tempFacts.get('type', '').lower()
+					if tempType in ('dir', 'file'):
+						entryList.append((tempName, tempType, tempFacts.get('modify')))
+			else:
+				ftpConn.cwd(dirname = path)
+				ftpConn.retrlines(cmd = 'LIST', callback = lambda x: entryList.append(self.parseList(x)))
+				entryList = list(filter(lambda x: x is not None and x[0] not in ('.', '..'), entryList))
+		except BaseException:
+			self.release(ftpConn, brokenFlag = True)
+			raise
+		self.release(ftpConn)
+		return entryList
+
+	def listDir(self, path):
+		# Listing of a single directory (rate-limited and retried through the scheduler, if any)
+		if self.scheduler is not None:
+			return self.scheduler.call(self.fetchDir, path)
+		return self.fetchDir(path)
+
+	def listTree(self, parentPath, childPattern = None, forceFlag = False):
+		# Parent listing plus listings of its subdirectories (matching childPattern) in parallel
+		# Returns (child name -> entry list, set of failed children, number of children re-listed)
+		# NOTE: Children whose modification time matches the cached listing are served from cache (unless forced)
+		# NOTE: A directory mtime only tracks added/removed entries; force when entry modification facts are needed
+		# NOTE: Symbolic links (LIST fallback) matching childPattern are listed as directories
+		childPattern = None if childPattern is None else re.compile(childPattern)
+		parentPath = parentPath.rstrip('/') + '/'
+
+		childDict = dict()
+		staleDict = dict()
+		for tempName, tempType, tempModify in self.listDir(parentPath):
+			if childPattern is not None and not childPattern.match(tempName):
+				continue
+			if tempType != 'dir' and not (tempType == 'link' and childPattern is not None):
+				continue
+			tempCache = self.cacheDict.get(parentPath + tempName)
+			if not forceFlag and tempModify is not None and tempCache is not None and tempCache[0] == tempModify:
+				childDict[tempName] = tempCache[1]
+			else:
+				staleDict[tempName] = tempModify
+
+		failedSet = set()
+		for tempName, entryList, tempError in BoundedMap(lambda x: self.listDir(parentPath + x), sorted(staleDict), workers = self.poolSize):
+			if tempError is None:
+				childDict[tempName] = entryList
+				self.cacheDict[parentPath + tempName] = (staleDict[tempName], entryList)
+			else:
+				failedSet.add(tempName)
+
+		return childDict, failedSet, len(staleDict)
+
+	def cachedTree(self, parentPath):
+		# Cached subdirectory listings of a parent directory (no network access)
+		parentPath = parentPath.rstrip('/') + '/'
+		childDict = dict()
+		for tempPath, (_, entryList) in self.cacheDict.items():
+			if tempPath.startswith(parentPath) and '/' not in tempPath[len(parentPath):]:
+				childDict[tempPath[len(parentPath):]] = entryList
+		return childDict
+
+	def save(self):
+		# Persist listing cache atomically (temp file + rename)
+		if self.cachePath is None:
+			return
+		tempPath = '{0}.tmp'.format(self.cachePath)
+		with open(tempPath, mode = 'wb') as cacheFile:
+			pickle.dump(self.cacheDict, cacheFile, protocol = 4)
+		os.replace(tempPath, self.cachePath)
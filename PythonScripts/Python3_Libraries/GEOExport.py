@@ -0,0 +1,147 @@
+# Module for GEO Flat Exports (record -> TSV row projection; dictionary-encoded multi-valued fields)
+
+# Python Imports
+import os
+import pickle
+from datetime import datetime
+from PyVersion import PyCheckLenient
+from GEORefresh import GEO_DATE_FORMAT
+from GEOStore import GEOStore
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# Export Columns: (Header, SOFT Field, Kind)
+# Kinds: text (first value), date (ISO 8601), count (number of values), list (raw values), dict (dictionary codes)
+EXPORT_COLUMNS = [
+	('gse.Title', 'Series_title', 'text'),
+	('gse.Type', 'Series_type', 'dict'),
+	('gse.Taxon', 'Series_sample_organism', 'dict'),
+	('gse.Platform', 'Series_platform_id', 'dict'),
+	('gse.NumSample', 'Series_sample_id', 'count'),
+	('gse.SubmitDate', 'Series_submission_date', 'date'),
+	('gse.UpdateDate', 'Series_last_update_date', 'date'),
+	('gse.PMID', 'Series_pubmed_id', 'list')
+]
+EXPORT_KINDS = frozenset(['text', 'date', 'count', 'list', 'dict'])
+
+# Per-Process Store Handles (Worker Side; Index Loaded Once Per Process)
+storeCache = dict()
+
+
+def CleanText(value):
+	# Single-line, tab-free text (TSV-safe)
+	return ' '.join(value.split())
+
+
+class RowProjection:
+	# RowProjection maps a record dictionary to a tuple of column values (picklable; runs on worker processes)
+	# NOTE: dict columns yield sorted value tuples; codes are assigned by the single writer (stable across runs)
+
+	def __init__(self, columnList = EXPORT_COLUMNS):
+		# Initialize
+		assert all(map(lambda x: x[2] in EXPORT_KINDS, columnList))
+		self.columnList = list(columnList)
+
+	def __call__(self, recordDict):
+		rowList = []
+		for _, everyField, everyKind in self.columnList:
+			valueSet = recordDict.get(everyField, ())
+			if everyKind == 'count':
+				rowList.append(len(valueSet))
+			elif everyKind in ('list', 'dict'):
+				rowList.append(tuple(sorted(map(CleanText, valueSet))))
+			elif len(valueSet) == 0:
+				rowList.append('NA')
+			elif everyKind == 'text':
+				rowList.append(CleanText(min(valueSet)))
+			else:
+				try:
+					rowList.append(datetime.strptime(min(valueSet), GEO_DATE_FORMAT).strftime('%Y-%m-%d'))
+				except ValueError:
+					rowList.append('NA')
+		return tuple(rowList)
+
+
+def StoreReadChunk(storeDir, accessionList, func = None):
+	# Worker task: list of (accession, object or func(object), None) for a chunk of store records
+	if storeDir not in storeCache:
+		storeCache[storeDir] = GEOStore(storeDir, readOnly = True)
+	geoStore = storeCache[storeDir]
+	return list(map(lambda x: (x[0], x[1] if func is None else func(x[1]), None), geoStore.iterItems(accessionSet = set(accessionList))))
+
+
+class GEOExportTable:
+	# GEOExportTable keeps encoded rows and value dictionaries between runs (sidecar state)
+	# NOTE: Only records whose manifest digest changed are re-projected; the table itself is rewritten from cached rows
+
+	def __init__(self, statePath, columnList = EXPORT_COLUMNS):
+		# Initialize (loads sidecar state; discarded if columns changed)
+		self.statePath = statePath
+		self.columnList = list(columnList)
+		self.digestDict = dict()
+		self.rowDict = dict()
+		self.codeDict = dict(map(lambda x: (x[1], dict()), filter(lambda x: x[2] == 'dict', self.columnList)))
+		if os.path.lexists(statePath):
+			with open(statePath, mode = 'rb') as stateFile:
+				tempDict = pickle.load(stateFile)
+			if tempDict['columns'] == self.columnList:
+				self.digestDict = tempDict['digests']
+				self.rowDict = tempDict['rows']
+				self.codeDict = tempDict['codes']
+
+	def stale(self, digestDict):
+		# (changed or new accessions, removed accessions) relative to accession -> digest
+		changedSet = set(filter(lambda x: self.digestDict.get(x) != digestDict[x], digestDict))
+		removedSet = set(self.rowDict) - set(digestDict)
+		return changedSet, removedSet
+
+	def encode(self, rowTuple):
+		# Column values -> TSV fields (dictionary codes assigned on first sight; codes are never reused)
+		fieldList = []
+		for (_, everyField, everyKind), everyValue in zip(self.columnList, rowTuple):
+			if everyKind == 'dict':
+				valueDict = self.codeDict[everyField]
+				codeList = map(lambda x: valueDict.setdefault(x, len(valueDict) + 1), everyValue)
+				fieldList.append(';'.join(map(str, codeList)) if len(everyValue) > 0 else 'NA')
+			elif everyKind == 'list':
+				fieldList.append('; '.join(everyValue) if len(everyValue) > 0 else 'NA')
+			else:
+				fieldList.append(str(everyValue))
+		return '\t'.join(fieldList)
+
+	def update(self, accession, digest, rowTuple):
+		# Store (or replace) a row
+		self.rowDict[accession] = self.encode(rowTuple)
+		self.digestDict[accession] = digest
+
+	def remove(self, accession):
+		# Drop a row
+		self.rowDict.pop(accession, None)
+		self.digestDict.pop(accession, None)
+
+	def write(self, tablePath, dictPath):
+		# Write table (sorted by GSE number) and value dictionaries atomically (temp file + rename)
+		def accessionKey(accession):
+			return (int(accession[3:]) if accession[3:].isdigit() else -1, accession)
+
+		with open('{0}.tmp'.format(tablePath), mode = 'wt', encoding = 'utf-8', newline = '\n') as tableFile:
+			tableFile.write('\t'.join(['gse.ID'] + list(map(lambda x: x[0], self.columnList))) + '\n')
+			for everyEntry in sorted(self.rowDict, key = accessionKey):
+				tableFile.write('{0}\t{1}\n'.format(everyEntry, self.rowDict[everyEntry]))
+		os.replace('{0}.tmp'.format(tablePath), tablePath)
+
+		with open('{0}.tmp'.format(dictPath), mode = 'wt', encoding = 'utf-8', newline = '\n') as dictFile:
+			dictFile.write('\t'.join(['dict.Column', 'dict.Code', 'dict.Value']) + '\n')
+			for everyHeader, everyField, everyKind in filter(lambda x: x[2] == 'dict', self.columnList):
+				for everyValue, everyCode in sorted(self.codeDict[everyField].items(), key = lambda x: x[1]):
+					dictFile.write('{0}\t{1}\t{2}\n'.format(everyHeader, everyCode, everyValue))
+		os.replace('{0}.tmp'.format(dictPath), dictPath)
+
+	def save(self):
+		# Persist sidecar state atomically
+		tempPath = '{0}.tmp'.format(self.statePath)
+		with open(tempPath, mode = 'wb') as stateFile:
+			pickle.dump({'columns': self.columnList, 'digests': self.digestDict, 'rows': self.rowDict, 'codes': self.codeDict}, stateFile, protocol = 4)
+		os.replace(tempPath, self.statePath)
@@ -0,0 +1,105 @@
+# Module for GEO Record Retrieval (requests + pooled session)
+
+# Python Imports
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from PyVersion import PyCheckLenient
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+
+class SOFTFetcher:
+	# SOFTFetcher shares a single pooled HTTP session across threads for acc.cgi SOFT requests
+
+	def __init__(self, link = 'https://www.ncbi.nlm.nih.gov/geo/query/acc.cgi', workers = 1, timeout = 60, apiKey = None):
+		# Initialize
+		assert isinstance(link, str)
+		assert isinstance(workers, int) and workers > 0
+		assert apiKey is None or isinstance(apiKey, str)
+
+		self.link = link
+		self.timeout = timeout
+		self.apiKey = apiKey
+		self.session = requests.Session()
+
+		# Keep One Connection Per Worker Alive
+		tempAdapter = HTTPAdapter(pool_connections = 1, pool_maxsize = workers)
+		self.session.mount('http://', tempAdapter)
+		self.session.mount('https://', tempAdapter)
+
+	def fetch(self, accession, stream = False):
+		# Return response for a single accession (brief SOFT view); raises on connection failure
+		# NOTE: Streamed responses must be closed (or used as context managers) to release the connection
+		linkOptions = {
+			'acc': accession,
+			'targ': 'self',
+			'form': 'text',
+			'view': 'brief'
+		}
+		if self.apiKey is not None:
+			linkOptions['api_key'] = self.apiKey
+		return self.session.get(self.link, params = linkOptions, timeout = self.timeout, stream = stream)
+
+	def close(self):
+		# Release pooled connections
+		self.session.close()
+
+
+class ESearchClient:
+	# ESearchClient queries E-utilities for GEO series (GDS database) modified within a date window
+
+	def __init__(self, link = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi', timeout = 60, apiKey = None, scheduler = None):
+		# Initialize
+		assert isinstance(link, str)
+		assert apiKey is None or isinstance(apiKey, str)
+
+		self.link = link
+		self.timeout = timeout
+		self.apiKey = apiKey
+		self.scheduler = scheduler
+		self.session = requests.Session()
+
+	def search(self, linkOptions):
+		# Single esearch page (rate-limited through the scheduler, if any)
+		if self.apiKey is not None:
+			linkOptions['api_key'] = self.apiKey
+		if self.scheduler is not None:
+			tempRequest = self.scheduler.call(self.session.get, self.link, params = linkOptions, timeout = self.timeout)
+		else:
+			tempRequest = self.session.get(self.link, params = linkOptions, timeout = self.timeout)
+		tempRequest.raise_for_status()
+		return tempRequest.json()['esearchresult']
+
+	def modifiedSeries(self, sinceTime, pageSize = 10000):
+		# Set of GSE accessions modified since sinceTime (epoch seconds)
+		# NOTE: GDS series UIDs are 200000000 + GSE number
+		sinceDate = time.strftime('%Y/%m/%d', time.gmtime(sinceTime))
+		seriesSet = set()
+		pageStart = 0
+		while True:
+			linkOptions = {
+				'db': 'gds',
+				'term': 'gse[ETYP]',
+				'datetype': 'mdat',
+				'mindate': sinceDate,
+				'maxdate': '3000',
+				'retstart': pageStart,
+				'retmax': pageSize,
+				'retmode': 'json'
+			}
+			tempResult = self.search(linkOptions)
+			for tempUID in map(int, tempResult['idlist']):
+				if 200000000 <= tempUID < 300000000:
+					seriesSet.add('GSE{0}'.format(tempUID - 200000000))
+
+			pageStart += pageSize
+			if pageStart >= int(tempResult['count']):
+				break
+		return seriesSet
+
+	def close(self):
+		# Release pooled connections
+		self.session.close()
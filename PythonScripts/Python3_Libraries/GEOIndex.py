@@ -0,0 +1,191 @@
+# Module for GEO Inverted Index (field -> value -> sorted GSE number postings)
+
+# Python Imports
+import bisect
+import os
+import pickle
+import re
+import threading
+from array import array
+from datetime import datetime
+from PyVersion import PyCheckLenient
+from GEORefresh import GEO_DATE_FORMAT
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# Indexed Fields (Submission Dates Indexed by Year)
+INDEX_FIELDS = ('Series_type', 'Series_sample_organism', 'Series_platform_id')
+YEAR_FIELD = 'submission_year'
+
+
+def AccessionNumber(accession):
+	# Numeric part of a GSE accession (None if not a series accession)
+	tempMatch = re.match(pattern = '^GSE([0-9]+)$', string = accession)
+	return None if tempMatch is None else int(tempMatch.group(1))
+
+
+def IndexTerms(recordDict):
+	# Indexed (field, value) pairs of a record (module-level; usable as an XZReadMany projection)
+	termSet = set()
+	for everyField in INDEX_FIELDS:
+		termSet.update(map(lambda x: (everyField, x), recordDict.get(everyField, ())))
+	for everyValue in recordDict.get('Series_submission_date', ()):
+		try:
+			termSet.add((YEAR_FIELD, datetime.strptime(everyValue, GEO_DATE_FORMAT).year))
+		except ValueError:
+			pass
+	return tuple(sorted(termSet, key = str))
+
+
+class Postings:
+	# Postings wraps a sorted array of GSE numbers; & (AND), | (OR) and - (AND NOT) return new Postings
+
+	def __init__(self, numberArray = None):
+		self.numberArray = array('l') if numberArray is None else numberArray
+
+	def __len__(self):
+		return len(self.numberArray)
+
+	def __iter__(self):
+		return iter(self.numberArray)
+
+	def __contains__(self, number):
+		tempIndex = bisect.bisect_left(self.numberArray, number)
+		return tempIndex < len(self.numberArray) and self.numberArray[tempIndex] == number
+
+	def __and__(self, other):
+		smallArray, largeArray = sorted((self.numberArray, other.numberArray), key = len)
+		largeSet = set(largeArray)
+		return Postings(array('l', filter(lambda x: x in largeSet, smallArray)))
+
+	def __or__(self, other):
+		return Postings(array('l', sorted(set(self.numberArray).union(other.numberArray))))
+
+	def __sub__(self, other):
+		otherSet = set(other.numberArray)
+		return Postings(array('l', filter(lambda x: x not in otherSet, self.numberArray)))
+
+	def accessions(self):
+		# GSE accessions (ascending)
+		return list(map(lambda x: 'GSE{0}'.format(x), self.numberArray))
+
+
+class GEOIndex:
+	# GEOIndex keeps postings per (field, value) plus the indexed terms per GSE number (for updates/removal)
+	# NOTE: Updates are incremental (bisect insert/delete in sorted arrays); persisted atomically on save
+
+	def __init__(self, path):
+		# Initialize (loads persisted index, if any)
+		assert isinstance(path, str)
+		self.path = path
+		self.lock = threading.Lock()
+		self.postingDict = dict()
+		self.termDict = dict()
+		self.loaded = False
+		if os.path.lexists(path):
+			with open(path, mode = 'rb') as indexFile:
+				tempDict = pickle.load(indexFile)
+			self.postingDict = tempDict['postings']
+			self.termDict = tempDict['terms']
+			self.loaded = True
+
+	def __len__(self):
+		return len(self.termDict)
+
+	def __contains__(self, accession):
+		return AccessionNumber(accession) in self.termDict
+
+	def keys(self):
+		# Set of indexed accessions
+		return set(map(lambda x: 'GSE{0}'.format(x), self.termDict))
+
+	# ------------------------------ Updates ------------------------------
+	def addTerms(self, number, termTuple):
+		# Insert number into the postings of every term (caller holds the lock)
+		for everyField, everyValue in termTuple:
+			valueDict = self.postingDict.setdefault(everyField, dict())
+			numberArray = valueDict.setdefault(everyValue, array('l'))
+			tempIndex = bisect.bisect_left(numberArray, number)
+			if tempIndex == len(numberArray) or numberArray[tempIndex] != number:
+				numberArray.insert(tempIndex, number)
+		self.termDict[number] = termTuple
+
+	def removeTerms(self, number):
+		# Remove number from the postings of its indexed terms (caller holds the lock)
+		for everyField, everyValue in self.termDict.pop(number, ()):
+			valueDict = self.postingDict[everyField]
+			numberArray = valueDict[everyValue]
+			tempIndex = bisect.bisect_left(numberArray, number)
+			if tempIndex < len(numberArray) and numberArray[tempIndex] == number:
+				del numberArray[tempIndex]
+			if len(numberArray) == 0:
+				del valueDict[everyValue]
+
+	def update(self, accession, recordDict = None, termTuple = None):
+		# Index (or re-index) a record from its dictionary or precomputed terms (thread-safe)
+		number = AccessionNumber(accession)
+		if number is None:
+			return
+		termTuple = IndexTerms(recordDict) if termTuple is None else termTuple
+		with self.lock:
+			if self.termDict.get(number) == termTuple:
+				return
+			self.removeTerms(number)
+			self.addTerms(number, termTuple)
+
+	def remove(self, accession):
+		# Drop a record from the index (thread-safe)
+		number = AccessionNumber(accession)
+		with self.lock:
+			self.removeTerms(number)
+
+	def clear(self):
+		# Drop every posting
+		with self.lock:
+			self.postingDict = dict()
+			self.termDict = dict()
+
+	def save(self):
+		# Persist index atomically (temp file + rename)
+		tempPath = '{0}.tmp'.format(self.path)
+		with self.lock:
+			with open(tempPath, mode = 'wb') as indexFile:
+				pickle.dump({'postings': self.postingDict, 'terms': self.termDict}, indexFile, protocol = 4)
+		os.replace(tempPath, self.path)
+		self.loaded = True
+
+	# ------------------------------ Queries ------------------------------
+	def fields(self):
+		# Indexed field names
+		return sorted(self.postingDict)
+
+	def values(self, field):
+		# Value -> posting count of a field
+		return dict(map(lambda x: (x[0], len(x[1])), self.postingDict.get(field, dict()).items()))
+
+	def get(self, field, value):
+		# Postings of a single (field, value) term
+		return Postings(array('l', self.postingDict.get(field, dict()).get(value, ())))
+
+	def any(self, field, valueList):
+		# OR over several values of a field
+		valueDict = self.postingDict.get(field, dict())
+		numberSet = set()
+		for everyValue in valueList:
+			numberSet.update(valueDict.get(everyValue, ()))
+		return Postings(array('l', sorted(numberSet)))
+
+	def has(self, field):
+		# Postings of records with at least one value for field
+		return self.any(field, list(self.postingDict.get(field, dict())))
+
+	def all(self):
+		# Postings of every indexed record
+		return Postings(array('l', sorted(self.termDict)))
+
+	def range(self, field, low = None, high = None):
+		# OR over every value of a field within [low, high] (e.g. submission years)
+		valueList = filter(lambda x: (low is None or x >= low) and (high is None or x <= high), self.postingDict.get(field, dict()))
+		return self.any(field, list(valueList))
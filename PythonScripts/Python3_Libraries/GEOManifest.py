@@ -0,0 +1,135 @@
+# Module for GEO Cache Manifests (accession -> fetch time, content digest, size)
+
+# Python Imports
+import hashlib
+import os
+import pickle
+import threading
+import time
+from PyVersion import PyCheckLenient
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+
+def DictDigest(obj):
+	# Order-independent content digest of a metadata dictionary (key -> set of values)
+	tempHash = hashlib.sha1()
+	for dKey in sorted(obj):
+		tempHash.update(dKey.encode('utf-8', 'replace') + b'\x00')
+		for dValue in sorted(obj[dKey]):
+			tempHash.update(dValue.encode('utf-8', 'replace') + b'\x01')
+		tempHash.update(b'\x02')
+	return tempHash.hexdigest()
+
+
+def Reconcile(remoteSet, recordDict, refreshPolicy):
+	# Set-based cache reconciliation against the remote listing
+	# Returns (toDelete, toFetch, toRefresh): cached-only, remote-only and entries selected by the refresh policy (GEORefresh)
+	assert isinstance(remoteSet, (set, frozenset))
+
+	localSet = recordDict.keys()
+	toDelete = localSet - remoteSet
+	toFetch = remoteSet - localSet
+	toRefresh = refreshPolicy.select(remoteSet & localSet, recordDict)
+	return toDelete, toFetch, toRefresh
+
+
+class GEOManifest:
+	# GEOManifest persists one record per cached entry: accession -> (fetch time, digest, size)
+	# NOTE: Also keeps the last complete remote listing so plans can be computed offline (dry runs)
+	# NOTE: Series_last_update_date of fetched entries is kept separately (accession -> epoch seconds)
+
+	def __init__(self, path):
+		# Initialize (loads existing manifest if present)
+		assert isinstance(path, str)
+
+		self.path = path
+		self.lock = threading.Lock()
+		self.recordDict = dict()
+		self.updateDict = dict()
+		self.remoteSet = None
+		self.remoteTime = None
+		self.loaded = False
+
+		if os.path.lexists(path):
+			with open(path, mode = 'rb') as manifestFile:
+				tempManifest = pickle.load(manifestFile)
+			self.recordDict = tempManifest['records']
+			self.remoteSet = tempManifest['remote']
+			self.remoteTime = tempManifest['remoteTime']
+			self.updateDict = tempManifest.get('lastUpdate', dict())
+			self.loaded = True
+
+	def __len__(self):
+		return len(self.recordDict)
+
+	def __contains__(self, accession):
+		return accession in self.recordDict
+
+	def get(self, accession):
+		# Manifest record (fetch time, digest, size); None if absent
+		return self.recordDict.get(accession)
+
+	def records(self):
+		# Accession -> (fetch time, digest, size) mapping (read-only view)
+		return self.recordDict
+
+	def update(self, accession, fetchTime, digest, size, lastUpdate = None):
+		# Record a fetched entry (thread-safe)
+		with self.lock:
+			self.recordDict[accession] = (fetchTime, digest, size)
+			if lastUpdate is not None:
+				self.updateDict[accession] = lastUpdate
+
+	def remove(self, accession):
+		# Drop an entry (thread-safe)
+		with self.lock:
+			self.recordDict.pop(accession, None)
+			self.updateDict.pop(accession, None)
+
+	def setRemote(self, remoteSet, remoteTime = None):
+		# Store the remote listing used for reconciliation
+		with self.lock:
+			self.remoteSet = frozenset(remoteSet)
+			self.remoteTime = time.time() if remoteTime is None else remoteTime
+
+	def clear(self):
+		# Drop every record
+		with self.lock:
+			self.recordDict = dict()
+			self.updateDict = dict()
+
+	def rebuildFromDir(self, cacheDir, suffix = '.DICT.XZ'):
+		# Rebuild from a per-entry cache directory (single scandir pass; digests unknown until refetch)
+		tempDict = dict()
+		with os.scandir(cacheDir) as dirIter:
+			for dirEntry in dirIter:
+				if dirEntry.name.endswith(suffix):
+					tempStat = dirEntry.stat()
+					tempDict[dirEntry.name[:-len(suffix)]] = (tempStat.st_mtime, None, tempStat.st_size)
+		with self.lock:
+			self.recordDict = tempDict
+
+	def rebuildFromStore(self, geoStore):
+		# Rebuild from a packed store index (digests unknown until refetch)
+		tempDict = dict()
+		for tempAccession, tempStamp, tempSize in geoStore.records():
+			tempDict[tempAccession] = (tempStamp, None, tempSize)
+		with self.lock:
+			self.recordDict = tempDict
+
+	def save(self):
+		# Persist atomically (temp file + rename)
+		with self.lock:
+			tempManifest = {
+				'records': dict(self.recordDict),
+				'remote': self.remoteSet,
+				'remoteTime': self.remoteTime,
+				'lastUpdate': dict(self.updateDict)
+			}
+		tempPath = '{0}.tmp'.format(self.path)
+		with open(tempPath, mode = 'wb') as manifestFile:
+			pickle.dump(tempManifest, manifestFile, protocol = 4)
+		os.replace(tempPath, self.path)
@@ -0,0 +1,108 @@
+# Module for GEO Refresh Policies (selecting cached entries that require re-download)
+
+# Python Imports
+import calendar
+import time
+from PyVersion import PyCheckLenient
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# SOFT Date Format (e.g. 'Jan 01 2020'; Series Submission and Last Update Dates)
+GEO_DATE_FORMAT = '%b %d %Y'
+
+
+def GEODateStamp(dateString):
+	# SOFT date (e.g. 'Jan 01 2020') -> epoch seconds (UTC); None if unparseable
+	try:
+		return calendar.timegm(time.strptime(dateString.strip(), GEO_DATE_FORMAT))
+	except (AttributeError, ValueError):
+		return None
+
+
+def MLSDStamp(modifyString):
+	# MLSD modify fact (e.g. '20200101120000.123') -> epoch seconds (UTC); None if absent
+	if modifyString is None:
+		return None
+	try:
+		return calendar.timegm(time.strptime(modifyString[:14], '%Y%m%d%H%M%S'))
+	except ValueError:
+		return None
+
+
+class AgePolicy:
+	# Refresh entries fetched more than maxAge seconds ago (blanket expiry)
+	name = 'age'
+
+	def __init__(self, maxAge, currentTime = None):
+		# Initialize
+		self.maxAge = maxAge
+		self.currentTime = time.time() if currentTime is None else currentTime
+
+	def select(self, commonSet, recordDict):
+		# Subset of cached entries requiring refresh
+		expiryTime = self.currentTime - self.maxAge
+		return set(filter(lambda x: recordDict[x][0] <= expiryTime, commonSet))
+
+
+class MTimePolicy(AgePolicy):
+	# Refresh entries whose FTP directory changed after the last fetch (age fallback without mtime)
+	name = 'mtime'
+
+	def __init__(self, maxAge, modifyDict, currentTime = None):
+		# Initialize; modifyDict maps accession -> FTP modification time (epoch seconds)
+		super().__init__(maxAge, currentTime)
+		self.modifyDict = modifyDict
+
+	def select(self, commonSet, recordDict):
+		refreshSet = set()
+		unknownSet = set()
+		for everyEntry in commonSet:
+			tempModify = self.modifyDict.get(everyEntry)
+			if tempModify is None:
+				unknownSet.add(everyEntry)
+			elif tempModify > recordDict[everyEntry][0]:
+				refreshSet.add(everyEntry)
+		return refreshSet | super().select(unknownSet, recordDict)
+
+
+class LastUpdatePolicy(AgePolicy):
+	# Adaptive expiry from the cached Series_last_update_date (no network access required)
+	# NOTE: Entries are re-checked once the time since fetch exceeds half of their quiet period
+	# (last update -> fetch), bounded by [minAge, maxAge]; recently updated series are re-checked sooner
+	name = 'lastupdate'
+
+	def __init__(self, maxAge, updateDict, minAge = 7 * 24 * 60 * 60, currentTime = None):
+		# Initialize; updateDict maps accession -> cached Series_last_update_date (epoch seconds)
+		super().__init__(maxAge, currentTime)
+		self.updateDict = updateDict
+		self.minAge = minAge
+
+	def select(self, commonSet, recordDict):
+		refreshSet = set()
+		for everyEntry in commonSet:
+			fetchTime = recordDict[everyEntry][0]
+			lastUpdate = self.updateDict.get(everyEntry)
+			entryAge = self.maxAge
+			if lastUpdate is not None:
+				entryAge = min(self.maxAge, max(self.minAge, (fetchTime - lastUpdate) / 2))
+			if self.currentTime - fetchTime >= entryAge:
+				refreshSet.add(everyEntry)
+		return refreshSet
+
+
+class ChangedSetPolicy:
+	# Refresh entries reported as modified by the remote (e.g. E-utilities esearch by modification date)
+	name = 'esearch'
+
+	def __init__(self, changedSet):
+		# Initialize
+		self.changedSet = changedSet
+
+	def select(self, commonSet, recordDict):
+		return commonSet & self.changedSet
+
+
+# Policy Names (GSE_Dump.py --policy)
+policyList = ['age', 'mtime', 'lastupdate', 'esearch']
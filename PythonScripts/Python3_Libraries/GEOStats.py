@@ -0,0 +1,296 @@
+# Module for GEO Metadata Statistics (declarative queries; parallel map-reduce over cached records)
+
+# Python Imports
+import functools
+import itertools
+import os
+from collections import Counter
+from datetime import datetime
+from PyVersion import PyCheckLenient
+from IterUtils import BoundedMap
+from XZPickle import XZRead
+from GEOStore import GEOStore
+from GEOIndex import INDEX_FIELDS, YEAR_FIELD
+from GEORefresh import GEO_DATE_FORMAT
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# Per-Process Store Handles (Worker Side; Index Loaded Once Per Process)
+storeCache = dict()
+
+
+def IndexField(field):
+	# Inverted index field of a record field (ValueError if not indexed)
+	if field not in INDEX_FIELDS:
+		raise ValueError('Field not indexed: {0}'.format(field))
+	return field
+
+
+# ------------------------------ Predicates ------------------------------
+# NOTE: Predicates evaluate on a record (__call__) or on an inverted index (postings)
+class Has:
+	# Record has at least one value for field
+	def __init__(self, field):
+		self.field = field
+
+	def __call__(self, recordDict):
+		return len(recordDict.get(self.field, ())) > 0
+
+	def postings(self, geoIndex):
+		return geoIndex.has(IndexField(self.field))
+
+
+class AnyOf:
+	# Record has at least one of the given values for field
+	def __init__(self, field, valueList):
+		self.field = field
+		self.valueSet = frozenset(valueList)
+
+	def __call__(self, recordDict):
+		return not self.valueSet.isdisjoint(recordDict.get(self.field, ()))
+
+	def postings(self, geoIndex):
+		return geoIndex.any(IndexField(self.field), self.valueSet)
+
+
+class And:
+	# Conjunction of predicates
+	def __init__(self, *predicateList):
+		self.predicateList = predicateList
+
+	def __call__(self, recordDict):
+		return all(map(lambda x: x(recordDict), self.predicateList))
+
+	def postings(self, geoIndex):
+		return functools.reduce(lambda x, y: x & y, map(lambda x: x.postings(geoIndex), self.predicateList))
+
+
+class Or:
+	# Disjunction of predicates
+	def __init__(self, *predicateList):
+		self.predicateList = predicateList
+
+	def __call__(self, recordDict):
+		return any(map(lambda x: x(recordDict), self.predicateList))
+
+	def postings(self, geoIndex):
+		return functools.reduce(lambda x, y: x | y, map(lambda x: x.postings(geoIndex), self.predicateList))
+
+
+class Not:
+	# Negation of a predicate
+	def __init__(self, predicate):
+		self.predicate = predicate
+
+	def __call__(self, recordDict):
+		return not self.predicate(recordDict)
+
+	def postings(self, geoIndex):
+		return geoIndex.all() - self.predicate.postings(geoIndex)
+
+
+# ------------------------------ Group-By Keys ------------------------------
+# NOTE: Keys evaluate on a record (__call__) or on an inverted index (groups: key -> postings)
+class Values:
+	# Group by every value of field (multi-valued: a record counts once per distinct value)
+	# NOTE: valueList restricts keys to the given values; records without a key are grouped under None
+	def __init__(self, field, valueList = None):
+		self.field = field
+		self.valueSet = None if valueList is None else frozenset(valueList)
+
+	def __call__(self, recordDict):
+		tempSet = recordDict.get(self.field, ())
+		if self.valueSet is not None:
+			tempSet = self.valueSet.intersection(tempSet)
+		return tempSet if len(tempSet) > 0 else (None,)
+
+	def groups(self, geoIndex):
+		indexField = IndexField(self.field)
+		valueList = geoIndex.values(indexField) if self.valueSet is None else self.valueSet
+		groupDict = dict(map(lambda x: (x, geoIndex.get(indexField, x)), valueList))
+		groupDict[None] = geoIndex.all() - geoIndex.any(indexField, valueList)
+		return groupDict
+
+
+class Year:
+	# Group by year of a GEO date field (e.g. Series_submission_date = 'Jan 01 2020')
+	def __init__(self, field = 'Series_submission_date', dateFormat = GEO_DATE_FORMAT):
+		self.field = field
+		self.dateFormat = dateFormat
+
+	def __call__(self, recordDict):
+		tempSet = set()
+		for everyValue in recordDict.get(self.field, ()):
+			try:
+				tempSet.add(datetime.strptime(everyValue, self.dateFormat).year)
+			except ValueError:
+				pass
+		return tempSet if len(tempSet) > 0 else (None,)
+
+	def groups(self, geoIndex):
+		if self.field != 'Series_submission_date' or self.dateFormat != GEO_DATE_FORMAT:
+			raise ValueError('Field not indexed: {0}'.format(self.field))
+		groupDict = dict(map(lambda x: (x, geoIndex.get(YEAR_FIELD, x)), geoIndex.values(YEAR_FIELD)))
+		groupDict[None] = geoIndex.all() - geoIndex.has(YEAR_FIELD)
+		return groupDict
+
+
+class Cross:
+	# Group by the cartesian product of several keys (tuples)
+	def __init__(self, *keyList):
+		self.keyList = keyList
+
+	def __call__(self, recordDict):
+		return itertools.product(*map(lambda x: x(recordDict), self.keyList))
+
+	def groups(self, geoIndex):
+		groupDict = {(): geoIndex.all()}
+		for everyKey in self.keyList:
+			tempDict = dict()
+			for everyGroup, everyPostings in groupDict.items():
+				for keyValue, keyPostings in everyKey.groups(geoIndex).items():
+					tempPostings = everyPostings & keyPostings
+					if len(tempPostings) > 0:
+						tempDict[everyGroup + (keyValue,)] = tempPostings
+			groupDict = tempDict
+		return groupDict
+
+
+# ------------------------------ Queries ------------------------------
+class StatQuery:
+	# StatQuery counts records matching where (None: every record), grouped by groupBy (None: single total)
+	# NOTE: Predicates and keys must be picklable (module-level classes/functions) to reach worker processes
+
+	def __init__(self, name, where = None, groupBy = None):
+		# Initialize
+		assert isinstance(name, str)
+		self.name = name
+		self.where = where
+		self.groupBy = groupBy
+
+	def update(self, counter, recordDict):
+		# Add a single record to a partial aggregate
+		if self.where is not None and not self.where(recordDict):
+			return
+		if self.groupBy is None:
+			counter[None] += 1
+		else:
+			counter.update(set(self.groupBy(recordDict)))
+
+	def evaluate(self, geoIndex):
+		# Aggregate from an inverted index (no record reads); ValueError for non-indexed fields
+		wherePostings = geoIndex.all() if self.where is None else self.where.postings(geoIndex)
+		if self.groupBy is None:
+			return Counter({None: len(wherePostings)})
+		groupDict = self.groupBy.groups(geoIndex)
+		return Counter(dict(filter(lambda x: x[1] > 0, map(lambda x: (x[0], len(x[1] & wherePostings)), groupDict.items()))))
+
+
+def StatsMap(queryList, recordIter):
+	# Partial aggregate (query name -> Counter) over (accession, record) pairs plus record count
+	resultDict = dict(map(lambda x: (x.name, Counter()), queryList))
+	recordCount = 0
+	for _, recordDict in recordIter:
+		recordCount += 1
+		for everyQuery in queryList:
+			everyQuery.update(resultDict[everyQuery.name], recordDict)
+	return resultDict, recordCount
+
+
+def StatsMerge(resultDict, partialDict):
+	# Merge a partial aggregate into a running aggregate (in place)
+	for everyName, everyCounter in partialDict.items():
+		resultDict[everyName].update(everyCounter)
+	return resultDict
+
+
+def StatsFileChunk(queryList, pathList):
+	# Worker task: partial aggregate over a chunk of per-entry files; returns (partial, count, error list)
+	errorList = []
+
+	def recordIter():
+		for everyPath in pathList:
+			try:
+				tempDict = XZRead(everyPath)
+			except Exception as tempError:
+				errorList.append((everyPath, tempError))
+				continue
+			yield everyPath, tempDict
+
+	partialDict, recordCount = StatsMap(queryList, recordIter())
+	return partialDict, recordCount, errorList
+
+
+def StatsStoreChunk(queryList, storeDir, accessionList):
+	# Worker task: partial aggregate over a chunk of store records (physical order); returns (partial, count, [])
+	if storeDir not in storeCache:
+		storeCache[storeDir] = GEOStore(storeDir, readOnly = True)
+	partialDict, recordCount = StatsMap(queryList, storeCache[storeDir].iterItems(accessionSet = set(accessionList)))
+	return partialDict, recordCount, []
+
+
+def StatsChunk(taskFunc, queryList, argTuple):
+	# Worker entry point: unpack chunk arguments for a task function
+	return taskFunc(queryList, *argTuple)
+
+
+class StatsEngine:
+	# StatsEngine evaluates every query in a single parallel pass and merges partial aggregates
+	# NOTE: N queries cost one scan; tasks are chunked with at most 2 * workers chunks in flight
+
+	def __init__(self, queryList, workers = None, chunkSize = 256):
+		# Initialize
+		assert len(set(map(lambda x: x.name, queryList))) == len(queryList)
+		self.queryList = list(queryList)
+		self.workers = os.cpu_count() if workers is None else workers
+		self.chunkSize = chunkSize
+		self.errorDict = dict()
+		self.recordCount = 0
+		assert isinstance(self.workers, int) and self.workers > 0
+
+	def run(self, taskFunc, argIter):
+		# Map chunk tasks over workers (in-process if workers = 1) and reduce; returns query name -> Counter
+		resultDict = dict(map(lambda x: (x.name, Counter()), self.queryList))
+		self.errorDict = dict()
+		self.recordCount = 0
+
+		def reduceTask(taskResult):
+			partialDict, recordCount, errorList = taskResult
+			StatsMerge(resultDict, partialDict)
+			self.recordCount += recordCount
+			self.errorDict.update(errorList)
+
+		if self.workers == 1:
+			for everyArg in argIter:
+				reduceTask(taskFunc(self.queryList, *everyArg))
+			return resultDict
+
+		# NOTE: Partial application keeps tasks picklable (module-level function + arguments)
+		chunkFunc = functools.partial(StatsChunk, taskFunc, self.queryList)
+		for _, taskResult, tempError in BoundedMap(chunkFunc, argIter, workers = self.workers, processFlag = True):
+			if tempError is not None:
+				raise tempError
+			reduceTask(taskResult)
+		return resultDict
+
+	def runFiles(self, pathList):
+		# Single pass over per-entry files (unreadable files collected in errorDict)
+		pathIter = iter(pathList)
+		chunkIter = iter(lambda: list(itertools.islice(pathIter, self.chunkSize)), [])
+		return self.run(StatsFileChunk, map(lambda x: (x,), chunkIter))
+
+	def runIndex(self, geoIndex):
+		# Answer every query from an inverted index (milliseconds; indexed fields only)
+		self.errorDict = dict()
+		self.recordCount = len(geoIndex)
+		return dict(map(lambda x: (x.name, x.evaluate(geoIndex)), self.queryList))
+
+	def runStore(self, storeDir):
+		# Single pass over a packed store; chunks follow physical order so workers read sequentially
+		with GEOStore(storeDir, readOnly = True) as geoStore:
+			locationList = sorted(map(lambda x: (x[1][:3], x[0]), geoStore.indexDict.items()))
+		accessionList = list(map(lambda x: x[1], locationList))
+		chunkIter = (accessionList[x:x + self.chunkSize] for x in range(0, len(accessionList), self.chunkSize))
+		return self.run(StatsStoreChunk, map(lambda x: (storeDir, x), chunkIter))
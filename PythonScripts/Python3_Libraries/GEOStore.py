@@ -0,0 +1,334 @@
+# Module for Packed GEO Metadata Storage (sharded append-only segments + accession index)
+
+# Python Imports
+import lzma
+import os
+import pickle
+import re
+import struct
+import threading
+import time
+import zlib
+from PyVersion import PyCheckLenient
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# Record Layout: Header (Accession Length, Timestamp, Payload Length) + Accession + Payload (XZ-Pickle)
+# NOTE: Payload length of 0 marks a deletion (tombstone); records are self-describing for index recovery
+recordHeader = struct.Struct('<HdI')
+segmentPattern = re.compile('^SHARD([0-9]{2})\\.([0-9]{6})\\.SEG$')
+
+
+class GEOStore:
+	# GEOStore packs per-accession metadata dictionaries into sharded append-only segment files
+	# Index: accession -> (shard, segment, offset, length, timestamp); persisted as INDEX.PKL on flush/close
+
+	def __init__(self, storeDir, shardCount = 16, segmentSize = 256 * 1024 * 1024, readOnly = False):
+		# Initialize (rebuilds the index from segments if INDEX.PKL is missing or stale)
+		assert isinstance(storeDir, str)
+		assert isinstance(shardCount, int) and 0 < shardCount <= 100
+		assert isinstance(segmentSize, int) and segmentSize > 0
+
+		self.storeDir = storeDir
+		self.indexPath = os.path.join(storeDir, 'INDEX.PKL')
+		self.shardCount = shardCount
+		self.segmentSize = segmentSize
+		self.readOnly = readOnly
+		self.lock = threading.Lock()
+		self.writeDict = dict()
+		self.readDict = dict()
+		self.dirtyFlag = False
+
+		if not readOnly:
+			os.makedirs(storeDir, exist_ok = True)
+
+		# Active Segment Per Shard (Highest Sequence Number)
+		self.segmentDict = dict()
+		for everyFile in os.listdir(storeDir) if os.path.isdir(storeDir) else []:
+			tempMatch = segmentPattern.match(everyFile)
+			if tempMatch is not None:
+				tempShard, tempSegment = int(tempMatch.group(1)), int(tempMatch.group(2))
+				self.segmentDict[tempShard] = max(self.segmentDict.get(tempShard, 0), tempSegment)
+
+		self.indexDict = self.loadIndex()
+
+	# ------------------------------ Index ------------------------------
+	def segmentPath(self, shard, segment):
+		# Segment file path
+		return os.path.join(self.storeDir, 'SHARD{0:02d}.{1:06d}.SEG'.format(shard, segment))
+
+	def segmentSizes(self):
+		# Current size of every segment file (used to validate the persisted index)
+		tempDict = dict()
+		for everyFile in os.listdir(self.storeDir) if os.path.isdir(self.storeDir) else []:
+			tempMatch = segmentPattern.match(everyFile)
+			if tempMatch is not None:
+				tempKey = (int(tempMatch.group(1)), int(tempMatch.group(2)))
+				tempDict[tempKey] = os.path.getsize(os.path.join(self.storeDir, everyFile))
+		return tempDict
+
+	def loadIndex(self):
+		# Load persisted index; fall back to a segment scan when segments changed after the last flush
+		sizeDict = self.segmentSizes()
+		if os.path.lexists(self.indexPath):
+			with open(self.indexPath, mode = 'rb') as indexFile:
+				tempIndex = pickle.load(indexFile)
+			if tempIndex['shardCount'] == self.shardCount and tempIndex['segments'] == sizeDict:
+				return tempIndex['records']
+		return self.rebuildIndex()
+
+	def rebuildIndex(self):
+		# Recover index by sequentially scanning every segment (later records supersede earlier ones)
+		tempDict = dict()
+		for (shard, segment), segmentSize in sorted(self.segmentSizes().items()):
+			with open(self.segmentPath(shard, segment), mode = 'rb') as segmentFile:
+				tempOffset = 0
+				while True:
+					tempHeader = segmentFile.read(recordHeader.size)
+					if len(tempHeader) < recordHeader.size:
+						break
+					accLength, tempStamp, payloadLength = recordHeader.unpack(tempHeader)
+					tempAccession = segmentFile.read(accLength).decode('ascii', 'replace')
+					payloadOffset = tempOffset + recordHeader.size + accLength
+
+					# Torn Final Record (Interrupted Append): Truncated Before Further Appends
+					if payloadOffset + payloadLength > segmentSize:
+						if not self.readOnly:
+							os.truncate(self.segmentPath(shard, segment), tempOffset)
+						break
+					tempOffset = payloadOffset + payloadLength
+					segmentFile.seek(tempOffset)
+
+					if payloadLength == 0:
+						tempDict.pop(tempAccession, None)
+					else:
+						tempDict[tempAccession] = (shard, segment, payloadOffset, payloadLength, tempStamp)
+		self.dirtyFlag = True
+		return tempDict
+
+	def flush(self):
+		# Flush segment writers and persist index atomically (temp file + rename)
+		with self.lock:
+			for tempFile in self.writeDict.values():
+				tempFile.flush()
+			if self.readOnly or not self.dirtyFlag:
+				return
+
+			tempIndex = {
+				'shardCount': self.shardCount,
+				'segments': self.segmentSizes(),
+				'records': self.indexDict
+			}
+			tempPath = '{0}.tmp'.format(self.indexPath)
+			with open(tempPath, mode = 'wb') as indexFile:
+				pickle.dump(tempIndex, indexFile, protocol = 4)
+			os.replace(tempPath, self.indexPath)
+			self.dirtyFlag = False
+
+	def close(self):
+		# Flush and release file handles
+		self.flush()
+		with self.lock:
+			for tempFile in list(self.writeDict.values()) + list(self.readDict.values()):
+				tempFile.close()
+			self.writeDict.clear()
+			self.readDict.clear()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	# ------------------------------ Access ------------------------------
+	def __contains__(self, accession):
+		return accession in self.indexDict
+
+	def __len__(self):
+		return len(self.indexDict)
+
+	def keys(self):
+		# Set of stored accessions
+		return set(self.indexDict)
+
+	def timestamp(self, accession):
+		# Update timestamp (epoch seconds) of a record; None if absent
+		tempEntry = self.indexDict.get(accession)
+		return None if tempEntry is None else tempEntry[4]
+
+	def records(self):
+		# Yield (accession, timestamp, payload size) for every stored record
+		for tempAccession, tempEntry in self.indexDict.items():
+			yield tempAccession, tempEntry[4], tempEntry[3]
+
+	def shardOf(self, accession):
+		# Shard assignment (numeric suffix modulo shard count, CRC32 fallback)
+		tempMatch = re.search('[0-9]+$', accession)
+		if tempMatch is not None:
+			return int(tempMatch.group(0)) % self.shardCount
+		return zlib.crc32(accession.encode('ascii')) % self.shardCount
+
+	def readPayload(self, shard, segment, offset, length):
+		# Random-access payload read (per-segment cached handles)
+		with self.lock:
+			if (shard, segment) in self.writeDict:
+				self.writeDict[(shard, segment)].flush()
+			if (shard, segment) not in self.readDict:
+				self.readDict[(shard, segment)] = open(self.segmentPath(shard, segment), mode = 'rb')
+			tempFile = self.readDict[(shard, segment)]
+			tempFile.seek(offset)
+			return tempFile.read(length)
+
+	def read(self, accession):
+		# Random-access read of a single record
+		shard, segment, offset, length, _ = self.indexDict[accession]
+		return pickle.loads(lzma.decompress(self.readPayload(shard, segment, offset, length)))
+
+	def iterItems(self, accessionSet = None):
+		# Yield (accession, obj) pairs in physical order (one sequential read per segment)
+		# NOTE: A given accession set is looked up directly (cost proportional to its size, not the index)
+		tempList = []
+		if accessionSet is None:
+			itemIter = self.indexDict.items()
+		else:
+			itemIter = map(lambda x: (x, self.indexDict[x]), filter(lambda x: x in self.indexDict, accessionSet))
+		for tempAccession, tempEntry in itemIter:
+			tempList.append((tempEntry[0], tempEntry[1], tempEntry[2], tempEntry[3], tempAccession))
+		tempList.sort()
+
+		currentKey = None
+		segmentFile = None
+		try:
+			for shard, segment, offset, length, tempAccession in tempList:
+				if (shard, segment) != currentKey:
+					if segmentFile is not None:
+						segmentFile.close()
+					with self.lock:
+						if (shard, segment) in self.writeDict:
+							self.writeDict[(shard, segment)].flush()
+					segmentFile = open(self.segmentPath(shard, segment), mode = 'rb', buffering = 1024 * 1024)
+					currentKey = (shard, segment)
+				segmentFile.seek(offset)
+				yield tempAccession, pickle.loads(lzma.decompress(segmentFile.read(length)))
+		finally:
+			if segmentFile is not None:
+				segmentFile.close()
+
+	def iterBatches(self, batchSize = 1000, accessionSet = None):
+		# Yield lists of (accession, obj) pairs of at most batchSize elements
+		assert isinstance(batchSize, int) and batchSize > 0
+		tempBatch = []
+		for tempItem in self.iterItems(accessionSet = accessionSet):
+			tempBatch.append(tempItem)
+			if len(tempBatch) == batchSize:
+				yield tempBatch
+				tempBatch = []
+		if len(tempBatch) > 0:
+			yield tempBatch
+
+	# ------------------------------ Mutation ------------------------------
+	def appendRecord(self, accession, payload, timestamp, syncFlag = False):
+		# Append raw record to the active segment of its shard (thread-safe); returns index entry
+		# NOTE: syncFlag flushes and fsyncs the segment before returning (record durable before e.g. a journal line)
+		assert not self.readOnly
+		tempAccession = accession.encode('ascii')
+		shard = self.shardOf(accession)
+
+		with self.lock:
+			segment = self.segmentDict.get(shard, 0)
+			tempKey = (shard, segment)
+			if tempKey not in self.writeDict:
+				self.writeDict[tempKey] = open(self.segmentPath(shard, segment), mode = 'ab')
+			tempFile = self.writeDict[tempKey]
+
+			# Roll Over Full Segments
+			if tempFile.tell() >= self.segmentSize:
+				tempFile.close()
+				del self.writeDict[tempKey]
+				segment += 1
+				self.segmentDict[shard] = segment
+				tempKey = (shard, segment)
+				tempFile = open(self.segmentPath(shard, segment), mode = 'ab')
+				self.writeDict[tempKey] = tempFile
+
+			tempOffset = tempFile.tell()
+			tempFile.write(recordHeader.pack(len(tempAccession), timestamp, len(payload)))
+			tempFile.write(tempAccession)
+			tempFile.write(payload)
+			if syncFlag:
+				tempFile.flush()
+				os.fsync(tempFile.fileno())
+			self.segmentDict[shard] = segment
+			self.dirtyFlag = True
+
+			payloadOffset = tempOffset + recordHeader.size + len(tempAccession)
+			if len(payload) == 0:
+				self.indexDict.pop(accession, None)
+				return None
+			self.indexDict[accession] = (shard, segment, payloadOffset, len(payload), timestamp)
+			return self.indexDict[accession]
+
+	def write(self, accession, obj, timestamp = None, compression = 6, syncFlag = False):
+		# Append (or supersede) a record; protocol 2 for Jython-compatibility; returns index entry
+		assert isinstance(accession, str)
+		tempPayload = lzma.compress(pickle.dumps(obj, protocol = 2), preset = compression)
+		return self.appendRecord(accession, tempPayload, time.time() if timestamp is None else timestamp, syncFlag = syncFlag)
+
+	def delete(self, accession):
+		# Append tombstone for a record (space reclaimed by compaction)
+		if accession in self.indexDict:
+			self.appendRecord(accession, b'', time.time())
+
+	def clear(self):
+		# Remove every segment and the index
+		self.close()
+		for (shard, segment) in self.segmentSizes():
+			os.remove(self.segmentPath(shard, segment))
+		if os.path.lexists(self.indexPath):
+			os.remove(self.indexPath)
+		self.segmentDict = dict()
+		self.indexDict = dict()
+
+	def compact(self):
+		# Rewrite live records into fresh segments and remove superseded ones; returns bytes reclaimed
+		assert not self.readOnly
+		self.flush()
+		oldSizes = self.segmentSizes()
+		oldIndex = dict(self.indexDict)
+
+		# New Segments Start After Every Existing Sequence Number
+		with self.lock:
+			for tempFile in list(self.writeDict.values()) + list(self.readDict.values()):
+				tempFile.close()
+			self.writeDict.clear()
+			self.readDict.clear()
+			nextSegment = 1 + max([x[1] for x in oldSizes] + [-1])
+			self.segmentDict = dict.fromkeys(range(self.shardCount), nextSegment)
+
+		tempList = sorted((x[0], x[1], x[2], x[3], x[4], y) for y, x in oldIndex.items())
+		currentKey = None
+		segmentFile = None
+		for shard, segment, offset, length, tempStamp, tempAccession in tempList:
+			if (shard, segment) != currentKey:
+				if segmentFile is not None:
+					segmentFile.close()
+				segmentFile = open(self.segmentPath(shard, segment), mode = 'rb', buffering = 1024 * 1024)
+				currentKey = (shard, segment)
+			segmentFile.seek(offset)
+			self.appendRecord(tempAccession, segmentFile.read(length), tempStamp)
+		if segmentFile is not None:
+			segmentFile.close()
+
+		# Remove Superseded Segments, Then Persist Index (Interrupted Runs Recover via Segment Scan)
+		with self.lock:
+			for tempFile in self.writeDict.values():
+				tempFile.close()
+			self.writeDict.clear()
+		for (shard, segment) in oldSizes:
+			os.remove(self.segmentPath(shard, segment))
+		self.dirtyFlag = True
+		self.flush()
+
+		return sum(oldSizes.values()) - sum(self.segmentSizes().values())
@@ -0,0 +1,159 @@
+# Module for NCBI gene_info Parsing (gzip input; line-aligned chunks parsed on a process pool; declarative output tables)
+
+# Python Imports
+import functools
+import gzip
+import os
+from IterUtils import BoundedMap
+from TSVUtils import TSVProjection, MultiValue
+from PyVersion import PyCheckLenient
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# gene_info Columns (0-Based)
+TAXON_COLUMN = 0
+GENE_COLUMN = 1
+SYMBOL_COLUMN = 2
+SYNONYM_COLUMN = 4
+XREF_COLUMN = 5
+CHROMOSOME_COLUMN = 6
+TYPE_COLUMN = 9
+
+
+def GeneInfoPath(inDir):
+	# gene_info.gz if present, else uncompressed gene_info
+	tempPath = '{0}/gene_info.gz'.format(inDir)
+	return tempPath if os.path.lexists(tempPath) else '{0}/gene_info'.format(inDir)
+
+
+def GeneInfoRanges(path, blockSize):
+	# Line-aligned byte ranges (path, start, end) of an uncompressed file; read by the workers themselves
+	fileSize = os.path.getsize(path)
+	with open(path, mode = 'rb') as inFile:
+		startOffset = 0
+		while startOffset < fileSize:
+			endOffset = min(startOffset + blockSize, fileSize)
+			if endOffset < fileSize:
+				inFile.seek(endOffset)
+				inFile.readline()
+				endOffset = inFile.tell()
+			yield path, startOffset, endOffset
+			startOffset = endOffset
+
+
+def GeneInfoBlocks(path, blockSize):
+	# Line-aligned decompressed blocks of a gzip file (gzip streams cannot be split by byte offset)
+	with gzip.open(path, mode = 'rb') as inFile:
+		tailBlock = b''
+		while True:
+			tempBlock = inFile.read(blockSize)
+			if len(tempBlock) == 0:
+				break
+			tempBlock = tailBlock + tempBlock
+			cutOffset = tempBlock.rfind(b'\n') + 1
+			tailBlock = tempBlock[cutOffset:]
+			if cutOffset > 0:
+				yield tempBlock[:cutOffset]
+		if len(tailBlock) > 0:
+			yield tailBlock
+
+
+def GeneInfoChunks(path, blockSize = 4 * 1024 * 1024):
+	# Worker tasks for a gene_info file: byte ranges (plain) or decompressed blocks (.gz)
+	if path.endswith('.gz'):
+		return GeneInfoBlocks(path, blockSize)
+	return GeneInfoRanges(path, blockSize)
+
+
+def ChunkBytes(chunk):
+	# Bytes of a worker task (decompressed block, or byte range read from disk)
+	if isinstance(chunk, bytes):
+		return chunk
+	path, startOffset, endOffset = chunk
+	with open(path, mode = 'rb') as inFile:
+		inFile.seek(startOffset)
+		return inFile.read(endOffset - startOffset)
+
+
+class GeneInfoTable:
+	# GeneInfoTable declares an output table: key column -> projected column value(s), per taxon
+	# NOTE: A single value column yields its raw string; several yield tuples (compiled TSVProjection)
+	# NOTE: Multi-valued columns ('|'-separated, '-' = none) yield tuples of values
+
+	def __init__(self, name, valueColumns, keyColumn = GENE_COLUMN, keyType = int, multiColumns = (), subDir = 'GeneInfo'):
+		# Initialize
+		assert isinstance(name, str)
+		assert isinstance(valueColumns, list) and len(valueColumns) > 0
+		assert all(map(lambda x: x in valueColumns, multiColumns))
+		self.name = name
+		self.valueColumns = valueColumns
+		self.keyColumn = keyColumn
+		self.keyType = keyType
+		self.multiColumns = frozenset(multiColumns)
+		self.subDir = subDir
+		self.lastColumn = max(valueColumns + [keyColumn])
+		self.projection = None
+
+	def __getstate__(self):
+		# Compiled projection is rebuilt in the worker (lambdas do not pickle)
+		tempState = dict(self.__dict__)
+		tempState['projection'] = None
+		return tempState
+
+	def project(self, tempArray):
+		# Column projection of a split gene_info line (compiled on first use)
+		if self.projection is None:
+			self.projection = TSVProjection(self.valueColumns, list(map(lambda x: MultiValue if x in self.multiColumns else None, self.valueColumns)))
+		valueTuple = self.projection(tempArray)
+		return valueTuple[0] if len(valueTuple) == 1 else valueTuple
+
+	def path(self, outDir, taxon):
+		# Per-taxon XZ layout: <outDir>/<subDir>/<name>.<taxon>.DICT.XZ
+		return '{0}/{1}/{2}.{3}.DICT.XZ'.format(outDir.rstrip('/'), self.subDir, self.name, taxon)
+
+
+def GeneInfoChunk(tableList, taxonSet, chunk):
+	# Worker task: table name -> taxon -> {key: projected value} for a single chunk
+	# NOTE: Taxon (first column) is checked before splitting; lines split only up to the last projected column
+	splitCount = max(map(lambda x: x.lastColumn, tableList)) + 1
+	resultDict = dict(map(lambda x: (x.name, dict(map(lambda y: (y, dict()), taxonSet))), tableList))
+	for everyLine in ChunkBytes(chunk).split(b'\n'):
+		taxonID = everyLine[:everyLine.find(b'\t')]
+		if taxonID not in taxonSet:
+			continue
+		tempArray = everyLine.decode('utf-8').split('\t', splitCount)
+		for everyTable in tableList:
+			tempKey = everyTable.keyType(tempArray[everyTable.keyColumn])
+			resultDict[everyTable.name][taxonID][tempKey] = everyTable.project(tempArray)
+	return resultDict
+
+
+def GeneInfoExtract(path, taxonList, tableList, workers = None, blockSize = 4 * 1024 * 1024):
+	# Single pass over gene_info: table name -> taxon ID -> {key: value} (target taxa only)
+	# NOTE: Every table is filled from the same pass; at most 2 * workers chunks in flight
+	assert len(set(map(lambda x: x.name, tableList))) == len(tableList)
+	workers = os.cpu_count() if workers is None else workers
+	taxonSet = frozenset(map(lambda x: x.encode('utf-8'), taxonList))
+	finalDict = dict(map(lambda x: (x.name, dict(map(lambda y: (y, dict()), taxonList))), tableList))
+
+	chunkFunc = functools.partial(GeneInfoChunk, tableList, taxonSet)
+	if workers == 1:
+		resultIter = map(lambda x: (x, chunkFunc(x), None), GeneInfoChunks(path, blockSize))
+	else:
+		resultIter = BoundedMap(chunkFunc, GeneInfoChunks(path, blockSize), workers = workers, processFlag = True)
+
+	for _, resultDict, tempError in resultIter:
+		if tempError is not None:
+			raise tempError
+		for tableName, taxonDict in resultDict.items():
+			for taxonID, geneDict in taxonDict.items():
+				finalDict[tableName][taxonID.decode('utf-8')].update(geneDict)
+	return finalDict
+
+
+def GeneTypeParse(path, taxonList, workers = None, blockSize = 4 * 1024 * 1024):
+	# Single pass over gene_info: taxon ID -> {EntrezID: gene type} (target taxa only)
+	typeTable = GeneInfoTable('geneType', [TYPE_COLUMN], subDir = 'GeneType')
+	return GeneInfoExtract(path, taxonList, [typeTable], workers = workers, blockSize = blockSize)['geneType']
@@ -0,0 +1,123 @@
+# Module for Compact Gene Lookup Tables (sorted EntrezIDs + type codes; memory-mapped, binary search)
+
+# Python Imports
+import bisect
+import mmap
+import os
+import struct
+import sys
+from array import array
+from PyVersion import PyCheckLenient
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# Layout (Little-Endian; Shared With Jython2_Libraries/GeneTable.py):
+#   Header:  magic 'GTAB', version (uint16), type count (uint16), gene count (uint64), name table bytes (uint64), 8 pad bytes
+#   Names:   type names, UTF-8, newline-separated (padded to 8 bytes)
+#   IDs:     gene count x int64 (ascending EntrezIDs)
+#   Codes:   gene count x uint8 (index into type names)
+GTAB_HEADER = struct.Struct('<4sHHQQ8x')
+GTAB_MAGIC = b'GTAB'
+GTAB_VERSION = 1
+
+
+def PadLength(length):
+	# Length rounded up to a multiple of 8 (keeps the ID block aligned)
+	return (length + 7) // 8 * 8
+
+
+def GeneTableWrite(geneDict, path):
+	# Write EntrezID -> type name dictionary as a compact table (atomic: temp file + rename)
+	assert isinstance(path, str)
+	nameList = sorted(set(geneDict.values()))
+	assert len(nameList) <= 256
+	assert all(map(lambda x: '\n' not in x, nameList))
+	codeDict = dict(map(lambda x: (x[1], x[0]), enumerate(nameList)))
+
+	idArray = array('q', sorted(geneDict))
+	codeArray = array('B', map(lambda x: codeDict[geneDict[x]], idArray))
+	if sys.byteorder != 'little':
+		idArray.byteswap()
+	nameBytes = '\n'.join(nameList).encode('utf-8')
+
+	tempPath = '{0}.tmp'.format(path)
+	with open(tempPath, mode = 'wb') as outFile:
+		outFile.write(GTAB_HEADER.pack(GTAB_MAGIC, GTAB_VERSION, len(nameList), len(idArray), len(nameBytes)))
+		outFile.write(nameBytes.ljust(PadLength(len(nameBytes)), b'\0'))
+		idArray.tofile(outFile)
+		codeArray.tofile(outFile)
+	os.replace(tempPath, path)
+
+
+class GeneTable:
+	# GeneTable maps a compact table read-only; lookups binary-search the ID block in place
+	# NOTE: Supports `in`, [], get, len and items; close (or with-block) releases the mapping
+
+	def __init__(self, path):
+		# Initialize (header and type names are read; IDs and codes stay in the mapping)
+		assert isinstance(path, str)
+		self.tableFile = open(path, mode = 'rb')
+		self.tableMap = mmap.mmap(self.tableFile.fileno(), 0, access = mmap.ACCESS_READ)
+		self.idView = array('q')
+		self.codeView = b''
+		tempMagic, tempVersion, typeCount, geneCount, nameLength = GTAB_HEADER.unpack_from(self.tableMap, 0)
+		if tempMagic != GTAB_MAGIC or tempVersion != GTAB_VERSION:
+			self.close()
+			raise IOError('Not a gene table ({0})'.format(path))
+
+		nameOffset = GTAB_HEADER.size
+		idOffset = nameOffset + PadLength(nameLength)
+		codeOffset = idOffset + 8 * geneCount
+		self.nameList = self.tableMap[nameOffset:nameOffset + nameLength].decode('utf-8').split('\n') if typeCount > 0 else []
+		self.codeView = memoryview(self.tableMap)[codeOffset:codeOffset + geneCount]
+		if sys.byteorder == 'little':
+			self.idView = memoryview(self.tableMap)[idOffset:codeOffset].cast('q')
+		else:
+			self.idView = array('q', self.tableMap[idOffset:codeOffset])
+			self.idView.byteswap()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def __len__(self):
+		return len(self.idView)
+
+	def find(self, geneID):
+		# Position of geneID in the ID block (-1 if absent)
+		tempIndex = bisect.bisect_left(self.idView, geneID)
+		if tempIndex < len(self.idView) and self.idView[tempIndex] == geneID:
+			return tempIndex
+		return -1
+
+	def __contains__(self, geneID):
+		return self.find(geneID) >= 0
+
+	def __getitem__(self, geneID):
+		tempIndex = self.find(geneID)
+		if tempIndex < 0:
+			raise KeyError(geneID)
+		return self.nameList[self.codeView[tempIndex]]
+
+	def get(self, geneID, default = None):
+		tempIndex = self.find(geneID)
+		return default if tempIndex < 0 else self.nameList[self.codeView[tempIndex]]
+
+	def items(self):
+		# Yield (EntrezID, type name) pairs in ascending ID order
+		for tempIndex in range(len(self.idView)):
+			yield self.idView[tempIndex], self.nameList[self.codeView[tempIndex]]
+
+	def close(self):
+		# Release views before the mapping (open exports would block mmap.close)
+		for everyView in (self.idView, self.codeView):
+			if isinstance(everyView, memoryview):
+				everyView.release()
+		self.idView = array('q')
+		self.codeView = b''
+		self.tableMap.close()
+		self.tableFile.close()
@@ -2,6 +2,7 @@
 
 # Python Imports
 from array import array
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
 from PyVersion import PyCheckLenient
 
 # Python Version Check
@@ -17,3 +18,44 @@ def RSlice(inputList, indexList):
 
 	tempOutput = list(map(lambda x: inputList[x], indexList))
 	return tempOutput
+
+
+def BoundedMap(func, iterable, workers = 1, limit = None, processFlag = False):
+	# Thread-pooled map yielding (item, result, error) tuples in completion order
+	# NOTE: At most 2 * workers tasks are in flight; limit caps the number of successful calls
+	# NOTE: processFlag uses a process pool instead (func and items must be picklable)
+	assert isinstance(workers, int) and workers > 0
+	assert limit is None or isinstance(limit, int)
+
+	inputIter = iter(iterable)
+	inputFlag = True
+	successCount = 0
+	pendingDict = dict()
+
+	poolClass = ProcessPoolExecutor if processFlag else ThreadPoolExecutor
+	with poolClass(max_workers = workers) as taskPool:
+		while True:
+			# Top Up In-Flight Tasks (Lazy Consumption of Input)
+			while inputFlag and len(pendingDict) < 2 * workers:
+				if limit is not None and successCount + len(pendingDict) >= limit:
+					break
+				try:
+					tempItem = next(inputIter)
+				except StopIteration:
+					inputFlag = False
+					break
+				pendingDict[taskPool.submit(func, tempItem)] = tempItem
+
+			if len(pendingDict) == 0:
+				break
+
+			# Drain Completed Tasks
+			doneSet = wait(pendingDict, return_when = FIRST_COMPLETED)[0]
+			for tempFuture in doneSet:
+				tempItem = pendingDict.pop(tempFuture)
+				tempError = tempFuture.exception()
+				if tempError is None:
+					successCount += 1
+					yield tempItem, tempFuture.result(), None
+				else:
+					yield tempItem, None, tempError
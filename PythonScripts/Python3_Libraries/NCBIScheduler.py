@@ -0,0 +1,178 @@
+# Module for Scheduling NCBI Requests (token bucket + backoff + retry queue)
+
+# Python Imports
+import errno
+import ftplib
+import os
+import random
+import requests
+import socket
+import threading
+import time
+from collections import deque
+from PyVersion import PyCheckLenient
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# NCBI Request Ceilings (Requests/Second)
+# NOTE: https://www.ncbi.nlm.nih.gov/books/NBK25497/ (API key raises the ceiling from 3 to 10)
+ANONYMOUS_RATE = 3.0
+API_KEY_RATE = 10.0
+
+# Network Error Numbers (Plain OSError From Sockets; Local Errors Such As ENOSPC or EACCES Are Not Retried)
+NETWORK_ERRNOS = frozenset([
+	errno.ECONNABORTED, errno.ECONNREFUSED, errno.ECONNRESET, errno.EHOSTDOWN, errno.EHOSTUNREACH,
+	errno.ENETDOWN, errno.ENETRESET, errno.ENETUNREACH, errno.EPIPE, errno.ETIMEDOUT
+])
+
+
+class RetryableError(IOError):
+	# Raised for throttled (429) or server-side (5xx) responses
+	def __init__(self, status, retryAfter = None):
+		super().__init__('HTTP {0}'.format(status))
+		self.status = status
+		self.retryAfter = retryAfter
+
+
+class TokenBucket:
+	# Thread-safe token bucket; rate is adjustable at runtime between floor and ceiling
+
+	def __init__(self, rate, capacity = 1.0):
+		# Initialize
+		assert rate > 0
+		assert capacity >= 1
+
+		self.ceiling = float(rate)
+		self.floor = min(0.5, self.ceiling)
+		self.rate = float(rate)
+		self.capacity = float(capacity)
+		self.tokens = float(capacity)
+		self.stamp = time.monotonic()
+		self.lock = threading.Lock()
+
+	def acquire(self):
+		# Block until a token is available
+		while True:
+			with self.lock:
+				currentTime = time.monotonic()
+				self.tokens = min(self.capacity, self.tokens + (currentTime - self.stamp) * self.rate)
+				self.stamp = currentTime
+				if self.tokens >= 1:
+					self.tokens -= 1
+					return
+				waitTime = (1 - self.tokens) / self.rate
+			time.sleep(waitTime)
+
+	def throttle(self):
+		# Multiplicative decrease (on 429 responses)
+		with self.lock:
+			self.rate = max(self.floor, self.rate / 2)
+
+	def recover(self):
+		# Additive increase back towards the ceiling (on success)
+		with self.lock:
+			self.rate = min(self.ceiling, self.rate + self.ceiling / 20)
+
+
+class NCBIScheduler:
+	# NCBIScheduler routes every NCBI call through a shared rate limit, retries transient failures with
+	# exponential backoff (jitter) and defers exhausted items to a retry queue instead of dropping them
+
+	# Transient Failures: Network (Connection, Timeout, Dropped Stream), FTP 4xx, HTTP 429/5xx (RetryableError)
+	# NOTE: Other errors (local I/O, HTTP 4xx, parsing) are raised at once; see retryable
+	retryableErrors = (
+		RetryableError, ConnectionError, TimeoutError, socket.timeout, socket.gaierror, EOFError,
+		ftplib.error_temp, ftplib.error_reply,
+		requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError
+	)
+
+	def __init__(self, rate = None, maxRetry = 3, maxDefer = 3, baseDelay = 1.0, maxDelay = 60.0):
+		# Initialize; ceiling defaults to 10/s with NCBI_API_KEY set, otherwise 3/s
+		assert rate is None or rate > 0
+		assert isinstance(maxRetry, int) and maxRetry >= 0
+		assert isinstance(maxDefer, int) and maxDefer >= 0
+
+		self.apiKey = os.getenv('NCBI_API_KEY') or None
+		if rate is None:
+			rate = API_KEY_RATE if self.apiKey is not None else ANONYMOUS_RATE
+
+		self.bucket = TokenBucket(rate)
+		self.maxRetry = maxRetry
+		self.maxDefer = maxDefer
+		self.baseDelay = baseDelay
+		self.maxDelay = maxDelay
+		self.retryQueue = deque()
+		self.deferDict = dict()
+		self.lock = threading.Lock()
+
+	def backoff(self, attempt):
+		# Exponential backoff with equal jitter (seconds)
+		tempDelay = min(self.maxDelay, self.baseDelay * (2 ** attempt))
+		return tempDelay / 2 + random.uniform(0, tempDelay / 2)
+
+	def retryable(self, error):
+		# True for transient network/HTTP failures (retried and deferred); False for local errors and bugs
+		if isinstance(error, self.retryableErrors):
+			return True
+		return isinstance(error, OSError) and error.errno in NETWORK_ERRNOS
+
+	def localError(self, error):
+		# True for local I/O failures (e.g. ENOSPC, EACCES): OSError that is neither a network nor a requests error
+		return isinstance(error, OSError) and not isinstance(error, requests.RequestException) and not self.retryable(error)
+
+	def call(self, func, *args, **kwargs):
+		# Rate-limited call; retries transient failures and 429/5xx responses, raising once retries are exhausted
+		for attemptIndex in range(self.maxRetry + 1):
+			self.bucket.acquire()
+			try:
+				tempResult = func(*args, **kwargs)
+				tempStatus = getattr(tempResult, 'status_code', None)
+				if tempStatus is not None and (tempStatus == 429 or tempStatus >= 500):
+					tempAfter = tempResult.headers.get('Retry-After')
+					tempAfter = float(tempAfter) if tempAfter is not None and tempAfter.isdigit() else None
+					if hasattr(tempResult, 'close'):
+						tempResult.close()
+					raise RetryableError(tempStatus, retryAfter = tempAfter)
+				self.bucket.recover()
+				return tempResult
+
+			except Exception as tempError:
+				if not self.retryable(tempError):
+					raise
+				if isinstance(tempError, RetryableError) and tempError.status == 429:
+					self.bucket.throttle()
+				if attemptIndex == self.maxRetry:
+					raise
+
+				tempDelay = self.backoff(attemptIndex)
+				if isinstance(tempError, RetryableError) and tempError.retryAfter is not None:
+					tempDelay = max(tempDelay, tempError.retryAfter)
+				time.sleep(tempDelay)
+
+	def defer(self, item):
+		# Queue item for a later retry round; returns False once the item exhausted its deferrals
+		with self.lock:
+			tempCount = self.deferDict.get(item, 0)
+			if tempCount >= self.maxDefer:
+				return False
+			self.deferDict[item] = tempCount + 1
+			self.retryQueue.append((time.monotonic() + self.backoff(tempCount + self.maxRetry), item))
+			return True
+
+	def pending(self):
+		# Number of items waiting in the retry queue
+		return len(self.retryQueue)
+
+	def deferred(self):
+		# Yield queued items as they come due (items deferred meanwhile wait for the next round)
+		with self.lock:
+			tempList = sorted(self.retryQueue, key = lambda x: x[0])
+			self.retryQueue.clear()
+
+		for dueTime, item in tempList:
+			waitTime = dueTime - time.monotonic()
+			if waitTime > 0:
+				time.sleep(waitTime)
+			yield item
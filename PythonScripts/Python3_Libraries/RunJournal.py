@@ -0,0 +1,97 @@
+# Module for Run Journals (write-ahead log of planned, completed and failed entries)
+
+# Python Imports
+import os
+import threading
+import time
+from PyVersion import PyCheckLenient
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+
+class RunJournal:
+	# RunJournal records a run plan followed by per-entry outcomes so interrupted runs can resume
+	# Layout (tab-separated lines):
+	#   #PLAN <epoch>       -> P <entry>                     (planned entries, in order)
+	#   #BEGIN              -> C <entry> <field> ... | F <entry>  (completed/failed entries)
+	#   #END                (run finished; nothing to resume)
+
+	def __init__(self, path):
+		# Initialize
+		assert isinstance(path, str)
+		self.path = path
+		self.lock = threading.Lock()
+		self.journalFile = None
+
+	def load(self):
+		# Parse journal: (planned list, completed entry -> field list, failed set, finished flag); None if absent
+		if not os.path.lexists(self.path):
+			return None
+
+		planList = []
+		completeDict = dict()
+		failSet = set()
+		finishFlag = False
+		with open(self.path, mode = 'rt', encoding = 'utf-8', newline = '\n') as journalFile:
+			for everyLine in journalFile:
+				# Skip Torn Final Line
+				if not everyLine.endswith('\n'):
+					break
+				tempList = everyLine.rstrip('\n').split('\t')
+				if tempList[0] == 'P':
+					planList.append(tempList[1])
+				elif tempList[0] == 'C':
+					completeDict[tempList[1]] = tempList[2:]
+					failSet.discard(tempList[1])
+				elif tempList[0] == 'F':
+					failSet.add(tempList[1])
+				elif tempList[0] == '#END':
+					finishFlag = True
+		return planList, completeDict, failSet, finishFlag
+
+	def begin(self, planList):
+		# Start a new journal with the given plan (written atomically, then opened for appends)
+		tempPath = '{0}.tmp'.format(self.path)
+		with open(tempPath, mode = 'wt', encoding = 'utf-8', newline = '\n') as journalFile:
+			journalFile.write('#PLAN\t{0}\n'.format(time.time()))
+			for everyEntry in planList:
+				journalFile.write('P\t{0}\n'.format(everyEntry))
+			journalFile.write('#BEGIN\n')
+			journalFile.flush()
+			os.fsync(journalFile.fileno())
+		os.replace(tempPath, self.path)
+		self.resume()
+
+	def resume(self):
+		# Re-open an existing journal for appends
+		self.journalFile = open(self.path, mode = 'at', encoding = 'utf-8', newline = '\n')
+
+	def append(self, tempList):
+		# Append a single journal line (thread-safe; flushed immediately)
+		with self.lock:
+			self.journalFile.write('\t'.join(map(str, tempList)) + '\n')
+			self.journalFile.flush()
+
+	def complete(self, entry, *fieldList):
+		# Record a completed entry (optional fields are replayed on resume)
+		self.append(['C', entry] + list(fieldList))
+
+	def fail(self, entry):
+		# Record a failed entry (retried on resume)
+		self.append(['F', entry])
+
+	def finish(self):
+		# Mark the run as finished and close
+		self.append(['#END'])
+		self.close()
+
+	def close(self):
+		# Close without marking the run as finished
+		with self.lock:
+			if self.journalFile is not None:
+				self.journalFile.flush()
+				os.fsync(self.journalFile.fileno())
+				self.journalFile.close()
+				self.journalFile = None
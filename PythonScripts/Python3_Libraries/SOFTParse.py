@@ -0,0 +1,38 @@
+# Module for Streaming SOFT Parsing (GEO SOFT -> Metadata Dictionary)
+
+# Python Imports
+from PyVersion import PyCheckLenient
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+
+def SOFTParse(lineIter, keySet = None, encoding = 'utf-8'):
+	# Incremental SOFT -> DICT conversion ('!key = value' lines collected into sets)
+	# NOTE: lineIter is any line iterable (response.iter_lines(), open file, list); bytes are decoded
+	# NOTE: keySet optionally whitelists keys (e.g. {'Series_type', 'Series_sample_organism'})
+	assert keySet is None or isinstance(keySet, (set, frozenset))
+
+	tempDict = dict()
+	for everyLine in lineIter:
+		# Skip if NO '!' Prefix (Checked Before Decoding)
+		if isinstance(everyLine, bytes):
+			if not everyLine.startswith(b'!'):
+				continue
+			everyLine = everyLine.decode(encoding, 'replace')
+		elif not everyLine.startswith('!'):
+			continue
+
+		tempList = everyLine.rstrip('\r\n').lstrip('!').partition(' = ')
+
+		if tempList[2] == '':
+			continue
+		if keySet is not None and tempList[0] not in keySet:
+			continue
+
+		if tempList[0] not in tempDict:
+			tempDict[tempList[0]] = set()
+		tempDict[tempList[0]].add(tempList[2])
+
+	return tempDict
@@ -1,39 +1,160 @@
 # Module for Lazy-Pickling with Compression (open + pickle + xz)
 
 # Python Imports
+import functools
+import itertools
+import lzma
+import os
 import pickle
 import shlex
 import subprocess
 from PyVersion import PyCheckLenient
+from IterUtils import BoundedMap
 
 # Python Version Check
 # Requirement: CPython 3.7.X
 assert PyCheckLenient('CPython', '3', '7')
 
+# Pickled Size (Caller Hint) From Which Multithreaded xz (Subprocess) Replaces In-Process LZMA
+# NOTE: xz -6 splits multithreaded output into 24 MiB blocks; smaller inputs gain nothing from threads
+XZ_THREAD_THRESHOLD = 32 * 1024 * 1024
 
-def XZWrite(obj, path, protocol = 4, thread = 16, compression = 6):
+
+class XZStreamWriter:
+	# XZStreamWriter is a write-only sink for pickle.dump (nothing is buffered beyond the compressor)
+	# NOTE: thread = None compresses in-process (LZMAFile); thread = N streams through an xz -T N subprocess
+
+	def __init__(self, outFile, thread = None, compression = 6):
+		# Initialize
+		self.xzPopen = None
+		self.lzmaFile = None
+		if thread is None:
+			self.lzmaFile = lzma.LZMAFile(outFile, mode = 'wb', format = lzma.FORMAT_XZ, preset = compression)
+		else:
+			tempCommand = shlex.split('xz -z -T {0} -{1} -c'.format(thread, compression))
+			self.xzPopen = subprocess.Popen(tempCommand, stdin = subprocess.PIPE, stdout = outFile)
+
+	def write(self, data):
+		if self.lzmaFile is not None:
+			return self.lzmaFile.write(data)
+		return self.xzPopen.stdin.write(data)
+
+	def close(self):
+		# Finish compression; returns True on success
+		if self.lzmaFile is not None:
+			self.lzmaFile.close()
+			self.lzmaFile = None
+		if self.xzPopen is not None:
+			self.xzPopen.stdin.close()
+			return self.xzPopen.wait() == 0
+		return True
+
+
+def XZWrite(obj, path, protocol = 4, thread = 16, compression = 6, sizeHint = None, threshold = XZ_THREAD_THRESHOLD):
 	# Convenience wrapper for writing pickled-compressed objects
 	# Protocol = 4 (For compatibility with Python 2.7, use 2)
+	# NOTE: Streams in-process by default (no fork/exec); xz -T {thread} when sizeHint (expected pickled bytes) reaches threshold
+	# NOTE: threshold = None never uses xz; threshold = 0 always does
 	assert isinstance(path, str)
 	assert isinstance(thread, int)
 	assert isinstance(compression, int)
 	assert 0 <= compression <= 9
-	
-	tempFile = open(path, mode = 'wb')
-	tempPickle = pickle.dumps(obj = obj, protocol = protocol)
-	tempCommand = shlex.split('xz -z -T {0} -{1} -c'.format(thread, compression))
-	tempPopen = subprocess.Popen(tempCommand, stdin = subprocess.PIPE, stdout = tempFile)
-	tempResponse = tempPopen.communicate(tempPickle)
-	tempFile.close()
+	assert sizeHint is None or (isinstance(sizeHint, int) and sizeHint >= 0)
+	assert threshold is None or (isinstance(threshold, int) and threshold >= 0)
+	xzFlag = threshold is not None and (threshold == 0 or (sizeHint is not None and sizeHint >= threshold))
+
+	# Atomic Write (Temp File + Rename; Destination Never Holds Partial Data)
+	tempPath = '{0}.tmp'.format(path)
+	with open(tempPath, mode = 'wb') as tempFile:
+		streamWriter = XZStreamWriter(tempFile, thread = thread if xzFlag else None, compression = compression)
+		try:
+			pickle.dump(obj, streamWriter, protocol = protocol)
+		except BaseException:
+			streamWriter.close()
+			tempFile.close()
+			os.remove(tempPath)
+			raise
+		successFlag = streamWriter.close()
+
+	if not successFlag:
+		os.remove(tempPath)
+		raise IOError('xz compression failed ({0})'.format(path))
+	os.replace(tempPath, path)
 
 
-def XZRead(path):
+def XZRead(path, thread = None):
 	# Convenience wrapper for reading pickled-compressed objects
+	# NOTE: Streams in-process by default; thread = N decompresses through xz -T N instead
 	assert isinstance(path, str)
-	tempFile = open(path, mode = 'rb')
-	tempCommand = shlex.split('xz -d -c')
-	tempPopen = subprocess.Popen(tempCommand, stdin = tempFile, stdout = subprocess.PIPE)
-	tempPickle = tempPopen.communicate()[0]
-	tempFile.close()
-	tempObject = pickle.loads(tempPickle)
+	if thread is None:
+		with lzma.open(path, mode = 'rb') as lzmaFile:
+			return pickle.load(lzmaFile)
+
+	tempCommand = shlex.split('xz -d -T {0} -c'.format(thread))
+	with open(path, mode = 'rb') as tempFile:
+		tempPopen = subprocess.Popen(tempCommand, stdin = tempFile, stdout = subprocess.PIPE)
+		with tempPopen.stdout:
+			tempObject = pickle.load(tempPopen.stdout)
+		if tempPopen.wait() != 0:
+			raise IOError('xz decompression failed ({0})'.format(path))
 	return tempObject
+
+
+def XZReadChunk(pathList, func = None):
+	# Worker task: list of (path, object or func(object), error) for a chunk of paths
+	# NOTE: func (module-level, picklable) lets workers reduce objects before they are sent back
+	resultList = []
+	for everyPath in pathList:
+		try:
+			tempObject = XZRead(everyPath)
+			resultList.append((everyPath, tempObject if func is None else func(tempObject), None))
+		except Exception as tempError:
+			resultList.append((everyPath, None, tempError))
+	return resultList
+
+
+def XZIterMany(paths, workers = None, chunkSize = 32, func = None, errorDict = None):
+	# Process-pooled XZRead yielding (path, object) tuples in completion order
+	# NOTE: Paths are submitted in chunks with at most 2 * workers chunks in flight (bounded memory)
+	# NOTE: Failed files are recorded in errorDict (path -> exception) instead of aborting
+	# NOTE: workers = 1 reads serially in-process (no pool)
+	workers = os.cpu_count() if workers is None else workers
+	assert isinstance(workers, int) and workers > 0
+	assert isinstance(chunkSize, int) and chunkSize > 0
+	errorDict = dict() if errorDict is None else errorDict
+
+	pathIter = iter(paths)
+	chunkIter = iter(lambda: list(itertools.islice(pathIter, chunkSize)), [])
+	if workers == 1:
+		for resultList in map(lambda x: XZReadChunk(x, func), chunkIter):
+			for everyPath, tempObject, tempError in resultList:
+				if tempError is None:
+					yield everyPath, tempObject
+				else:
+					errorDict[everyPath] = tempError
+		return
+
+	for _, resultList, tempError in BoundedMap(functools.partial(XZReadChunk, func = func), chunkIter, workers = workers, processFlag = True):
+		if tempError is not None:
+			raise tempError
+		for everyPath, tempObject, tempError in resultList:
+			if tempError is None:
+				yield everyPath, tempObject
+			else:
+				errorDict[everyPath] = tempError
+
+
+class XZReadMany:
+	# XZReadMany iterates (path, object) tuples over many files with a process pool (see XZIterMany)
+	# NOTE: Per-file failures are available in errorDict after (or during) iteration
+
+	def __init__(self, paths, workers = None, chunkSize = 32, func = None):
+		# Initialize
+		self.paths = paths
+		self.workers = workers
+		self.chunkSize = chunkSize
+		self.func = func
+		self.errorDict = dict()
+
+	def __iter__(self):
+		return XZIterMany(self.paths, workers = self.workers, chunkSize = self.chunkSize, func = self.func, errorDict = self.errorDict)
@@ -0,0 +1,106 @@
+# GEO Metadata Exporter (GSE: Series)
+# 1. Flat Table of Cached-Dictionary Files for R (GSE_Export.TSV; fread-ready)
+# 2. Multi-Valued Fields Dictionary-Encoded (Codes Resolved via GSE_Export_DICT.TSV)
+# 3. Incremental: Only Records Changed Since the Last Export Are Decoded (Sidecar State)
+
+# Python imports
+import argparse
+import functools
+import os
+from PyVersion import PyCheckLenient
+from ElapseTime import ElapseTime
+from IterUtils import BoundedMap
+from XZPickle import XZReadMany
+from GEOStore import GEOStore
+from GEOManifest import GEOManifest
+from GEOExport import GEOExportTable, RowProjection, StoreReadChunk
+
+# Python Version Check
+# Requirement: CPython 3.7.X
+assert PyCheckLenient('CPython', '3', '7')
+
+# CLI Generation and Parsing
+cliParser = argparse.ArgumentParser()
+cliParser.add_argument('-c', required = False, default = False, action = 'store_true', help = 'Discard export state (full re-export)')
+cliParser.add_argument('-s', '--store', required = False, default = False, action = 'store_true', help = 'Read packed store (GeoData/GSE_Store) instead of per-entry files')
+cliParser.add_argument('-w', '--workers', required = False, default = os.cpu_count(), type = int, help = 'Worker processes; integer-type')
+cliParser.add_argument('--chunk', required = False, default = 256, type = int, help = 'Records per worker task; integer-type')
+cliOpts = cliParser.parse_args()
+
+# Declaring Global Variables
+os.chdir(os.getenv('OUT_DIR'))
+inputDir = '{0}/GeoData/GSE/'.format(os.getenv('DL_CACHE_DIR'))
+storeDir = '{0}/GeoData/GSE_Store/'.format(os.getenv('DL_CACHE_DIR'))
+statePath = 'GSE_Export.STATE.PKL'
+globalTimer = ElapseTime(name = 'GSE_Export')
+print(globalTimer.getBeginStamp())
+
+# ------------------------------ MAIN ------------------------------
+# Discard Export State
+if cliOpts.c and os.path.lexists(statePath):
+	print('Discarding Export State [-c flag]')
+	os.remove(statePath)
+
+# Cached Entries and Change Digests (Manifest Digest; File Stat/Store Timestamp If Unrecorded)
+if cliOpts.store:
+	geoManifest = GEOManifest('{0}MANIFEST.PKL'.format(storeDir))
+	with GEOStore(storeDir, readOnly = True) as geoStore:
+		digestDict = dict(map(lambda x: (x[0], str(x[1])), geoStore.records()))
+else:
+	geoManifest = GEOManifest('{0}/GeoData/GSE_MANIFEST.PKL'.format(os.getenv('DL_CACHE_DIR')))
+	digestDict = dict()
+	for everyFile in filter(lambda x: x.endswith('.DICT.XZ'), os.listdir(inputDir)):
+		fileStat = os.stat('{0}{1}'.format(inputDir, everyFile))
+		digestDict[everyFile[:-len('.DICT.XZ')]] = '{0}:{1}'.format(fileStat.st_mtime_ns, fileStat.st_size)
+for everyEntry in digestDict:
+	entryRecord = geoManifest.get(everyEntry)
+	if entryRecord is not None and entryRecord[1] is not None:
+		digestDict[everyEntry] = entryRecord[1]
+print('Cached Entries: {0}'.format(len(digestDict)))
+
+# Plan (Changed/New Rows Re-Projected; Removed Rows Dropped)
+exportTable = GEOExportTable(statePath)
+changedSet, removedSet = exportTable.stale(digestDict)
+print('Plan: Export {0}; Remove {1}; Unchanged {2}'.format(len(changedSet), len(removedSet), len(digestDict) - len(changedSet)), flush = True)
+for everyEntry in removedSet:
+	exportTable.remove(everyEntry)
+
+# Project Changed Records (Chunked, Process-Pooled)
+rowProjection = RowProjection()
+rowDict = dict()
+errorDict = dict()
+changedList = sorted(changedSet)
+if cliOpts.store:
+	chunkIter = (changedList[x:x + cliOpts.chunk] for x in range(0, len(changedList), cliOpts.chunk))
+	chunkFunc = functools.partial(StoreReadChunk, storeDir, func = rowProjection)
+	for _, resultList, tempError in BoundedMap(chunkFunc, chunkIter, workers = cliOpts.workers, processFlag = True):
+		if tempError is not None:
+			raise tempError
+		rowDict.update(map(lambda x: x[:2], resultList))
+else:
+	exportReader = XZReadMany(map(lambda x: '{0}{1}.DICT.XZ'.format(inputDir, x), changedList), workers = cliOpts.workers, chunkSize = cliOpts.chunk, func = rowProjection)
+	for tempPath, rowTuple in exportReader:
+		rowDict[os.path.basename(tempPath)[:-len('.DICT.XZ')]] = rowTuple
+	errorDict = exportReader.errorDict
+
+# Unreadable Files (Previous Rows Kept; Retried Next Run)
+for currentEntry, currentError in sorted(errorDict.items()):
+	print('ERROR: {0} could not be read ({1})'.format(currentEntry, currentError))
+
+# Encode Rows (Accession Order; Dictionary Codes Deterministic)
+for everyEntry in sorted(rowDict):
+	exportTable.update(everyEntry, digestDict[everyEntry], rowDict[everyEntry])
+
+# Write Table, Dictionaries and State
+print('Writing Export Files', flush = True)
+exportTable.write('GSE_Export.TSV', 'GSE_Export_DICT.TSV')
+exportTable.save()
+
+# Diagnostics
+print('-' * 20)
+print('Number of exported rows: {0}'.format(len(exportTable.rowDict)))
+print('Number of re-projected rows: {0}'.format(len(rowDict)))
+print('Number of failed reads: {0}'.format(len(errorDict)))
+
+# Time Reporter
+print(globalTimer.getEndStamp())
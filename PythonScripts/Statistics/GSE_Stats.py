@@ -1,63 +1,72 @@
 # GEO Metadata Parser (GSE: Series)
 # 1. Generate Statistical Counts from Cached-Dictionary Files
+# 2. Every Query Evaluated in a Single Parallel Pass (Map-Reduce over Worker Processes)
 
 # Python imports
+import argparse
 import os
-from collections import defaultdict
 from PyVersion import PyCheckLenient
 from ElapseTime import ElapseTime
-from XZPickle import XZRead
+from GEOIndex import GEOIndex
+from GEOStats import StatQuery, StatsEngine, Has, AnyOf, And, Values, Year, Cross
 
 # Python Version Check
 # Requirement: CPython 3.7.X
 assert PyCheckLenient('CPython', '3', '7')
 
+# CLI Generation and Parsing
+cliParser = argparse.ArgumentParser()
+cliParser.add_argument('-s', '--store', required = False, default = False, action = 'store_true', help = 'Read packed store (GeoData/GSE_Store) instead of per-entry files')
+cliParser.add_argument('-i', '--index', required = False, default = False, action = 'store_true', help = 'Answer from the inverted index maintained by GSE_Dump.py (no record reads)')
+cliParser.add_argument('-w', '--workers', required = False, default = os.cpu_count(), type = int, help = 'Worker processes; integer-type')
+cliOpts = cliParser.parse_args()
+
 # Declaring Global Variables
 inputDir = '{0}/GeoData/GSE/'.format(os.getenv('DL_CACHE_DIR'))
-globalTimer = ElapseTime()
+storeDir = '{0}/GeoData/GSE_Store/'.format(os.getenv('DL_CACHE_DIR'))
+typeList = ['Expression profiling by array', 'Expression profiling by high throughput sequencing']
+taxaList = ['Homo sapiens', 'Mus musculus', 'Rattus norvegicus']
+globalTimer = ElapseTime(name = 'GSE_Stats')
 print(globalTimer.getBeginStamp())
 
+# Declarative Queries (Predicate + Group-By Key)
+arraySeqWhere = And(Has('Series_sample_organism'), AnyOf('Series_type', typeList))
+triTaxaWhere = And(arraySeqWhere, AnyOf('Series_sample_organism', taxaList))
+queryList = [
+	StatQuery('array_and_seq', where = arraySeqWhere),
+	StatQuery('array_and_seq_and_tri_taxa', where = triTaxaWhere),
+	StatQuery('array_and_seq_by_type', where = arraySeqWhere, groupBy = Values('Series_type', typeList)),
+	StatQuery('array_and_seq_by_taxon', where = triTaxaWhere, groupBy = Values('Series_sample_organism', taxaList)),
+	StatQuery('array_and_seq_by_year', where = arraySeqWhere, groupBy = Year('Series_submission_date')),
+	StatQuery('tri_taxa_by_type_and_year', where = triTaxaWhere, groupBy = Cross(Values('Series_type', typeList), Year('Series_submission_date')))
+]
+
 # ------------------------------ MAIN ------------------------------
-# Preparations
-fileList = os.listdir(inputDir)
-resultDict = dict({
-	'array_and_seq': 0,
-	'array_and_seq_and_tri_taxa': 0
-})
-
-# Parse Dictionary Files
+# Parse Dictionary Files (Single Pass)
 print('Parsing Files')
-for currentFile in fileList:
-	inputDict = XZRead('{0}{1}'.format(inputDir, currentFile))
-	tempDict = defaultdict(set)
-
-	# Populate DefaultDict
-	for dKey, dSet in inputDict.items():
-		tempDict[dKey] = dSet
-
-	# Generate Statistics
-	typeFlag = False
-	taxaFlag = False
-	seriesTypeSet = tempDict['Series_type']
-	seriesTaxonSet = tempDict['Series_sample_organism']
-
-	if len(seriesTypeSet) < 1 or len(seriesTaxonSet) < 1:
-		continue
-
-	for stElem in seriesTypeSet:
-		if stElem in ['Expression profiling by array', 'Expression profiling by high throughput sequencing']:
-			typeFlag = True
-
-	for stElem in seriesTaxonSet:
-		if stElem in ['Homo sapiens', 'Mus musculus', 'Rattus norvegicus'] and typeFlag:
-			taxaFlag = True
+statsEngine = StatsEngine(queryList, workers = cliOpts.workers)
+if cliOpts.index:
+	indexPath = '{0}POSTINGS.PKL'.format(storeDir) if cliOpts.store else '{0}/GeoData/GSE_POSTINGS.PKL'.format(os.getenv('DL_CACHE_DIR'))
+	resultDict = statsEngine.runIndex(GEOIndex(indexPath))
+elif cliOpts.store:
+	resultDict = statsEngine.runStore(storeDir)
+else:
+	fileList = list(filter(lambda x: x.endswith('.DICT.XZ'), os.listdir(inputDir)))
+	resultDict = statsEngine.runFiles(map(lambda x: '{0}{1}'.format(inputDir, x), fileList))
 
-	resultDict['array_and_seq'] += int(typeFlag)
-	resultDict['array_and_seq_and_tri_taxa'] += int(taxaFlag)
+# Unreadable Files
+for currentEntry, currentError in sorted(statsEngine.errorDict.items()):
+	print('ERROR: {0} could not be read ({1})'.format(currentEntry, currentError))
 
 # Statistics Reporter
-print('# Microarray/RNA-Seq: {0}'.format(resultDict['array_and_seq']))
-print('# Microarray/RNA-Seq + Human/Mouse/Rat: {0}'.format(resultDict['array_and_seq_and_tri_taxa']))
+print('# Records: {0}'.format(statsEngine.recordCount))
+print('# Microarray/RNA-Seq: {0}'.format(resultDict['array_and_seq'][None]))
+print('# Microarray/RNA-Seq + Human/Mouse/Rat: {0}'.format(resultDict['array_and_seq_and_tri_taxa'][None]))
+for everyQuery in filter(lambda x: x.groupBy is not None, queryList):
+	print('# {0}:'.format(everyQuery.name))
+	for groupKey, groupCount in sorted(resultDict[everyQuery.name].items(), key = lambda x: str(x[0])):
+		groupKey = '\t'.join(map(str, groupKey)) if isinstance(groupKey, tuple) else groupKey
+		print('\t{0}\t{1}'.format(groupKey, groupCount))
 
 # Time Reporter
 print(globalTimer.getEndStamp())
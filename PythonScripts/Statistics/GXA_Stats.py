@@ -3,9 +3,9 @@
 
 # Python imports
 import os
-from ftplib import FTP
 from PyVersion import PyCheckLenient
 from ElapseTime import ElapseTime
+from FTPList import FTPLister
 
 # Python Version Check
 # Requirement: CPython 3.7.X
@@ -14,34 +14,14 @@ assert PyCheckLenient('CPython', '3', '7')
 # Declaring Global Variables
 outputPath = '{0}/GXA_GSE_List.TXT'.format(os.getenv('OUT_DIR'))
 ftpPath = '/pub/databases/microarray/data/atlas/experiments/'
-globalTimer = ElapseTime()
+globalTimer = ElapseTime(name = 'GXA_Stats')
 print(globalTimer.getBeginStamp())
 
 # ------------------------------ MAIN ------------------------------
-# Parse FTP Directory
+# Parse FTP Directory (MLSD Where Supported)
 print('Loading Parent Directory')
-entrySet = set()
-
-
-# Custom Function For Handling FTP.LIST Output
-def listFilter(inputString):
-	# Skip Non-Directory Objects
-	if not inputString.startswith('d'):
-		return None
-
-	tempList = inputString.split(' ')
-	entrySet.add(tempList[-1])
-
-
-with FTP('ftp.ebi.ac.uk', timeout = 3600) as ftp:
-	ftp.login()
-	ftp.cwd(ftpPath)
-	tempOutput = ftp.retrlines(cmd = 'LIST', callback = listFilter)
-	if tempOutput.startswith('226'):
-		pass
-	else:
-		print('ERROR: {0}'.format(tempOutput))
-	ftp.quit()
+with FTPLister('ftp.ebi.ac.uk', poolSize = 1, timeout = 3600) as ftpLister:
+	entrySet = set(map(lambda x: x[0], filter(lambda x: x[1] == 'dir', ftpLister.listDir(ftpPath))))
 
 # Parsing Experiment List for GSE
 gseSet = set()
@@ -17,3 +17,7 @@ python $SCRIPT_DIR/GXA_Stats.py 1> $OUT_LOG 2>&1
 # 2. GEO Experiment Information
 export OUT_LOG=$LOG_DIR/GSE_Stats.LOG
 python $SCRIPT_DIR/GSE_Stats.py 1> $OUT_LOG 2>&1
+
+# 3. GEO Series Table (For R; Incremental)
+export OUT_LOG=$LOG_DIR/GSE_Export.LOG
+python $SCRIPT_DIR/GSE_Export.py 1> $OUT_LOG 2>&1